@@ -6,6 +6,9 @@ Start with:
 
 from __future__ import annotations
 
+import asyncio
+import functools
+import hashlib
 import json
 import math
 import os
@@ -16,13 +19,15 @@ import tempfile
 import time
 from contextlib import asynccontextmanager
 from datetime import datetime, timezone
-from typing import Any, Dict, Optional
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
 
 import yaml
 import httpx
+import numpy as np
 from dotenv import load_dotenv
-from fastapi import FastAPI, File, Form, HTTPException, UploadFile
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 
 # ── Logger ──────────────────────────────────────────────────────────────
 try:
@@ -36,6 +41,12 @@ except ImportError:
 CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config", "config.yaml")
 _models: Dict[str, Any] = {}
 _ffprobe_path: str | None = None
+_executor: Any = None  # services.executor.ExecutionLayer, created in lifespan
+_jobs: Any = None      # services.jobs.JobQueue, created in lifespan
+_cache: Any = None     # services.result_cache.ResultCache, None when disabled
+_admission: Any = None  # services.admission.AdmissionController, created in lifespan
+_segments: Any = None  # services.segments.SegmentPool, None unless video.segments is enabled
+_warmup: Dict[str, Any] = {"status": "pending"}  # GET /ready succeeds once this is finished
 
 # ── Supabase (lightweight REST) ────────────────────────────────────────
 _sb_url: str | None = None
@@ -435,10 +446,63 @@ def _load_config() -> dict:
         return yaml.safe_load(f)
 
 
+# ── Warmup ──────────────────────────────────────────────────────────────
+def _warm_models(warm_cfg: dict) -> None:
+    """Compile (optionally) and exercise every loaded model once at each
+    shape requests will use. Mocks without a ``warmup`` method are skipped."""
+    mode = warm_cfg.get("compile", "none")
+    lengths = warm_cfg.get("text_lengths", [16, 128, 512])
+
+    video = _models.get("video")
+    if hasattr(video, "warmup"):
+        t0 = time.perf_counter()
+        if mode != "none":
+            video.compile(mode)
+        sizes = warm_cfg.get("video_batch_sizes") or [video.batch_size]
+        if not warm_cfg.get("video_batch_sizes") and video.batcher is not None:
+            sizes.append(video.batcher.max_batch_size)
+        video.warmup(sizes)
+        logger.info("  ✓ video warm (%s, batch sizes %s) in %.2fs", mode, sizes, time.perf_counter() - t0)
+
+    text = _models.get("text")
+    if hasattr(text, "warmup"):
+        t0 = time.perf_counter()
+        if mode != "none":
+            text.compile(mode)
+        text.warmup(lengths, batch_size=text.batcher.max_batch_size if text.batcher is not None else 1)
+        logger.info("  ✓ text warm (%s, lengths %s) in %.2fs", mode, lengths, time.perf_counter() - t0)
+
+    faiss = _models.get("faiss")
+    if hasattr(faiss, "search_batch"):
+        t0 = time.perf_counter()
+        for length in lengths:
+            faiss.search(" ".join(["news"] * length))
+        logger.info("  ✓ search warm in %.2fs", time.perf_counter() - t0)
+
+
+async def _warm_up(warm_cfg: dict) -> None:
+    if not warm_cfg.get("enabled", True):
+        _warmup.update(status="disabled")
+        logger.info("API ready ✓ (warmup disabled)")
+        return
+    _warmup.update(status="running")
+    logger.info("Warming up models...")
+    t0 = time.perf_counter()
+    try:
+        await _executor.run("inference", _warm_models, warm_cfg)
+        _warmup.update(status="done")
+    except Exception as exc:
+        # A failed warmup only costs speed; don't keep the instance unready
+        logger.warning("Warmup failed: %s", exc)
+        _warmup.update(status="failed", error=str(exc))
+    _warmup["seconds"] = round(time.perf_counter() - t0, 2)
+    logger.info("API ready ✓ (warmup %s in %.2fs)", _warmup["status"], _warmup["seconds"])
+
+
 # ── Lifespan ────────────────────────────────────────────────────────────
 @asynccontextmanager
 async def lifespan(application: FastAPI):
-    global _ffprobe_path
+    global _ffprobe_path, _executor, _jobs, _cache, _admission, _segments
     load_dotenv(os.path.join(os.path.dirname(__file__), ".env"))
     _init_supabase()
 
@@ -459,6 +523,14 @@ async def lifespan(application: FastAPI):
     # Ensure data/processed exists for temp files
     os.makedirs(os.path.join(backend_dir, "data", "processed"), exist_ok=True)
 
+    # Bounded pools for blocking work so the event loop keeps serving requests
+    from services.executor import ExecutionLayer
+    _executor = ExecutionLayer(cfg)
+
+    # Per-stage queue limits; requests beyond them are refused with 429
+    from services.admission import AdmissionController
+    _admission = AdmissionController(cfg)
+
     # Load each ML model independently — one failure should not block others
     class _Mock:
         def predict(self, *a, **kw): return {"confidence": 0.05, "label": "real"}
@@ -515,8 +587,60 @@ async def lifespan(application: FastAPI):
     _models["_loaded"] = loaded
     logger.info("Models loaded: %s (%d/%d)", ", ".join(loaded) if loaded else "none", len(loaded), 4)
 
-    logger.info("API ready ✓")
+    # Content-addressed report cache for repeated uploads
+    cache_cfg = cfg.get("cache", {})
+    if cache_cfg.get("enabled", False):
+        from services.result_cache import ResultCache
+        _cache = ResultCache(
+            os.path.join(backend_dir, cache_cfg.get("dir", "data/cache")),
+            memory_max_mb=cache_cfg.get("memory_max_mb", 64),
+            disk_max_mb=cache_cfg.get("disk_max_mb", 1024),
+        )
+
+    # Process pool that decodes (and optionally scores) long videos in segments
+    segments_cfg = cfg.get("video", {}).get("segments", {})
+    if segments_cfg.get("enabled", False):
+        from services.segments import SegmentPool
+        score_in_workers = segments_cfg.get("score_in_workers", False)
+        if cfg.get("video", {}).get("face_detection", False) and not score_in_workers:
+            # Face detection needs full-resolution frames; crop and score them
+            # in the workers so only scores cross the process boundary
+            logger.info("video.face_detection is on: scoring segments in the worker processes")
+            score_in_workers = True
+        _segments = SegmentPool(
+            workers=segments_cfg.get("workers", 0),
+            min_segment_seconds=segments_cfg.get("min_segment_seconds", 30),
+            score=score_in_workers and "video" in loaded,
+        )
+        await asyncio.get_running_loop().run_in_executor(None, _segments.start)
+
+    # Background queue for POST /jobs
+    from services.jobs import JobQueue
+    jobs_cfg = cfg.get("jobs", {})
+    _jobs = JobQueue(
+        _run_job,
+        workers=jobs_cfg.get("workers", 2),
+        max_queued=jobs_cfg.get("max_queued", 100),
+        result_ttl=jobs_cfg.get("result_ttl_seconds", 3600),
+    )
+    _jobs.start()
+
+    # Requests are served during warmup; GET /ready reports when it is over
+    _warmup.clear()
+    _warmup["status"] = "pending"
+    warmup_task = asyncio.ensure_future(_warm_up(cfg.get("warmup", {})))
+    logger.info("API started")
     yield
+    warmup_task.cancel()
+    await _jobs.stop()
+    _jobs = None
+    _cache = None
+    _admission = None
+    if _segments is not None:
+        _segments.shutdown()
+        _segments = None
+    _executor.shutdown()
+    _executor = None
     _models.clear()
 
 
@@ -532,17 +656,536 @@ app.add_middleware(
 )
 
 
-# ── Routes ──────────────────────────────────────────────────────────────
-@app.post("/analyze")
-async def analyze(
-    video: Optional[UploadFile] = File(None),
-    query: Optional[str] = Form(None),
-) -> Dict[str, Any]:
-    if video is None and query is None:
-        raise HTTPException(400, "Provide video or text.")
+# ── Uploads ─────────────────────────────────────────────────────────────
+# Allowance for multipart boundaries and form fields on top of the file itself.
+_MULTIPART_SLACK = 1024 * 1024
 
-    cfg = _models["config"]
+
+def _upload_limits() -> Dict[str, int]:
+    upload_cfg = (_models.get("config") or {}).get("upload", {})
+    return {
+        "max_bytes": int(upload_cfg.get("max_size_mb", 2048)) * 1024 * 1024,
+        "chunk_size": int(upload_cfg.get("chunk_size_kb", 1024)) * 1024,
+    }
+
+
+def _new_temp_path(filename: Optional[str]) -> str:
     backend_dir = os.path.dirname(os.path.abspath(__file__))
+    temp_os_dir = os.path.join(backend_dir, _models["config"].get("temp_dir", "data/processed"))
+    os.makedirs(temp_os_dir, exist_ok=True)
+    suffix = os.path.splitext(filename or ".mp4")[1]
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix, dir=temp_os_dir) as tmp:
+        return tmp.name
+
+
+@app.middleware("http")
+async def _reject_oversized_uploads(request: Request, call_next):
+    """Refuse bodies whose declared size is over the limit before reading them."""
+    length = request.headers.get("content-length")
+    if request.method == "POST" and length and length.isdigit() and _models.get("config"):
+        if int(length) > _upload_limits()["max_bytes"] + _MULTIPART_SLACK:
+            return JSONResponse(status_code=413, content={"detail": "Upload exceeds the size limit"})
+    return await call_next(request)
+
+
+class _LateFormFields(Exception):
+    """Form fields arrived after the video part, so the run that started on
+    the leading fields has to be redone with the complete form."""
+
+
+async def _open_form(request: Request) -> Tuple[Dict[str, str], Any]:
+    """Parse a multipart analysis form off the request stream up to its
+    ``video`` part. Returns the fields read so far (the dict keeps filling
+    in as the rest of the body is read) and a utils.uploads.StreamingForm
+    positioned at the video bytes, or None when the form has no video."""
+    from utils.uploads import MalformedForm, StreamingForm, UploadTooLarge
+
+    try:
+        form = StreamingForm(request.stream(), request.headers.get("content-type", ""),
+                             _upload_limits()["max_bytes"] + _MULTIPART_SLACK)
+        field = await form.next_file()
+    except MalformedForm as exc:
+        raise HTTPException(400, str(exc))
+    except UploadTooLarge as exc:
+        raise HTTPException(413, str(exc))
+    if field is None:
+        return form.fields, None
+    if field != "video":
+        raise HTTPException(400, f"Unexpected file field '{field}', expected 'video'.")
+    return form.fields, form
+
+
+async def _receive_video(form: Any) -> Tuple[str, Any]:
+    """Stream the form's video part to a temp file and read the rest of the
+    form. Returns the file's path and its UploadSink."""
+    from utils.uploads import MalformedForm, UploadSink, UploadTooLarge
+
+    upload_cfg = _upload_limits()
+    video_path = _new_temp_path(form.filename)
+    sink = UploadSink(video_path, upload_cfg["max_bytes"], _executor)
+    try:
+        await sink.consume(form.file_chunks(upload_cfg["chunk_size"]))
+    except BaseException as exc:
+        os.unlink(video_path)
+        if isinstance(exc, UploadTooLarge):
+            raise HTTPException(413, str(exc))
+        if isinstance(exc, MalformedForm):
+            raise HTTPException(400, str(exc))
+        raise
+    return video_path, sink
+
+
+async def _file_then_fields(form: Any, leading: Dict[str, str], chunk_size: int) -> AsyncIterator[bytes]:
+    """The form's video bytes; raises _LateFormFields at the end when fields
+    other than *leading* followed them."""
+    async for chunk in form.file_chunks(chunk_size):
+        yield chunk
+    if form.fields != leading:
+        raise _LateFormFields()
+
+
+# Form fields of /analyze, /analyze/stream and /jobs next to the ``video`` file
+_ANALYSIS_FORM = {
+    "requestBody": {"content": {"multipart/form-data": {"schema": {
+        "type": "object",
+        "properties": {
+            "video": {"type": "string", "format": "binary"},
+            "query": {"type": "string"},
+            "sampling": {"type": "string"},
+            "max_frames": {"type": "integer"},
+            "max_inference_seconds": {"type": "number"},
+            "early_exit": {"type": "boolean"},
+            "per_frame": {"type": "string", "enum": ["verbose", "compact"]},
+        },
+    }}}},
+}
+
+_TRUE_STRINGS = ("1", "true", "yes", "on")
+_FALSE_STRINGS = ("0", "false", "no", "off")
+
+
+def _form_options(fields: Dict[str, str]) -> Dict[str, Any]:
+    """Validate the analysis options of a form: ``query``, ``sampling``,
+    ``per_frame`` and the frame budget (see _frame_budget); 400 on bad values."""
+    def _number(name: str, kind: type) -> Any:
+        raw = fields.get(name)
+        if raw is None or not raw.strip():
+            return None
+        try:
+            return kind(raw)
+        except ValueError:
+            raise HTTPException(400, f"{name} must be {'an integer' if kind is int else 'a number'}.")
+
+    early_exit = (fields.get("early_exit") or "").strip().lower() or None
+    if early_exit is not None and early_exit not in _TRUE_STRINGS + _FALSE_STRINGS:
+        raise HTTPException(400, "early_exit must be a boolean.")
+    sampling = fields.get("sampling") or None
+    per_frame = fields.get("per_frame") or None
+    _check_sampling(sampling)
+    _check_per_frame(per_frame)
+    budget = _frame_budget(_number("max_frames", int), _number("max_inference_seconds", float),
+                           None if early_exit is None else early_exit in _TRUE_STRINGS)
+    return {"query": fields.get("query"), "sampling": sampling, "per_frame": per_frame, "budget": budget}
+
+
+# Multipart routes whose video uploads are admitted before the body is read
+_ADMITTED_UPLOAD_ROUTES = ("/analyze", "/analyze/stream")
+
+
+def _carries_upload(request: Request) -> bool:
+    """Whether a multipart POST is large enough to hold a file; form fields
+    alone stay under _MULTIPART_SLACK. Chunked bodies count as uploads."""
+    if request.method != "POST" or "multipart/" not in request.headers.get("content-type", ""):
+        return False
+    length = request.headers.get("content-length")
+    return not (length and length.isdigit()) or int(length) > _MULTIPART_SLACK
+
+
+@app.middleware("http")
+async def _admit_uploads(request: Request, call_next):
+    """Turn video uploads away before their body is read: 429 when the video
+    gate of /analyze or /analyze/stream is full, 503 when the job queue is.
+
+    The video reservation is left on ``request.state.upload_ticket`` for the
+    handler to take over (see _admit) and returned here if it never does.
+    """
+    if _admission is None or not _carries_upload(request):
+        return await call_next(request)
+    path = request.url.path
+    if path == "/jobs" and _jobs is not None and _jobs.full():
+        return JSONResponse(status_code=503, content={"detail": f"Job queue is full ({_jobs.max_queued} waiting)"})
+    if path not in _ADMITTED_UPLOAD_ROUTES:
+        return await call_next(request)
+
+    from services.admission import Overloaded
+
+    try:
+        ticket = _admission.admit(["video"])
+    except Overloaded as exc:
+        logger.warning("Rejected upload: %s", exc)
+        return JSONResponse(status_code=429, content={"detail": str(exc)},
+                            headers={"Retry-After": str(exc.retry_after)})
+    request.state.upload_ticket = ticket
+    try:
+        return await call_next(request)
+    finally:
+        if getattr(request.state, "upload_ticket", None) is ticket:
+            ticket.close()
+
+
+# ── Analysis pipeline ───────────────────────────────────────────────────
+def _metadata_stage(video_path: str, filename: Optional[str]) -> dict:
+    t0 = time.perf_counter()
+    metadata = extract_video_metadata(video_path)
+    metadata["original_filename"] = filename
+    logger.info("Metadata extraction %.2fs", time.perf_counter() - t0)
+    return metadata
+
+
+def _frame_limit(frame_budget: Dict[str, Any]) -> Tuple[Optional[int], Optional[str]]:
+    """Turn a frame budget into a frame count and the constraint behind it.
+    ``max_inference_seconds`` is converted with the detector's measured
+    per-frame cost and ignored until a forward pass has been timed."""
+    limit = frame_budget.get("max_frames")
+    limited_by = "max_frames" if limit else None
+    seconds = frame_budget.get("max_inference_seconds")
+    per_frame = getattr(_models.get("video"), "seconds_per_frame", None)
+    if seconds and per_frame:
+        by_time = max(1, int(seconds / per_frame))
+        if limit is None or by_time < limit:
+            limit, limited_by = by_time, "max_inference_seconds"
+    return limit, limited_by
+
+
+async def _frames_stage(video_path: str, frame_rate: float, sampling: str, metadata: dict,
+                        frame_budget: Dict[str, Any]) -> Any:
+    """Start decoding on the decode pool and hand back a bounded
+    utils.preprocessing.FrameStream right away, so the video stage scores
+    frames while later ones are still being decoded. With early exit on
+    the opencv decoder, a utils.preprocessing.SeekableFrames is returned
+    instead, which decodes only the frames the detector scores.
+
+    The sampling plan is fixed up front from the ffprobe duration and the
+    frame budget; it is attached to the stream as ``plan``.
+    """
+    from utils.preprocessing import (
+        FrameStream, SeekableFrames, iter_adaptive_frames, iter_frames, iter_frames_ffmpeg, iter_keyframes,
+        plan_sampling,
+    )
+
+    video_cfg = _models["config"].get("video", {})
+    limit, limited_by = _frame_limit(frame_budget)
+    duration = float((metadata.get("file_info") or {}).get("duration_seconds") or 0)
+    # With the ffmpeg decoder, let ffmpeg downscale to the model's input size
+    use_ffmpeg = video_cfg.get("decoder", "opencv") == "ffmpeg"
+    # Face detection needs source resolution; faces are a few pixels at model size
+    model_size = None if getattr(_models["video"], "faces", None) else getattr(_models["video"], "input_size", None)
+    size = model_size if use_ffmpeg else None
+    as_array = video_cfg.get("numpy_frames", False)
+    if sampling == "keyframes":
+        cap = min(video_cfg.get("max_keyframes", 64), limit or math.inf)
+        plan = {"strategy": "keyframes", "duration_seconds": round(duration, 2), "max_frames": cap}
+        limited_by = limited_by if cap < video_cfg.get("max_keyframes", 64) else None
+        logger.info("Extracting up to %d keyframes for ML analysis...", cap)
+        frames = iter_keyframes(video_path, cap, size, ffmpeg=_find_ffmpeg(), as_array=as_array)
+    elif sampling == "adaptive":
+        adaptive_cfg = video_cfg.get("adaptive", {})
+        cap = min(adaptive_cfg.get("budget", 64), limit or math.inf)
+        plan = {"strategy": "adaptive", "duration_seconds": round(duration, 2), "max_frames": cap}
+        limited_by = limited_by if cap < adaptive_cfg.get("budget", 64) else None
+        logger.info("Sampling up to %d frames around scene changes for ML analysis...", cap)
+        # Candidates are held until the scan ends, so keep them at model size
+        # unless face detection needs the full frame
+        frames = iter_adaptive_frames(
+            video_path,
+            budget=cap,
+            analysis_fps=adaptive_cfg.get("analysis_fps", 4.0),
+            base_fraction=adaptive_cfg.get("base_fraction", 0.25),
+            min_change=adaptive_cfg.get("min_change", 0.08),
+            size=model_size,
+        )
+        size = model_size
+    else:
+        plan = plan_sampling(duration, frame_rate, limit)
+        if plan["strategy"] != "stratified":
+            limited_by = None
+        fps = plan["fps"]
+        logger.info("Extracting frames at %.4g fps (%s, ~%s frames) for ML analysis...",
+                    fps, plan["strategy"], plan["planned_frames"])
+        segments = await _executor.run("io", _segments.plan, video_path, fps, limit) if _segments is not None else []
+        if segments:
+            # Workers downscale to the model input (when not face cropping) so
+            # only small frames cross processes
+            size = model_size
+            plan["segments"] = len(segments)
+            plan["scored_in_workers"] = _segments.score
+            logger.info("Splitting into %d segments over %d worker process(es)", len(segments), _segments.workers)
+        seekable = None
+        if frame_budget.get("early_exit") and not segments and not use_ffmpeg and model_size is not None:
+            # Early exit scores a spread subset; decode only the frames it asks for
+            try:
+                seekable = await _executor.run("io", SeekableFrames, video_path, fps, model_size, limit)
+            except RuntimeError as exc:
+                logger.info("Early exit falls back to decoding every sampled frame: %s", exc)
+        if seekable is not None:
+            plan["planned_frames"] = len(seekable)
+            frames = seekable
+        elif segments and _segments.score:
+            frames = _segments.iter_scores(video_path, segments, size, limit=limit)
+        else:
+            if segments:
+                frames = _segments.iter_frames(video_path, segments, size)
+            elif use_ffmpeg:
+                frames = iter_frames_ffmpeg(video_path, fps, size, ffmpeg=_find_ffmpeg(), as_array=as_array,
+                                            max_frames=limit)
+            else:
+                # Buffered frames are downscaled unless face detection needs them whole
+                size = model_size
+                frames = iter_frames(video_path, fps, sampling, size=size, max_frames=limit)
+    plan["limited_by"] = limited_by
+    # Scores from segment workers arrive complete; there is nothing to stop early
+    plan["early_exit"] = bool(frame_budget.get("early_exit")) and not plan.get("scored_in_workers")
+    if isinstance(frames, SeekableFrames):
+        plan["decoding"] = "on_demand"
+        frames.plan = plan
+        return frames
+
+    queue_size = video_cfg.get("frame_queue_size", 64)
+    # Source-resolution frames (face detection, opencv keyframes) are big:
+    # cap the buffered bytes as well as the frame count
+    source = metadata.get("video") or {}
+    width, height = size or (source.get("width"), source.get("height"))
+    queue_mb = video_cfg.get("frame_queue_max_mb", 256)
+    if width and height and queue_mb and not plan.get("scored_in_workers"):
+        queue_size = max(2, min(queue_size, int(queue_mb * 1024 * 1024 // (width * height * 3))))
+    stream = FrameStream(
+        maxsize=queue_size,
+        expected=plan.get("planned_frames") or 0,
+        stall_timeout=video_cfg.get("frame_queue_stall_seconds", 300),
+    )
+    stream.plan = plan
+
+    async def _decode() -> None:
+        try:
+            await _executor.run("decode", stream.feed, frames)
+        except Exception as exc:
+            logger.debug("Frame decoding failed: %s", exc)
+
+    # The consumer sees decode errors through the stream; keep a reference
+    # so the task is not garbage-collected mid-decode.
+    stream.producer = asyncio.ensure_future(_decode())
+    return stream
+
+
+def _video_stage(frames: Any, frame_rate: float, progress: Optional[Callable[[str, Any], None]],
+                 per_frame_format: str = "verbose") -> dict:
+    t0 = time.perf_counter()
+    try:
+        video_analysis = _score_frames(frames, frames.plan.get("fps") or frame_rate, progress, per_frame_format)
+    finally:
+        frames.close()
+    video_analysis["sampling_plan"] = frames.plan
+    logger.info("Video ML inference done in %.2fs — label=%s confidence=%.4f",
+                time.perf_counter() - t0,
+                video_analysis.get("label"),
+                video_analysis.get("confidence", 0))
+    return video_analysis
+
+
+def _real_scores(scores: np.ndarray, labels: List[str]) -> np.ndarray:
+    """Per-frame authenticity: the "Real" column, else each frame's top probability."""
+    for name in ("Real", "real"):
+        if name in labels:
+            return scores[:, labels.index(name)]
+    return scores.max(axis=1) if scores.size else np.full(len(scores), 0.5, dtype=np.float32)
+
+
+def _encode_video_analysis(video_analysis: Optional[dict], per_frame_format: str) -> Optional[dict]:
+    """Copy of a detector result with ``per_frame`` in the response format
+    (see utils.postprocessing.encode_per_frame)."""
+    from utils.postprocessing import encode_per_frame
+
+    if not video_analysis or not isinstance(video_analysis.get("per_frame"), np.ndarray):
+        return video_analysis
+    encoded = {k: v for k, v in video_analysis.items() if k != "labels"}
+    encoded["per_frame"] = encode_per_frame(video_analysis["per_frame"], video_analysis["labels"], per_frame_format)
+    if isinstance(encoded.get("frame_indices"), np.ndarray):
+        encoded["frame_indices"] = encoded["frame_indices"].tolist()
+    return encoded
+
+
+def _score_frames(frames: Any, frame_rate: float, progress: Optional[Callable[[str, Any], None]],
+                  per_frame_format: str = "verbose") -> dict:
+    from utils.postprocessing import encode_per_frame
+
+    # Segment workers hand back scores rather than frames
+    score = _models["video"].merge_scores if frames.plan.get("scored_in_workers") else _models["video"].predict
+    if frames.plan.get("early_exit"):
+        score = functools.partial(score, early_exit=True)
+    if progress is None:
+        return score(frames)
+
+    labels = getattr(_models["video"], "labels", [])
+
+    def _on_batch(start: int, scores: np.ndarray, indices: np.ndarray) -> None:
+        # *indices* are sampled-frame positions, so faceless frames don't shift time
+        progress("frames", {
+            "start": start,
+            "total": max(frames.expected, start + len(scores)),
+            "per_frame": encode_per_frame(scores, labels, per_frame_format),
+            "frame_indices": indices.tolist(),
+            "drift_point": {"t": f"{int(indices[0] / frame_rate)}s", "v": int(_real_scores(scores, labels).mean() * 100)},
+        })
+
+    return score(frames, on_batch=_on_batch)
+
+
+def _audio_file_stage(video_path: str, audio_dir: str) -> str:
+    from utils.preprocessing import extract_audio
+    return extract_audio(video_path, audio_dir)
+
+
+def _audio_stage(audio_file: str) -> dict:
+    try:
+        return _models["audio"].predict(audio_file)
+    finally:
+        # Clean up audio temp file
+        try:
+            os.unlink(audio_file)
+        except OSError:
+            pass
+
+
+def _text_stage(query: str) -> dict:
+    t0 = time.perf_counter()
+    text_analysis = _models["text"].predict(query)
+    logger.info("Text ML inference done in %.2fs — label=%s",
+                time.perf_counter() - t0, text_analysis.get("label"))
+    return text_analysis
+
+
+def _articles_stage(query: str) -> list:
+    t0 = time.perf_counter()
+    related_articles = _models["faiss"].search(query)
+    logger.info("FAISS search done in %.2fs — %d articles",
+                time.perf_counter() - t0, len(related_articles) if related_articles else 0)
+    return related_articles
+
+
+def _inference_pool(model_key: str) -> str:
+    """Models with a micro-batcher do their compute on the batcher thread, so
+    callers only need a cheap waiting slot rather than an inference worker."""
+    return "batch" if getattr(_models.get(model_key), "batcher", None) else "inference"
+
+
+def _build_stages(has_video: bool, has_query: bool, streaming: bool = False,
+                  gate_text: bool = False) -> list:
+    """Declare the /analyze DAG. Context inputs: video_path, filename,
+    frame_rate, sampling, frame_budget, per_frame_format, audio_dir, query,
+    progress.
+
+    With *streaming*, the caller adds ``upload_head`` / ``upload`` stages that
+    finish when the container header / whole file are on disk; ffprobe only
+    waits for the former. *gate_text* also holds the text stages until the
+    upload is done, so a result-cache hit can skip them.
+    """
+    from services.pipeline import Stage
+
+    head = ("upload_head",) if streaming else ()
+    body = ("upload",) if streaming else ()
+    text_after = body if gate_text and has_video else ()
+    stages = []
+    if has_video:
+        stages += [
+            Stage("metadata", _metadata_stage, ("video_path", "filename"), pool="io", after=head),
+            Stage("risk", _compute_risk_score, ("metadata",)),
+            Stage("frames", _frames_stage, ("video_path", "frame_rate", "sampling", "metadata", "frame_budget"),
+                  transient=True, after=body, gate="video"),
+            Stage("video", _video_stage, ("frames", "frame_rate", "progress", "per_frame_format"),
+                  pool=_inference_pool("video"), gate="video"),
+            Stage("audio_file", _audio_file_stage, ("video_path", "audio_dir"), pool="io", transient=True,
+                  after=body),
+            Stage("audio", _audio_stage, ("audio_file",), pool="inference"),
+        ]
+    if has_query:
+        stages += [
+            Stage("text", _text_stage, ("query",), pool=_inference_pool("text"), after=text_after,
+                  gate="text"),
+            Stage("articles", _articles_stage, ("query",), pool="inference", after=text_after,
+                  gate="search"),
+        ]
+    return stages
+
+
+def _merge_video_risk(risk_assessment: dict, video_analysis: Optional[dict]) -> dict:
+    """Fold the ML deepfake verdict into the metadata risk assessment."""
+    if video_analysis and video_analysis.get("label") == "fake":
+        fake_conf = video_analysis.get("confidence", 0)
+        # Reduce authenticity score based on ML fake confidence
+        ml_penalty = int(fake_conf * 60)  # Up to 60 point penalty
+        risk_assessment["authenticity_score"] = max(0, risk_assessment["authenticity_score"] - ml_penalty)
+        risk_assessment["flags"].append({
+            "label": "Deepfake Detected (ML)",
+            "detail": f"Model confidence: {fake_conf:.1%}",
+            "severity": "critical" if fake_conf > 0.7 else "high"
+        })
+        risk_assessment["flag_count"] = len(risk_assessment["flags"])
+        # Recalculate risk level
+        s = risk_assessment["authenticity_score"]
+        risk_assessment["risk_level"] = "low" if s >= 70 else "medium" if s >= 40 else "high"
+    return risk_assessment
+
+
+def _compute_drift(video_path: str, metadata: dict, video_analysis: Optional[dict],
+                   risk_assessment: Optional[dict]) -> list:
+    duration = metadata.get("file_info", {}).get("duration_seconds", 0)
+    drift_data = []
+    # Use real per-frame scores for drift if available
+    per_frame = (video_analysis or {}).get("per_frame")
+    if isinstance(per_frame, np.ndarray) and len(per_frame) and duration > 0:
+        # "Real" probability (or each frame's top probability), averaged over
+        # up to 20 equal chunks of frames
+        real = _real_scores(per_frame, video_analysis["labels"]).astype(np.float64)
+        chunk_size = max(1, len(real) // min(20, len(real)))
+        starts = np.arange(0, len(real), chunk_size)
+        means = np.add.reduceat(real, starts) / np.diff(np.append(starts, len(real)))
+        # Rows may skip sampled frames (face detection, early exit): place
+        # each chunk by the sampled frame it starts at
+        positions, sampled = starts, len(real)
+        if video_analysis.get("frame_indices") is not None and video_analysis.get("frames_sampled"):
+            positions = np.asarray(video_analysis["frame_indices"])[starts]
+            sampled = video_analysis["frames_sampled"]
+        for position, avg_real in zip(positions.tolist(), means.tolist()):
+            t_sec = int((position / sampled) * duration)
+            drift_data.append({"t": f"{t_sec}s", "v": int(avg_real * 100)})
+    if not drift_data:
+        drift_data = _generate_drift_data(video_path, duration, {"risk_assessment": risk_assessment})
+    return drift_data
+
+
+def _text_risk(text_analysis: dict) -> dict:
+    """Risk assessment for text-only requests."""
+    ai_prob = text_analysis.get("ai_probability", 0)
+    score = max(0, int((1 - ai_prob) * 100))
+    flags = []
+    if text_analysis.get("label") == "ai-generated":
+        flags.append({
+            "label": "AI-Generated Text Detected",
+            "detail": f"AI probability: {ai_prob:.1%}",
+            "severity": "critical" if ai_prob > 0.8 else "high"
+        })
+    risk_level = "low" if score >= 70 else "medium" if score >= 40 else "high"
+    return {
+        "authenticity_score": score,
+        "risk_level": risk_level,
+        "flags": flags,
+        "flag_count": len(flags),
+    }
+
+
+def _assemble_report(run: Any, video_path: Optional[str], has_query: bool,
+                     per_frame_format: str = "verbose") -> Dict[str, Any]:
+    """Join the stage results into the /analyze report."""
     metadata = {}
     risk_assessment = None
     drift_data = []
@@ -551,147 +1194,41 @@ async def analyze(
     text_analysis = None
     related_articles = None
 
-    # ── Video Processing ────────────────────────────────────────────────
-    if video is not None:
-        temp_os_dir = os.path.join(backend_dir, cfg.get("temp_dir", "data/processed"))
-        os.makedirs(temp_os_dir, exist_ok=True)
-        suffix = os.path.splitext(video.filename or ".mp4")[1]
+    # ── Video branch ────────────────────────────────────────────────────
+    if video_path is not None:
+        if "metadata" in run.errors:
+            logger.error("Analysis error: %s", run.errors["metadata"])
+            metadata = {"error": str(run.errors["metadata"])}
+        else:
+            metadata = run.get("metadata")
 
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix, dir=temp_os_dir) as tmp:
-            tmp.write(await video.read())
-            video_path = tmp.name
-
-        try:
-            # --- Metadata extraction ---
-            t0 = time.perf_counter()
-            metadata = extract_video_metadata(video_path)
-            metadata["original_filename"] = video.filename
-            logger.info("Metadata extraction %.2fs", time.perf_counter() - t0)
-
-            # --- ML deepfake detection on frames ---
-            try:
-                from utils.preprocessing import extract_frames
-                frame_rate = cfg.get("video", {}).get("frame_sample_rate", 1)
-                logger.info("Extracting frames at %s fps for ML analysis...", frame_rate)
-                frames = extract_frames(video_path, target_fps=frame_rate)
-
-                t0 = time.perf_counter()
-                video_analysis = _models["video"].predict(frames)
-                logger.info("Video ML inference done in %.2fs — label=%s confidence=%.4f",
-                            time.perf_counter() - t0,
-                            video_analysis.get("label"),
-                            video_analysis.get("confidence", 0))
-            except Exception as exc:
+            if "video" in run.errors:
+                exc = run.errors["video"]
                 logger.error("Video ML inference failed: %s", exc)
                 video_analysis = {"label": "unknown", "confidence": 0.0, "error": str(exc)}
+            else:
+                video_analysis = run.get("video")
 
-            # --- Audio analysis (stub for now) ---
-            try:
-                from utils.preprocessing import extract_audio
-                audio_dir = os.path.join(backend_dir, "data", "processed")
-                audio_path = extract_audio(video_path, audio_dir)
-                audio_analysis = _models["audio"].predict(audio_path)
-                # Clean up audio temp file
-                try:
-                    os.unlink(audio_path)
-                except OSError:
-                    pass
-            except Exception as exc:
-                logger.warning("Audio analysis skipped: %s", exc)
-
-            # --- Metadata-based risk assessment ---
-            risk_assessment = _compute_risk_score(metadata)
-
-            # --- Merge ML results into risk score ---
-            if video_analysis and video_analysis.get("label") == "fake":
-                fake_conf = video_analysis.get("confidence", 0)
-                # Reduce authenticity score based on ML fake confidence
-                ml_penalty = int(fake_conf * 60)  # Up to 60 point penalty
-                risk_assessment["authenticity_score"] = max(0, risk_assessment["authenticity_score"] - ml_penalty)
-                risk_assessment["flags"].append({
-                    "label": "Deepfake Detected (ML)",
-                    "detail": f"Model confidence: {fake_conf:.1%}",
-                    "severity": "critical" if fake_conf > 0.7 else "high"
-                })
-                risk_assessment["flag_count"] = len(risk_assessment["flags"])
-                # Recalculate risk level
-                s = risk_assessment["authenticity_score"]
-                risk_assessment["risk_level"] = "low" if s >= 70 else "medium" if s >= 40 else "high"
-
-            # --- Drift Analysis ---
-            duration = metadata.get("file_info", {}).get("duration_seconds", 0)
-            # Use real per-frame scores for drift if available
-            if video_analysis and "per_frame" in video_analysis:
-                per_frame = video_analysis["per_frame"]
-                if per_frame and duration > 0:
-                    num_points = min(20, len(per_frame))
-                    chunk_size = max(1, len(per_frame) // num_points)
-                    drift_data = []
-                    for i in range(0, len(per_frame), chunk_size):
-                        chunk = per_frame[i:i+chunk_size]
-                        # Get real score — prefer "Real" probability, fallback to highest
-                        scores = []
-                        for f in chunk:
-                            real_prob = f.get("Real", f.get("real", None))
-                            if real_prob is None:
-                                # Take the max value as authenticity proxy
-                                real_prob = max(f.values()) if f else 0.5
-                            scores.append(real_prob)
-                        avg_real = sum(scores) / len(scores) if scores else 0.5
-                        t_sec = int((i / len(per_frame)) * duration)
-                        drift_data.append({"t": f"{t_sec}s", "v": int(avg_real * 100)})
-            if not drift_data:
-                drift_data = _generate_drift_data(video_path, duration, {"risk_assessment": risk_assessment})
+            if "audio" in run.errors:
+                logger.warning("Audio analysis skipped: %s", run.errors["audio"])
+            else:
+                audio_analysis = run.get("audio")
 
-        except Exception as exc:
-            logger.error("Analysis error: %s", exc)
-            metadata = {"error": str(exc)}
+            risk_assessment = _merge_video_risk(run.get("risk"), video_analysis)
+            drift_data = _compute_drift(video_path, metadata, video_analysis, risk_assessment)
+            video_analysis = _encode_video_analysis(video_analysis, per_frame_format)
 
-        finally:
-            try:
-                os.unlink(video_path)
-            except OSError:
-                pass
-
-    # ── Text / FAISS Processing ─────────────────────────────────────────
-    if query is not None and query.strip():
-        # AI-text detection
-        try:
-            t0 = time.perf_counter()
-            text_analysis = _models["text"].predict(query)
-            logger.info("Text ML inference done in %.2fs — label=%s",
-                        time.perf_counter() - t0, text_analysis.get("label"))
-        except Exception as exc:
-            logger.error("Text ML inference failed: %s", exc)
-            text_analysis = {"label": "unknown", "confidence": 0.0, "error": str(exc)}
-
-        # Fact-check article search
-        try:
-            t0 = time.perf_counter()
-            related_articles = _models["faiss"].search(query)
-            logger.info("FAISS search done in %.2fs — %d articles",
-                        time.perf_counter() - t0, len(related_articles) if related_articles else 0)
-        except Exception as exc:
-            logger.error("FAISS search failed: %s", exc)
+    # ── Text branch ─────────────────────────────────────────────────────
+    if has_query:
+        if "text" in run.errors:
+            text_analysis = {"label": "unknown", "confidence": 0.0, "error": str(run.errors["text"])}
+        else:
+            text_analysis = run.get("text")
+        related_articles = run.get("articles")
 
         # If text-only (no video), generate risk assessment from text analysis
-        if video is None and text_analysis:
-            ai_prob = text_analysis.get("ai_probability", 0)
-            score = max(0, int((1 - ai_prob) * 100))
-            flags = []
-            if text_analysis.get("label") == "ai-generated":
-                flags.append({
-                    "label": "AI-Generated Text Detected",
-                    "detail": f"AI probability: {ai_prob:.1%}",
-                    "severity": "critical" if ai_prob > 0.8 else "high"
-                })
-            risk_level = "low" if score >= 70 else "medium" if score >= 40 else "high"
-            risk_assessment = {
-                "authenticity_score": score,
-                "risk_level": risk_level,
-                "flags": flags,
-                "flag_count": len(flags),
-            }
+        if video_path is None and text_analysis:
+            risk_assessment = _text_risk(text_analysis)
 
     # ── Build summary text ──────────────────────────────────────────────
     summary_parts = []
@@ -708,7 +1245,7 @@ async def analyze(
     summary = " | ".join(summary_parts) if summary_parts else "Analysis complete"
 
     # ── Report Generation ───────────────────────────────────────────────
-    report: Dict[str, Any] = {
+    return {
         "summary": summary,
         "analyzed_at": datetime.now(timezone.utc).isoformat(),
         "score": risk_assessment["authenticity_score"] if risk_assessment else 85,
@@ -723,19 +1260,653 @@ async def analyze(
         "models_used": "real" if _models.get("_real") else "stub",
     }
 
-    # Log to Supabase
+
+def _cache_key(content_hash: str, query: Optional[str], options: Optional[Dict[str, Any]] = None) -> str:
+    """Key a report by upload bytes, query, per-request options (frame
+    sampling and budget), model versions and model config."""
+    cfg = _models.get("config") or {}
+    fingerprint = {
+        "content": content_hash,
+        "query": (query or "").strip(),
+        "options": options or {},
+        "models": {
+            key: getattr(_models.get(key), "model_name", type(_models.get(key)).__name__)
+            for key in ("video", "audio", "text", "faiss")
+        },
+        "config": {key: cfg.get(key) for key in ("device", "video", "audio", "text", "retrieval")},
+    }
+    return hashlib.sha256(json.dumps(fingerprint, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+async def _cached_report(content_hash: str, query: Optional[str], options: Dict[str, Any],
+                         filename: Optional[str]) -> Optional[Dict[str, Any]]:
+    if _cache is None:
+        return None
+    report = await _executor.run("io", _cache.get, _cache_key(content_hash, query, options))
+    if report is None:
+        return None
+    logger.info("Result cache hit for %s (sha256=%s…)", filename, content_hash[:12])
+    if isinstance(report.get("metadata"), dict):
+        report["metadata"]["original_filename"] = filename
+    return report
+
+
+async def _log_report(report: Dict[str, Any], filename: Optional[str], is_video: bool) -> None:
     await _log_to_supabase("analysis_logs", {
-        "file_name": video.filename if video else "text_query",
-        "file_type": "video" if video else "text",
+        "file_name": filename if is_video else "text_query",
+        "file_type": "video" if is_video else "text",
         "score": report["score"],
         "risk_level": report["risk_level"],
         "summary": report["summary"],
-        "metadata": json.dumps(metadata) if metadata else None,
+        "metadata": json.dumps(report["metadata"]) if report["metadata"] else None,
     })
 
+
+# Stage name → server-sent event name for /analyze/stream
+_STREAM_EVENTS = {
+    "metadata": "metadata",
+    "risk": "risk",
+    "video": "video",
+    "audio": "audio",
+    "text": "text",
+    "articles": "articles",
+}
+
+
+def _check_sampling(sampling: Optional[str]) -> None:
+    from utils.preprocessing import SAMPLING_MODES
+    if sampling is not None and sampling not in SAMPLING_MODES:
+        raise HTTPException(400, f"Unknown sampling mode '{sampling}', expected one of {', '.join(SAMPLING_MODES)}.")
+
+
+def _check_per_frame(per_frame: Optional[str]) -> None:
+    from utils.postprocessing import PER_FRAME_FORMATS
+    if per_frame is not None and per_frame not in PER_FRAME_FORMATS:
+        raise HTTPException(400, f"Unknown per_frame format '{per_frame}', expected one of {', '.join(PER_FRAME_FORMATS)}.")
+
+
+def _frame_budget(max_frames: Optional[int] = None,
+                  max_inference_seconds: Optional[float] = None,
+                  early_exit: Optional[bool] = None) -> Dict[str, Any]:
+    """Combine per-request limits with ``video.budget``; the stricter wins.
+    *early_exit* defaults to ``video.early_exit.enabled``."""
+    video_cfg = _models["config"].get("video", {})
+    budget_cfg = video_cfg.get("budget", {})
+    budget: Dict[str, Any] = {}
+    for key, requested in (("max_frames", max_frames), ("max_inference_seconds", max_inference_seconds)):
+        if requested is not None and requested <= 0:
+            raise HTTPException(400, f"{key} must be positive.")
+        limits = [v for v in (requested, budget_cfg.get(key)) if v]
+        budget[key] = min(limits) if limits else None
+    if early_exit is None:
+        early_exit = video_cfg.get("early_exit", {}).get("enabled", False)
+    budget["early_exit"] = bool(early_exit)
+    return budget
+
+
+def _admit(has_video: bool, has_query: bool, force: bool = False, request: Optional[Request] = None) -> Any:
+    """Reserve queue places for the gated stages a request will run, or
+    refuse it with 429 and a Retry-After hint when any of them is full.
+
+    An upload the _admit_uploads middleware already admitted on the video
+    gate is taken over from *request*; its text stages then only wait for a
+    slot, as refusing them now would waste the upload."""
+    from services.admission import Overloaded
+
+    stages = (["video"] if has_video else []) + (["text", "search"] if has_query else [])
+    ticket = None
+    if request is not None:
+        ticket = getattr(request.state, "upload_ticket", None)
+        request.state.upload_ticket = None
+    if ticket is not None:
+        if not has_video:
+            ticket.drop("video")
+        force = force or has_video
+    try:
+        return _admission.admit(stages, force=force, ticket=ticket)
+    except Overloaded as exc:
+        if ticket is not None:
+            ticket.close()
+        logger.warning("Rejected request: %s", exc)
+        raise HTTPException(429, str(exc), headers={"Retry-After": str(exc.retry_after)})
+
+
+async def _run_analysis(video_path: Optional[str], filename: Optional[str],
+                        query: Optional[str], sink: Any = None,
+                        chunks: Optional[AsyncIterator[bytes]] = None,
+                        content_hash: Optional[str] = None,
+                        on_event: Optional[Callable[[str, Any], None]] = None,
+                        ticket: Any = None, sampling: Optional[str] = None,
+                        frame_budget: Optional[Dict[str, Any]] = None,
+                        per_frame_format: Optional[str] = None) -> Dict[str, Any]:
+    """Run the stage DAG for a video and/or a text query.
+
+    If *sink* (a utils.uploads.UploadSink) and *chunks* are given, the upload
+    is streamed to *video_path* as part of the run and header-only stages
+    start as soon as the container index has been written. Video reports are
+    served from the result cache when the same bytes (*content_hash*, or the
+    hash computed while streaming) were analyzed before.
+
+    *on_event(name, data)* receives partial results as stages complete (see
+    _STREAM_EVENTS) plus per-batch frame scores; it may be called from
+    worker threads. *ticket* (from _admit) gates the heavy stages.
+    *sampling* overrides ``video.frame_sampling`` for this run and
+    *frame_budget* (from _frame_budget) caps the frames scored.
+    *per_frame_format* overrides ``video.per_frame_format``.
+    """
+    from services.pipeline import ShortCircuit, Stage, StageGraph
+    from utils.uploads import UploadTooLarge
+
+    cfg = _models["config"]
+    backend_dir = os.path.dirname(os.path.abspath(__file__))
+    has_query = query is not None and bool(query.strip())
+    sampling = sampling or cfg.get("video", {}).get("frame_sampling", "auto")
+    frame_budget = frame_budget or _frame_budget()
+    per_frame_format = per_frame_format or cfg.get("video", {}).get("per_frame_format", "verbose")
+    options = {"sampling": sampling, **frame_budget, "per_frame_format": per_frame_format}
+
+    if video_path is not None and content_hash is not None:
+        cached = await _cached_report(content_hash, query, options, filename)
+        if cached is not None:
+            await _log_report(cached, filename, True)
+            return cached
+
+    context = {
+        "video_path": video_path,
+        "filename": filename,
+        "frame_rate": cfg.get("video", {}).get("frame_sample_rate", 1),
+        "sampling": sampling,
+        "frame_budget": frame_budget,
+        "per_frame_format": per_frame_format,
+        "audio_dir": os.path.join(backend_dir, "data", "processed"),
+        "query": query,
+        "progress": on_event,
+    }
+    stages = _build_stages(video_path is not None, has_query, streaming=sink is not None,
+                           gate_text=_cache is not None)
+    if sink is not None:
+        async def _upload() -> int:
+            written = await sink.consume(chunks)
+            cached = await _cached_report(sink.sha256, query, options, filename)
+            if cached is not None:
+                raise ShortCircuit(cached)
+            return written
+
+        async def _upload_head() -> None:
+            await sink.head_ready.wait()
+
+        stages += [Stage("upload", _upload), Stage("upload_head", _upload_head)]
+
+    def _emit_stage(name: str, result: Any) -> None:
+        if name == "video":
+            result = _encode_video_analysis(result, per_frame_format)
+        if name in _STREAM_EVENTS:
+            on_event(_STREAM_EVENTS[name], result)
+
+    graph = StageGraph(stages)
+    run = await graph.run(context, _executor, on_complete=_emit_stage if on_event is not None else None,
+                          gates=ticket)
+
+    if "upload" in run.errors:
+        exc = run.errors["upload"]
+        if isinstance(exc, ShortCircuit):
+            await _log_report(exc.value, filename, True)
+            return exc.value
+        if isinstance(exc, _LateFormFields):
+            raise exc
+        if isinstance(exc, UploadTooLarge):
+            raise HTTPException(413, str(exc))
+        raise HTTPException(400, f"Upload failed: {exc}")
+    if sink is not None and isinstance(run.get("metadata"), dict):
+        # ffprobe may have read the file before the upload finished
+        file_info = run.get("metadata").get("file_info")
+        if file_info:
+            file_info["file_size_bytes"] = sink.written
+            file_info["file_size_mb"] = round(sink.written / (1024 * 1024), 2)
+
+    report = _assemble_report(run, video_path, has_query, per_frame_format)
+
+    content_hash = content_hash or (sink.sha256 if sink is not None else None)
+    clean = not any(name in run.errors for name in ("metadata", "frames", "video", "text", "articles"))
+    if _cache is not None and video_path is not None and content_hash and clean:
+        try:
+            await _executor.run("io", _cache.put, _cache_key(content_hash, query, options), report)
+        except Exception as exc:
+            # The report is done; failing to cache it must not fail the request
+            logger.warning("Could not cache report for %s: %s", filename, exc)
+
+    await _log_report(report, filename, video_path is not None)
     return report
 
 
+async def _run_job(video_path: Optional[str], filename: Optional[str], query: Optional[str],
+                   content_hash: Optional[str] = None, sampling: Optional[str] = None,
+                   frame_budget: Optional[Dict[str, Any]] = None,
+                   per_frame_format: Optional[str] = None) -> Dict[str, Any]:
+    """JobQueue runner. Jobs were accepted when queued, so they are admitted
+    regardless of queue depth and simply wait for a free slot."""
+    has_query = query is not None and bool(query.strip())
+    ticket = _admit(video_path is not None, has_query, force=True)
+    try:
+        return await _run_analysis(video_path, filename, query, content_hash=content_hash, ticket=ticket,
+                                   sampling=sampling, frame_budget=frame_budget,
+                                   per_frame_format=per_frame_format)
+    finally:
+        ticket.close()
+
+
+# ── Bulk text scoring ───────────────────────────────────────────────────
+def _parse_bulk_item(raw: Any) -> Tuple[Any, Optional[str], Optional[str]]:
+    """Normalize one bulk entry to (id, text, error). Entries are either a
+    plain string or an object with "text" and an optional "id"."""
+    if isinstance(raw, bytes):
+        try:
+            raw = json.loads(raw)
+        except ValueError:
+            return None, None, "Invalid JSON line"
+    if isinstance(raw, str):
+        return None, raw, None
+    if isinstance(raw, dict) and isinstance(raw.get("text"), str):
+        return raw.get("id"), raw["text"], None
+    return (raw.get("id") if isinstance(raw, dict) else None), None, 'Expected a string or {"text": ...}'
+
+
+async def _iter_ndjson(stream: AsyncIterator[bytes]) -> AsyncIterator[Tuple[Any, Optional[str], Optional[str]]]:
+    buffer = b""
+    async for chunk in stream:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield _parse_bulk_item(line)
+    if buffer.strip():
+        yield _parse_bulk_item(buffer)
+
+
+def _predict_texts(texts: List[str]) -> List[dict]:
+    model = _models["text"]
+    if hasattr(model, "predict_batch"):
+        return model.predict_batch(texts)
+    return [model.predict(t) for t in texts]
+
+
+def _search_texts(texts: List[str], k: int) -> List[list]:
+    faiss = _models["faiss"]
+    if hasattr(faiss, "search_batch"):
+        return faiss.search_batch(texts, k=k)
+    return [faiss.search(t, k=k) if t.strip() else [] for t in texts]
+
+
+async def _score_bulk_chunk(chunk: list, k: int) -> List[str]:
+    texts = [text or "" for _, _, text, _ in chunk]
+    t0 = time.perf_counter()
+    # One after the other, so a bulk chunk holds a single inference worker
+    # and interactive requests keep the rest
+    analyses: Any
+    articles: Any
+    try:
+        analyses = await _executor.run("inference", _predict_texts, texts)
+    except Exception as exc:
+        analyses = exc
+    try:
+        articles = await _executor.run("inference", _search_texts, texts, k)
+    except Exception as exc:
+        articles = exc
+    logger.info("Bulk text chunk of %d scored in %.2fs", len(chunk), time.perf_counter() - t0)
+
+    lines = []
+    for pos, (index, item_id, text, error) in enumerate(chunk):
+        row: Dict[str, Any] = {"index": index, "id": item_id}
+        if error is not None:
+            row["error"] = error
+        else:
+            row["text_analysis"] = (
+                {"label": "unknown", "confidence": 0.0, "error": str(analyses)}
+                if isinstance(analyses, BaseException) else analyses[pos]
+            )
+            row["related_articles"] = [] if isinstance(articles, BaseException) else articles[pos]
+        lines.append(json.dumps(row) + "\n")
+    return lines
+
+
+async def _bulk_text_results(items: List[Tuple[Any, Optional[str], Optional[str]]],
+                             chunk_size: int, k: int, ticket: Any) -> AsyncIterator[str]:
+    """Score *items* chunk by chunk, holding the text and search gates only
+    while a chunk is in flight so interactive requests can interleave."""
+    try:
+        for start in range(0, len(items), chunk_size):
+            chunk = [(start + i, *item) for i, item in enumerate(items[start:start + chunk_size])]
+            await ticket.acquire("text")
+            await ticket.acquire("search")
+            try:
+                lines = await _score_bulk_chunk(chunk, k)
+            finally:
+                ticket.release("search")
+                ticket.release("text")
+            for line in lines:
+                yield line
+    finally:
+        ticket.close()
+
+
+async def _capped_body(stream: AsyncIterator[bytes], max_bytes: int) -> AsyncIterator[bytes]:
+    """Pass *stream* through, failing with 413 once it exceeds *max_bytes*.
+    Chunked requests carry no Content-Length for the middleware to check."""
+    received = 0
+    async for chunk in stream:
+        received += len(chunk)
+        if received > max_bytes:
+            raise HTTPException(413, f"Bulk body exceeds {max_bytes // (1024 * 1024)} MB.")
+        yield chunk
+
+
+async def _read_bulk_items(request: Request) -> List[Tuple[Any, Optional[str], Optional[str]]]:
+    """Parse the bulk body; 413 once it has more than ``text.bulk_max_items``
+    entries or ``text.bulk_max_mb`` megabytes."""
+    text_cfg = _models["config"].get("text", {})
+    max_items = int(text_cfg.get("bulk_max_items", 10000))
+    body_stream = _capped_body(request.stream(), int(text_cfg.get("bulk_max_mb", 16)) * 1024 * 1024)
+    too_many = HTTPException(413, f"Bulk requests are limited to {max_items} entries.")
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type or "jsonlines" in content_type:
+        # The body has to be drained before the response starts: once it is
+        # streaming, Starlette listens on the same channel for disconnects.
+        items = []
+        async for item in _iter_ndjson(body_stream):
+            if len(items) == max_items:
+                raise too_many
+            items.append(item)
+    else:
+        try:
+            body = json.loads(b"".join([chunk async for chunk in body_stream]))
+        except ValueError:
+            raise HTTPException(400, "Body must be a JSON array or NDJSON.")
+        if isinstance(body, dict):
+            body = body.get("texts")
+        if not isinstance(body, list):
+            raise HTTPException(400, 'Expected a JSON array or {"texts": [...]}.')
+        if len(body) > max_items:
+            raise too_many
+        items = [_parse_bulk_item(raw) for raw in body]
+    return items
+
+
+# ── Routes ──────────────────────────────────────────────────────────────
+@app.post("/analyze", openapi_extra=_ANALYSIS_FORM)
+async def analyze(request: Request) -> Dict[str, Any]:
+    """Analyze an uploaded video and/or text query (multipart form with a
+    ``video`` file and ``query``). *sampling* overrides
+    ``video.frame_sampling`` (e.g. ``keyframes`` for a quick first pass);
+    *max_frames* / *max_inference_seconds* tighten ``video.budget``;
+    *early_exit* overrides ``video.early_exit.enabled`` and *per_frame*
+    (``verbose`` or ``compact``) ``video.per_frame_format``.
+
+    The video is parsed off the request stream straight to disk and the
+    analysis starts while it arrives, using the fields sent before it. Fields
+    sent after the video are honored by rerunning once the upload is done.
+    """
+    fields, form = await _open_form(request)
+    options = _form_options(fields)
+    query = options["query"]
+    if form is None and query is None:
+        raise HTTPException(400, "Provide video or text.")
+
+    ticket = _admit(form is not None, bool(query and query.strip()), request=request)
+    if form is None:
+        async with ticket:
+            return await _run_analysis(None, None, query, ticket=ticket, per_frame_format=options["per_frame"])
+
+    from utils.uploads import UploadSink
+
+    upload_cfg = _upload_limits()
+    video_path = _new_temp_path(form.filename)
+    sink = UploadSink(video_path, upload_cfg["max_bytes"], _executor)
+    chunks = _file_then_fields(form, dict(fields), upload_cfg["chunk_size"])
+    try:
+        try:
+            return await _run_analysis(video_path, form.filename, query, sink=sink, chunks=chunks,
+                                       ticket=ticket, sampling=options["sampling"],
+                                       frame_budget=options["budget"], per_frame_format=options["per_frame"])
+        except _LateFormFields:
+            pass
+        options = _form_options(fields)
+        query = options["query"]
+        if query and query.strip():
+            _admission.admit(["text", "search"], force=True, ticket=ticket)
+        return await _run_analysis(video_path, form.filename, query, content_hash=sink.sha256,
+                                   ticket=ticket, sampling=options["sampling"],
+                                   frame_budget=options["budget"], per_frame_format=options["per_frame"])
+    finally:
+        ticket.close()
+        try:
+            os.unlink(video_path)
+        except OSError:
+            pass
+
+
+@app.post("/analyze/raw")
+async def analyze_raw(
+    request: Request,
+    filename: str = "upload.mp4",
+    query: Optional[str] = None,
+    sampling: Optional[str] = None,
+    max_frames: Optional[int] = None,
+    max_inference_seconds: Optional[float] = None,
+    early_exit: Optional[bool] = None,
+    per_frame: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Analyze a video sent as the raw request body (no multipart framing).
+
+    The body is streamed to disk as it arrives, so for fast-start MP4 and
+    Matroska/WebM uploads metadata extraction begins before the upload ends.
+    """
+    from utils.uploads import UploadSink
+
+    _check_sampling(sampling)
+    _check_per_frame(per_frame)
+    budget = _frame_budget(max_frames, max_inference_seconds, early_exit)
+    # Refuse before reading the body so a saturated server sheds load cheaply
+    ticket = _admit(True, bool(query and query.strip()))
+    upload_cfg = _upload_limits()
+    video_path = _new_temp_path(filename)
+    sink = UploadSink(video_path, upload_cfg["max_bytes"], _executor)
+    try:
+        return await _run_analysis(video_path, filename, query, sink=sink, chunks=request.stream(),
+                                   ticket=ticket, sampling=sampling, frame_budget=budget,
+                                   per_frame_format=per_frame)
+    finally:
+        ticket.close()
+        try:
+            os.unlink(video_path)
+        except OSError:
+            pass
+
+
+@app.post("/analyze/stream", openapi_extra=_ANALYSIS_FORM)
+async def analyze_stream(request: Request) -> StreamingResponse:
+    """Server-sent-events variant of /analyze, taking the same form.
+
+    Emits ``metadata`` and ``risk`` (metadata-only assessment) as soon as
+    ffprobe is done, ``frames`` for every scored batch of frames (with a
+    provisional drift point), then ``video``, ``audio``, ``text`` and
+    ``articles`` as those stages finish. The stream ends with ``report``,
+    carrying exactly what /analyze returns, or ``error``.
+    """
+    # The whole body is read here, before the response (and the disconnect
+    # listener on the same channel) starts
+    fields, form = await _open_form(request)
+    video_path, sink = await _receive_video(form) if form is not None else (None, None)
+    try:
+        options = _form_options(fields)
+        query = options["query"]
+        if form is None and query is None:
+            raise HTTPException(400, "Provide video or text.")
+        ticket = _admit(form is not None, bool(query and query.strip()), request=request)
+    except BaseException:
+        if video_path is not None:
+            os.unlink(video_path)
+        raise
+
+    loop = asyncio.get_running_loop()
+    events: asyncio.Queue = asyncio.Queue()
+
+    def emit(event: str, data: Any) -> None:
+        # Serialize immediately: later stages mutate some results in place
+        message = f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+        loop.call_soon_threadsafe(events.put_nowait, message)
+
+    async def _produce() -> None:
+        try:
+            report = await _run_analysis(
+                video_path, form.filename if form else None, query,
+                content_hash=sink.sha256 if sink is not None else None,
+                on_event=emit,
+                ticket=ticket,
+                sampling=options["sampling"],
+                frame_budget=options["budget"],
+                per_frame_format=options["per_frame"],
+            )
+            emit("report", report)
+        except HTTPException as exc:
+            emit("error", {"status": exc.status_code, "detail": exc.detail})
+        except Exception as exc:
+            logger.error("Streaming analysis failed: %s", exc)
+            emit("error", {"status": 500, "detail": str(exc)})
+        finally:
+            ticket.close()
+            if video_path is not None:
+                try:
+                    os.unlink(video_path)
+                except OSError:
+                    pass
+            loop.call_soon_threadsafe(events.put_nowait, None)
+
+    async def _stream() -> AsyncIterator[str]:
+        task = asyncio.create_task(_produce())
+        try:
+            while True:
+                message = await events.get()
+                if message is None:
+                    break
+                yield message
+        finally:
+            # Client went away: stop the pipeline instead of finishing unseen work.
+            # StageGraph closes the frame stream under a running video stage and
+            # waits for its worker, so _produce releases the ticket only after.
+            task.cancel()
+
+    return StreamingResponse(
+        _stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/analyze/text/batch")
+async def analyze_text_batch(request: Request, k: int = Query(3, ge=1, le=50)) -> StreamingResponse:
+    """Score many texts for AI generation and related articles.
+
+    The body is either a JSON array (or ``{"texts": [...]}``) or an NDJSON
+    stream (``Content-Type: application/x-ndjson``); entries are strings or
+    ``{"id": ..., "text": ...}`` objects. Results are streamed back as NDJSON,
+    one line per entry in input order, each scored in batched model passes.
+    *k* (1-50) related articles are returned per entry.
+    """
+    ticket = _admit(False, True)
+    try:
+        items = await _read_bulk_items(request)
+    except BaseException:
+        ticket.close()
+        raise
+
+    chunk_size = max(1, int(_models["config"].get("text", {}).get("bulk_chunk_size", 256)))
+    return StreamingResponse(_bulk_text_results(items, chunk_size, k, ticket), media_type="application/x-ndjson")
+
+
+@app.post("/jobs", status_code=202, openapi_extra=_ANALYSIS_FORM)
+async def submit_job(request: Request) -> Dict[str, Any]:
+    """Queue an analysis (same form as /analyze) and return its id once the
+    upload has been received.
+
+    Poll ``GET /jobs/{job_id}``; once ``status`` is ``done`` the ``result``
+    field holds the same report ``/analyze`` would have returned.
+    """
+    from services.jobs import QueueFull
+
+    video_path = None
+
+    def _cleanup() -> None:
+        if video_path is not None and os.path.exists(video_path):
+            os.unlink(video_path)
+
+    # Until the queue owns the upload (and its cleanup), any failure here,
+    # client disconnects included, must remove it
+    handed_off = False
+    try:
+        fields, form = await _open_form(request)
+        sink = None
+        if form is not None:
+            video_path, sink = await _receive_video(form)
+        options = _form_options(fields)
+        if form is None and options["query"] is None:
+            raise HTTPException(400, "Provide video or text.")
+
+        payload = {
+            "video_path": video_path,
+            "filename": form.filename if form else None,
+            "query": options["query"],
+            "content_hash": sink.sha256 if sink is not None else None,
+            "sampling": options["sampling"],
+            "frame_budget": options["budget"],
+            "per_frame_format": options["per_frame"],
+        }
+        try:
+            job = _jobs.submit(payload, cleanup=_cleanup)
+        except QueueFull as exc:
+            raise HTTPException(503, str(exc))
+        handed_off = True
+    finally:
+        if not handed_off:
+            _cleanup()
+    return {"job_id": job.id, "status": job.status}
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str) -> Dict[str, Any]:
+    job = _jobs.get(job_id)
+    if job is None:
+        raise HTTPException(404, "Unknown or expired job id.")
+    return job.to_dict()
+
+
+def _batching_stats() -> Dict[str, Any]:
+    stats: Dict[str, Any] = {}
+    for key in ("video", "text"):
+        model = _models.get(key)
+        if hasattr(model, "stats"):
+            stats[key] = model.stats()
+        elif getattr(model, "batcher", None) is not None:
+            stats[key] = model.batcher.stats()
+    return stats
+
+
+@app.get("/ready")
+async def ready() -> JSONResponse:
+    """Readiness probe: 503 until startup warmup has finished."""
+    is_ready = _warmup.get("status") in ("done", "failed", "disabled")
+    return JSONResponse(status_code=200 if is_ready else 503, content={"ready": is_ready, "warmup": _warmup})
+
+
 @app.get("/health")
-async def health() -> Dict[str, str]:
-    return {"status": "ok", "ffprobe": "available" if _ffprobe_path else "fallback (ffmpeg)"}
+async def health() -> Dict[str, Any]:
+    return {
+        "status": "ok",
+        "warmup": _warmup,
+        "ffprobe": "available" if _ffprobe_path else "fallback (ffmpeg)",
+        "pools": _executor.stats() if _executor else {},
+        "jobs": _jobs.stats() if _jobs else {},
+        "batching": _batching_stats(),
+        "cache": _cache.stats() if _cache else {"enabled": False},
+        "segments": _segments.stats() if _segments else {"enabled": False},
+        "admission": _admission.stats() if _admission else {},
+    }
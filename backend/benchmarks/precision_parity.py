@@ -0,0 +1,124 @@
+"""Score drift and speed of reduced-precision models and ONNX Runtime
+against fp32 torch.
+
+Usage (from backend/):
+    python -m benchmarks.precision_parity [--video VIDEO] [--texts FILE]
+                                          [--precisions int8-dynamic,bf16] [--models video,text] [--onnx]
+
+The video and text detectors from config.yaml are loaded once in fp32 and
+once per precision, and each copy scores the same sample set: frames of
+VIDEO sampled at 1 fps (random frames without one) and the lines of FILE
+(a few built-in texts without one). For each precision the table shows
+load time, scoring time, the largest and mean absolute difference of the
+per-item probabilities from fp32, and how many labels agree. ``--onnx``
+adds a row for the ONNX Runtime backend.
+
+int8-dynamic models and ONNX exports are cached under ``model_cache_dir``,
+so run it twice to see the cached load time.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.precision import PRECISIONS  # noqa: E402
+
+_SAMPLE_TEXTS = [
+    "The city council approved the new budget on Tuesday after a lengthy debate over road repairs.",
+    "As an AI language model, I can provide a comprehensive overview of the key factors involved.",
+    "Scientists say the comet will be visible to the naked eye for about two weeks in early spring.",
+    "In conclusion, it is important to note that there are many perspectives to consider on this topic.",
+    "lol the bus was 40 min late again, missed the whole first half of the match",
+    "Officials confirmed that the bridge will remain closed while engineers inspect the damage.",
+]
+
+
+def _video_samples(video: str | None) -> List[Any]:
+    if video is None:
+        rng = np.random.default_rng(0)
+        return list(rng.integers(0, 256, size=(32, 224, 224, 3), dtype=np.uint8))
+    from utils.preprocessing import iter_frames
+    return list(iter_frames(video, 1.0))
+
+
+def _text_samples(path: str | None) -> List[str]:
+    if path is None:
+        return list(_SAMPLE_TEXTS)
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def _score_video(detector: Any, frames: List[Any]) -> Tuple[np.ndarray, List[str]]:
+    result = detector.predict(frames)
+    probs = result["per_frame"]
+    return probs, [result["labels"][i] for i in probs.argmax(axis=1)]
+
+
+def _score_text(detector: Any, texts: List[str]) -> Tuple[np.ndarray, List[str]]:
+    results = detector.predict_batch(texts)
+    probs = np.array([[r["ai_probability"], r["human_probability"]] for r in results])
+    return probs, [r["label"] for r in results]
+
+
+def _run(factory: Callable[..., Any], score: Callable, samples: List[Any], precision: str,
+         backend: str = "torch") -> Dict[str, Any]:
+    t0 = time.perf_counter()
+    detector = factory(precision, backend)
+    loaded = time.perf_counter() - t0
+    # Disable cross-request batching; score directly on this thread
+    detector.batcher = None
+    score(detector, samples[:2])  # warm up
+    t0 = time.perf_counter()
+    probs, labels = score(detector, samples)
+    name = "onnx" if detector.backend == "onnx" else detector.precision
+    return {"precision": name, "load": loaded, "score": time.perf_counter() - t0,
+            "probs": probs, "labels": labels}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--video", help="video to sample frames from (default: random frames)")
+    parser.add_argument("--texts", help="file with one sample text per line")
+    parser.add_argument("--precisions", default="int8-dynamic,bf16")
+    parser.add_argument("--models", default="video,text")
+    parser.add_argument("--onnx", action="store_true", help="also compare the ONNX Runtime backend")
+    args = parser.parse_args()
+
+    precisions = [p.strip() for p in args.precisions.split(",") if p.strip()]
+    for precision in precisions:
+        if precision not in PRECISIONS:
+            parser.error(f"unknown precision '{precision}'")
+
+    suites = []
+    models = {m.strip() for m in args.models.split(",")}
+    if "video" in models:
+        from models.video.deepfake_detector import VideoDeepfakeDetector
+        suites.append(("video", VideoDeepfakeDetector, _score_video, _video_samples(args.video)))
+    if "text" in models:
+        from models.text.ai_text_detector import TextAIDetector
+        suites.append(("text", TextAIDetector, _score_text, _text_samples(args.texts)))
+
+    print(f"{'model':<6} {'precision':<13} {'load s':>7} {'score s':>8} {'speedup':>8} "
+          f"{'max drift':>9} {'mean drift':>10} {'labels':>9}")
+    for name, factory, score, samples in suites:
+        base = _run(factory, score, samples, "fp32")
+        results = [base] + [_run(factory, score, samples, p) for p in precisions]
+        if args.onnx:
+            results.append(_run(factory, score, samples, "fp32", "onnx"))
+        for result in results:
+            drift = np.abs(result["probs"] - base["probs"])
+            agree = sum(a == b for a, b in zip(result["labels"], base["labels"]))
+            print(f"{name:<6} {result['precision']:<13} {result['load']:>7.2f} {result['score']:>8.2f} "
+                  f"{base['score'] / result['score']:>7.2f}x {drift.max():>9.4f} {drift.mean():>10.4f} "
+                  f"{agree:>4}/{len(samples):<4}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Compare the feature-extractor and numpy/torch preprocessing paths.
+
+Usage (from backend/):
+    python -m benchmarks.preprocessing [VIDEO] [--model NAME] [--batch 32] [--repeat 5] [--ffmpeg PATH]
+
+Frames are taken from VIDEO (sampled at 1 fps with the ffmpeg decoder at
+native resolution) or, without one, generated as random 720p frames. Each
+batch is turned into ``pixel_values`` both ways:
+
+- ``extractor``: uint8 array → PIL Image → AutoFeatureExtractor
+- ``tensor``:    uint8 array batch → utils.frame_tensors.FrameTensorizer
+
+and the best time per batch, the speedup and the largest difference between
+the two ``pixel_values`` are reported.
+"""
+from __future__ import annotations
+
+import argparse
+import itertools
+import os
+import sys
+import time
+
+import numpy as np
+import torch
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.video.deepfake_detector import _load_config  # noqa: E402
+from utils.frame_tensors import FrameTensorizer  # noqa: E402
+
+
+def _frames(video: str | None, count: int, ffmpeg: str) -> np.ndarray:
+    if video is None:
+        rng = np.random.default_rng(0)
+        return rng.integers(0, 256, size=(count, 720, 1280, 3), dtype=np.uint8)
+    from utils.preprocessing import iter_frames_ffmpeg
+    frames = list(itertools.islice(iter_frames_ffmpeg(video, 1.0, ffmpeg=ffmpeg, as_array=True), count))
+    if not frames:
+        raise SystemExit(f"No frames decoded from {video}")
+    return np.stack(frames)
+
+
+def _best(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(max(1, repeat)):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("video", nargs="?")
+    parser.add_argument("--model", default=None, help="HF model name (default: video.model_name from config)")
+    parser.add_argument("--batch", type=int, default=32)
+    parser.add_argument("--repeat", type=int, default=5, help="runs per path; the best one is reported")
+    parser.add_argument("--ffmpeg", default="ffmpeg", help="ffmpeg binary used to decode VIDEO")
+    args = parser.parse_args()
+
+    from transformers import AutoFeatureExtractor
+
+    extractor = AutoFeatureExtractor.from_pretrained(args.model or _load_config()["video"]["model_name"])
+    tensorizer = FrameTensorizer.from_extractor(extractor)
+    if tensorizer is None:
+        raise SystemExit("This model's image processor has no tensor equivalent (crop or non-fixed size).")
+
+    batch = _frames(args.video, args.batch, args.ffmpeg)
+    torch.set_grad_enabled(False)
+
+    def _extractor():
+        return extractor(images=[Image.fromarray(f) for f in batch], return_tensors="pt")["pixel_values"]
+
+    def _tensor():
+        return tensorizer(batch)
+
+    diff = float((_extractor() - _tensor()).abs().max())
+    t_ext = _best(_extractor, args.repeat)
+    t_ten = _best(_tensor, args.repeat)
+    n, h, w, _ = batch.shape
+    print(f"{n} frames of {w}x{h} → {tensorizer.size[1]}x{tensorizer.size[0]}")
+    print(f"{'path':<10} {'ms/batch':>9} {'ms/frame':>9} {'speedup':>8}")
+    print(f"{'extractor':<10} {1000 * t_ext:>9.1f} {1000 * t_ext / n:>9.2f} {1.0:>7.1f}x")
+    print(f"{'tensor':<10} {1000 * t_ten:>9.1f} {1000 * t_ten / n:>9.2f} {t_ext / t_ten:>7.1f}x")
+    print(f"max |pixel_values| difference: {diff:.4f}")
+
+
+if __name__ == "__main__":
+    main()
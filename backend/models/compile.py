@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+from types import SimpleNamespace
+from typing import Any, Dict
+
+import torch
+
+from utils.logger import logger
+
+COMPILE_MODES = ("none", "torch_compile", "torchscript")
+
+
+class TracedClassifier:
+    """A TorchScript trace of a HF classifier, called like the original
+    (``model(**inputs).logits``) and keeping its ``config``."""
+
+    def __init__(self, traced: Any, config: Any) -> None:
+        self.traced = traced
+        self.config = config
+
+    def __call__(self, **inputs: torch.Tensor) -> SimpleNamespace:
+        out = self.traced(**inputs)
+        return SimpleNamespace(logits=out["logits"] if isinstance(out, dict) else out[0])
+
+
+@torch.no_grad()
+def compile_model(model: Any, mode: str, sample_inputs: Dict[str, torch.Tensor]) -> Any:
+    """Return *model* compiled with *mode*, or *model* itself if that fails.
+
+    - ``torch_compile``: ``torch.compile(dynamic=True)`` so batch size and
+      sequence length changes don't trigger recompiles.
+    - ``torchscript``: ``torch.jit.trace`` on *sample_inputs*.
+
+    The compiled model is run on *sample_inputs* and checked against the
+    eager output before it is returned, so compiler errors (which
+    torch.compile only raises on first call) fall back to eager here.
+    """
+    if mode not in COMPILE_MODES:
+        raise ValueError(f"Unknown compile mode '{mode}', expected one of {COMPILE_MODES}")
+    if mode == "none" or not isinstance(model, torch.nn.Module):
+        return model
+    try:
+        if mode == "torch_compile":
+            compiled = torch.compile(model, dynamic=True)
+        else:
+            compiled = TracedClassifier(torch.jit.trace(model, example_kwarg_inputs=sample_inputs, strict=False),
+                                        model.config)
+        expected = model(**sample_inputs).logits.float()
+        got = compiled(**sample_inputs).logits.float()
+        if not torch.allclose(expected, got, atol=1e-3, rtol=1e-3):
+            raise RuntimeError(f"outputs differ by {float((expected - got).abs().max()):.4g}")
+    except Exception as exc:
+        logger.warning("%s failed for %s, keeping eager mode: %s", mode, type(model).__name__, exc)
+        return model
+    logger.info("Compiled %s with %s", type(model).__name__, mode)
+    return compiled
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import inspect
+import os
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import torch
+import transformers
+
+from models.precision import cache_key, model_revision
+from utils.logger import logger
+
+_OPT_LEVELS = ("disable", "basic", "extended", "all")
+
+
+class OnnxModel:
+    """A HF classifier exported to ONNX and run with ONNX Runtime.
+
+    Called like the torch model it replaces (``model(**inputs).logits``)
+    and carries the same ``config``, so the detectors' pre- and
+    post-processing is unchanged. Torch tensors go in and logits come back
+    as a torch tensor. Inputs the graph does not take (e.g.
+    ``token_type_ids`` for RoBERTa) are dropped.
+    """
+
+    def __init__(self, path: str, config: Any, intra_op_threads: int = 0, inter_op_threads: int = 0,
+                 optimization: str = "all", providers: Optional[List[str]] = None) -> None:
+        import onnxruntime as ort
+
+        if optimization not in _OPT_LEVELS:
+            raise ValueError(f"Unknown ONNX optimization level '{optimization}', expected one of {_OPT_LEVELS}")
+        options = ort.SessionOptions()
+        options.graph_optimization_level = {
+            "disable": ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+            "basic": ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+            "extended": ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+            "all": ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+        }[optimization]
+        # 0 lets ONNX Runtime choose (one thread per physical core)
+        options.intra_op_num_threads = int(intra_op_threads)
+        options.inter_op_num_threads = int(inter_op_threads)
+        self.session = ort.InferenceSession(path, options, providers=providers or ["CPUExecutionProvider"])
+        self.input_names = [i.name for i in self.session.get_inputs()]
+        self.config = config
+        self.path = path
+
+    def __call__(self, **inputs: torch.Tensor) -> SimpleNamespace:
+        feed = {name: inputs[name].detach().cpu().numpy() for name in self.input_names if name in inputs}
+        logits = self.session.run(["logits"], feed)[0]
+        return SimpleNamespace(logits=torch.from_numpy(np.ascontiguousarray(logits)))
+
+
+def export_onnx(model_cls: Any, model_name: str, sample_inputs: Dict[str, torch.Tensor], path: str) -> None:
+    """Export ``model_cls.from_pretrained(model_name)`` to *path*, with the
+    batch (and for 2-D integer inputs, sequence) dimension left dynamic."""
+    model = model_cls.from_pretrained(model_name)
+    model.eval()
+    # Traced inputs follow forward()'s signature, so name them in that order
+    names = [p for p in inspect.signature(model.forward).parameters if p in sample_inputs]
+    dynamic_axes: Dict[str, Dict[int, str]] = {"logits": {0: "batch"}}
+    for name, value in sample_inputs.items():
+        dynamic_axes[name] = {0: "batch", 1: "sequence"} if value.dim() == 2 else {0: "batch"}
+    tmp_path = f"{path}.tmp"
+    with torch.no_grad():
+        torch.onnx.export(
+            model, (), tmp_path, kwargs={name: sample_inputs[name] for name in names},
+            input_names=names, output_names=["logits"], dynamic_axes=dynamic_axes,
+            opset_version=17, dynamo=False,
+        )
+    os.replace(tmp_path, path)
+
+
+def load_onnx_model(model_cls: Any, model_name: str, sample_inputs: Dict[str, torch.Tensor],
+                    directory: str, onnx_cfg: Optional[dict] = None) -> OnnxModel:
+    """Return an :class:`OnnxModel` for *model_name*, exporting it first if
+    no export for this model revision is cached under *directory*.
+
+    *sample_inputs* are traced once for the export. *onnx_cfg* is the
+    ``onnx`` section of config.yaml (threads, optimization, providers).
+    """
+    onnx_cfg = onnx_cfg or {}
+    path = os.path.join(directory, cache_key(model_name, model_revision(model_name), "onnx") + ".onnx")
+    if os.path.isfile(path):
+        logger.info("Using cached ONNX export %s", path)
+    else:
+        logger.info("Exporting '%s' to ONNX at %s", model_name, path)
+        os.makedirs(directory, exist_ok=True)
+        export_onnx(model_cls, model_name, sample_inputs, path)
+    return OnnxModel(
+        path,
+        transformers.AutoConfig.from_pretrained(model_name),
+        intra_op_threads=onnx_cfg.get("intra_op_threads", 0),
+        inter_op_threads=onnx_cfg.get("inter_op_threads", 0),
+        optimization=onnx_cfg.get("optimization", "all"),
+        providers=onnx_cfg.get("providers"),
+    )
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import hashlib
+import os
+from typing import Any, Tuple
+
+import torch
+import transformers
+
+from utils.logger import logger
+
+PRECISIONS = ("fp32", "int8-dynamic", "bf16")
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def bf16_supported(device: torch.device) -> bool:
+    """Whether *device* runs bfloat16 natively (AVX512-BF16/AMX on CPU)."""
+    if device.type == "cuda":
+        return torch.cuda.is_bf16_supported()
+    for probe in ("_is_amx_tile_supported", "_is_avx512_bf16_supported"):
+        check = getattr(torch.cpu, probe, None)
+        if check is not None and check():
+            return True
+    return False
+
+
+def cache_dir(cfg: dict) -> str:
+    """Directory for converted models (``model_cache_dir``, relative to backend/)."""
+    return os.path.join(BACKEND_DIR, cfg.get("model_cache_dir", "data/models"))
+
+
+def cache_key(model_name: str, revision: str, variant: str) -> str:
+    """File-name-safe key for a converted model; changes with the model
+    revision and with the torch/transformers versions that produced it."""
+    raw = "|".join((model_name, revision, variant, torch.__version__, transformers.__version__))
+    slug = model_name.replace("/", "--").strip(".-")[-64:]
+    return f"{slug}-{variant}-{hashlib.sha256(raw.encode('utf-8')).hexdigest()[:16]}"
+
+
+def model_revision(model_name: str) -> str:
+    """Commit hash of a hub model, or the config file's mtime for a local one."""
+    if os.path.isdir(model_name):
+        return str(int(os.path.getmtime(os.path.join(model_name, "config.json"))))
+    config = transformers.AutoConfig.from_pretrained(model_name)
+    return getattr(config, "_commit_hash", None) or "unknown"
+
+
+def load_model(model_cls: Any, model_name: str, precision: str, device: torch.device,
+               directory: str) -> Tuple[torch.nn.Module, str]:
+    """Load ``model_cls.from_pretrained(model_name)`` in *precision*.
+
+    - ``fp32``: as published.
+    - ``bf16``: weights cast to bfloat16; falls back to fp32 when the
+      device has no native bfloat16 support.
+    - ``int8-dynamic``: ``nn.Linear`` layers quantized to int8 weights with
+      activations quantized on the fly (CPU only, else fp32). The int8
+      state_dict is cached under *directory*, so later startups build the
+      quantized architecture and load it instead of loading fp32 weights
+      and quantizing again.
+
+    Returns the model in eval mode on *device* and the precision actually used.
+    """
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown precision '{precision}', expected one of {PRECISIONS}")
+    if precision == "bf16" and not bf16_supported(device):
+        logger.warning("bf16 is not supported on %s; loading '%s' in fp32", device, model_name)
+        precision = "fp32"
+    if precision == "int8-dynamic" and device.type != "cpu":
+        logger.warning("int8-dynamic is CPU-only; loading '%s' in fp32 on %s", model_name, device)
+        precision = "fp32"
+
+    if precision == "int8-dynamic":
+        model = _load_quantized(model_cls, model_name, directory)
+    else:
+        model = model_cls.from_pretrained(model_name)
+        if precision == "bf16":
+            model = model.to(torch.bfloat16)
+    model.to(device)
+    model.eval()
+    return model, precision
+
+
+def _quantize(model: torch.nn.Module) -> torch.nn.Module:
+    model.eval()
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def _load_quantized(model_cls: Any, model_name: str, directory: str) -> torch.nn.Module:
+    # Only the quantized state_dict is cached and it is read with
+    # weights_only=True, so a file planted in the cache can't run code
+    path = os.path.join(directory, cache_key(model_name, model_revision(model_name), "int8-dynamic") + ".pt")
+    if os.path.isfile(path):
+        try:
+            # Randomly initialised architecture, quantized the same way, then
+            # the cached int8 weights on top: no fp32 checkpoint read
+            model = _quantize(model_cls.from_config(transformers.AutoConfig.from_pretrained(model_name)))
+            model.load_state_dict(torch.load(path, map_location="cpu", weights_only=True))
+            logger.info("Loaded cached int8 weights from %s", path)
+            return model
+        except Exception as exc:
+            logger.warning("Ignoring unreadable cached model %s: %s", path, exc)
+
+    model = _quantize(model_cls.from_pretrained(model_name))
+    try:
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        torch.save(model.state_dict(), tmp_path)
+        os.replace(tmp_path, path)
+        logger.info("Cached int8 weights at %s", path)
+    except OSError as exc:
+        logger.warning("Could not cache quantized model %s: %s", path, exc)
+    return model
@@ -1,12 +1,16 @@
 from __future__ import annotations
 
 import os
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional, Tuple
 
 import torch
 import yaml
 from transformers import AutoModelForSequenceClassification, AutoTokenizer
 
+from models.compile import compile_model
+from models.onnx_backend import load_onnx_model
+from models.precision import cache_dir, load_model
+from services.batching import MicroBatcher
 from utils.logger import logger
 
 CONFIG_PATH = os.path.join(
@@ -15,15 +19,29 @@ CONFIG_PATH = os.path.join(
 )
 
 
+_EMPTY_RESULT: Dict[str, Any] = {
+    "label": "unknown",
+    "confidence": 0.0,
+    "ai_probability": 0.0,
+    "human_probability": 0.0,
+}
+
+
 def _load_config() -> dict:
     with open(CONFIG_PATH, "r", encoding="utf-8") as f:
         return yaml.safe_load(f)
 
 
 class TextAIDetector:
-    """Detects whether a piece of text was generated by an AI model."""
+    """Detects whether a piece of text was generated by an AI model.
 
-    def __init__(self) -> None:
+    *precision* (``fp32``, ``int8-dynamic`` or ``bf16``) overrides
+    ``text.precision``; see models.precision.load_model. With *backend*
+    or ``text.backend`` set to ``onnx`` the model runs as a cached ONNX export under
+    ONNX Runtime instead (fp32 only; see models.onnx_backend).
+    """
+
+    def __init__(self, precision: Optional[str] = None, backend: Optional[str] = None) -> None:
         cfg = _load_config()
         text_cfg = cfg["text"]
         self.model_name: str = text_cfg["model_name"]
@@ -32,45 +50,50 @@ class TextAIDetector:
             cfg.get("device", "cuda") if torch.cuda.is_available() else "cpu"
         )
 
-        logger.info("Loading text model '%s' on %s", self.model_name, self.device)
+        self.precision: str = precision or text_cfg.get("precision", "fp32")
+        self.backend: str = backend or text_cfg.get("backend", "torch")
+
+        logger.info("Loading text model '%s' on %s (%s)", self.model_name, self.device, self.precision)
         self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
-        self.model = AutoModelForSequenceClassification.from_pretrained(self.model_name)
-        self.model.to(self.device)
-        self.model.eval()
+        self.model: Any = None
+        if self.backend == "onnx":
+            try:
+                self.model = load_onnx_model(
+                    AutoModelForSequenceClassification, self.model_name,
+                    dict(self.tokenizer(["A short sample sentence."], return_tensors="pt")),
+                    cache_dir(cfg), cfg.get("onnx"),
+                )
+                if self.precision != "fp32":
+                    logger.warning("text.precision=%s is ignored by the ONNX backend", self.precision)
+                self.precision, self.device = "fp32", torch.device("cpu")
+            except Exception as exc:
+                logger.warning("ONNX backend unavailable for '%s', using torch: %s", self.model_name, exc)
+                self.backend = "torch"
+        if self.model is None:
+            self.model, self.precision = load_model(
+                AutoModelForSequenceClassification, self.model_name, self.precision, self.device, cache_dir(cfg),
+            )
+        self.fake_idx, self.real_idx = self._resolve_label_indices()
         logger.info("Text model loaded successfully")
 
-    @torch.no_grad()
-    def predict(self, text: str) -> Dict[str, Any]:
-        """Classify *text* as human-written or AI-generated.
-
-        Returns a dict with:
-            - label      : "ai-generated" or "human-written"
-            - confidence : probability of the predicted label
-            - ai_probability   : probability the text is AI-generated
-            - human_probability: probability the text is human-written
-        """
-        if not text or not text.strip():
-            logger.warning("Empty text provided for AI-text detection")
-            return {
-                "label": "unknown",
-                "confidence": 0.0,
-                "ai_probability": 0.0,
-                "human_probability": 0.0,
-            }
-
-        logger.info("Tokenising input text (length=%d chars, max_length=%d)", len(text), self.max_length)
-        inputs = self.tokenizer(
-            text,
-            return_tensors="pt",
-            truncation=True,
-            max_length=self.max_length,
-            padding=True,
-        )
-        inputs = {k: v.to(self.device) for k, v in inputs.items()}
-
-        logits = self.model(**inputs).logits
-        probs = torch.softmax(logits, dim=-1).cpu().squeeze().tolist()
+        # Cross-request batching: concurrent queries are collected into one
+        # batch, then split into length buckets before each forward pass.
+        batching_cfg = text_cfg.get("batching", {})
+        self.bucket_ratio: float = float(batching_cfg.get("bucket_ratio", 1.5))
+        self.bucket_max_size: int = int(batching_cfg.get("bucket_max_size", 32))
+        self._real_tokens = 0
+        self._padded_tokens = 0
+        self._forward_passes = 0
+        self.batcher: MicroBatcher | None = None
+        if batching_cfg.get("enabled", False):
+            self.batcher = MicroBatcher(
+                "text",
+                self.predict_batch,
+                max_batch_size=batching_cfg.get("max_batch_size", 16),
+                max_wait_ms=batching_cfg.get("max_wait_ms", 5),
+            )
 
+    def _resolve_label_indices(self) -> Tuple[int, int]:
         id2label = self.model.config.id2label
 
         fake_idx = None
@@ -88,19 +111,124 @@ class TextAIDetector:
                 "Could not map labels automatically; assuming idx 0=fake, 1=real (labels: %s)",
                 id2label,
             )
-
-        ai_prob = round(probs[fake_idx], 4)
-        human_prob = round(probs[real_idx], 4)
+        return fake_idx, real_idx
+
+    def compile(self, mode: str) -> None:
+        """Swap the model for a ``torch_compile`` / ``torchscript`` version
+        (see models.compile.compile_model); no-op for ONNX models."""
+        sample = self.tokenizer(["A short sample sentence."], return_tensors="pt")
+        self.model = compile_model(self.model, mode, {k: v.to(self.device) for k, v in sample.items()})
+
+    def warmup(self, lengths: List[int], batch_size: int = 1) -> None:
+        """Score synthetic texts of roughly each token length in *lengths*,
+        alone and as a batch of *batch_size*, without counting them in
+        :meth:`stats`. Requests served meanwhile are still counted."""
+        for length in lengths:
+            text = " ".join(["word"] * max(1, int(length)))
+            self.predict_batch([text], warming=True)
+            if batch_size > 1:
+                self.predict_batch([text] * batch_size, warming=True)
+
+    def _to_result(self, probs: List[float]) -> Dict[str, Any]:
+        ai_prob = round(probs[self.fake_idx], 4)
+        human_prob = round(probs[self.real_idx], 4)
 
         label = "ai-generated" if ai_prob >= human_prob else "human-written"
         confidence = max(ai_prob, human_prob)
 
-        result: Dict[str, Any] = {
+        return {
             "label": label,
             "confidence": confidence,
             "ai_probability": ai_prob,
             "human_probability": human_prob,
         }
 
-        logger.info("Text result: label=%s, confidence=%.4f", label, confidence)
+    def _buckets(self, lengths: List[int]) -> List[List[int]]:
+        """Group item indices into sub-batches of similar token length.
+
+        Indices are sorted by length and a new bucket is started whenever the
+        next item is more than ``bucket_ratio`` times longer than the shortest
+        item of the current bucket (or the bucket holds ``bucket_max_size``
+        items), which keeps padding per forward pass low.
+        """
+        order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+        buckets: List[List[int]] = []
+        for i in order:
+            if (
+                buckets
+                and len(buckets[-1]) < self.bucket_max_size
+                and lengths[i] <= self.bucket_ratio * max(1, lengths[buckets[-1][0]])
+            ):
+                buckets[-1].append(i)
+            else:
+                buckets.append([i])
+        return buckets
+
+    @torch.no_grad()
+    def predict_batch(self, texts: List[str], warming: bool = False) -> List[Dict[str, Any]]:
+        """Classify several texts at once; returns one :meth:`predict` dict per text.
+        Passes with *warming* set are left out of :meth:`stats`."""
+        results: List[Dict[str, Any]] = [dict(_EMPTY_RESULT) for _ in texts]
+        live = [i for i, t in enumerate(texts) if t and t.strip()]
+        if not live:
+            return results
+
+        encodings = self.tokenizer(
+            [texts[i] for i in live],
+            truncation=True,
+            max_length=self.max_length,
+        )
+        lengths = [len(ids) for ids in encodings["input_ids"]]
+
+        buckets = self._buckets(lengths)
+        for bucket in buckets:
+            features = [{k: encodings[k][j] for k in encodings.keys()} for j in bucket]
+            inputs = self.tokenizer.pad(features, padding=True, return_tensors="pt")
+            inputs = {k: v.to(self.device) for k, v in inputs.items()}
+
+            logits = self.model(**inputs).logits
+            probs = torch.softmax(logits.float(), dim=-1).cpu().tolist()
+            for j, row in zip(bucket, probs):
+                results[live[j]] = self._to_result(row)
+
+            if not warming:
+                self._real_tokens += sum(lengths[j] for j in bucket)
+                self._padded_tokens += len(bucket) * max(lengths[j] for j in bucket)
+                self._forward_passes += 1
+
+        logger.debug("Text batch of %d scored in %d forward pass(es)", len(live), len(buckets))
+        return results
+
+    def predict(self, text: str) -> Dict[str, Any]:
+        """Classify *text* as human-written or AI-generated.
+
+        Returns a dict with:
+            - label      : "ai-generated" or "human-written"
+            - confidence : probability of the predicted label
+            - ai_probability   : probability the text is AI-generated
+            - human_probability: probability the text is human-written
+        """
+        if not text or not text.strip():
+            logger.warning("Empty text provided for AI-text detection")
+            return dict(_EMPTY_RESULT)
+
+        logger.info("Tokenising input text (length=%d chars, max_length=%d)", len(text), self.max_length)
+        if self.batcher is not None:
+            result = self.batcher.run([text])[0]
+        else:
+            result = self.predict_batch([text])[0]
+
+        logger.info("Text result: label=%s, confidence=%.4f", result["label"], result["confidence"])
         return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Batch fill and padding efficiency since startup."""
+        stats: Dict[str, Any] = {
+            "backend": self.backend,
+            "precision": self.precision,
+            "forward_passes": self._forward_passes,
+            "padding_efficiency": round(self._real_tokens / self._padded_tokens, 3) if self._padded_tokens else 1.0,
+        }
+        if self.batcher is not None:
+            stats.update(self.batcher.stats())
+        return stats
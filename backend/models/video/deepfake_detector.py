@@ -1,15 +1,39 @@
 from __future__ import annotations
 
+import itertools
+import math
 import os
-from typing import Any, Dict, List
+import time
+from collections import deque
+from statistics import NormalDist
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
 
+import numpy as np
 import torch
 import yaml
 from PIL import Image
 from transformers import AutoFeatureExtractor, AutoModelForImageClassification
 
+from models.compile import compile_model
+from models.onnx_backend import load_onnx_model
+from models.precision import cache_dir, load_model
+from services.batching import MicroBatcher
+from utils.dedup import FrameDeduplicator
+from utils.faces import FaceCropper
+from utils.frame_tensors import FrameTensorizer
 from utils.logger import logger
 
+# A decoded frame: PIL Image or uint8 RGB array of shape (H, W, 3)
+Frame = Union[Image.Image, np.ndarray]
+
+# Per-frame label probabilities: float32 array of shape (frames, labels),
+# columns in the order of VideoDeepfakeDetector.labels
+Scores = np.ndarray
+
+# on_batch(start, scores, frame_indices): *start* counts scored rows,
+# *frame_indices* gives each row's position among the frames passed in
+BatchCallback = Callable[[int, Scores, np.ndarray], None]
+
 CONFIG_PATH = os.path.join(
     os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
     "config", "config.yaml",
@@ -21,11 +45,24 @@ def _load_config() -> dict:
         return yaml.safe_load(f)
 
 
+def _spread_order(n: int) -> List[int]:
+    """``range(n)`` in bit-reversed order (0, n/2, n/4, 3n/4, ...), so every
+    prefix is spread roughly evenly over the whole range."""
+    bits = max(1, (n - 1).bit_length())
+    return [j for j in (int(format(i, f"0{bits}b")[::-1], 2) for i in range(1 << bits)) if j < n]
+
+
 class VideoDeepfakeDetector:
     """Classifies individual frames as fake or real using a HuggingFace
-    image-classification model and returns aggregated scores."""
+    image-classification model and returns aggregated scores.
+
+    *precision* (``fp32``, ``int8-dynamic`` or ``bf16``) overrides
+    ``video.precision``; see models.precision.load_model. With *backend*
+    or ``video.backend`` set to ``onnx`` the model runs as a cached ONNX export under
+    ONNX Runtime instead (fp32 only; see models.onnx_backend).
+    """
 
-    def __init__(self) -> None:
+    def __init__(self, precision: Optional[str] = None, backend: Optional[str] = None) -> None:
         cfg = _load_config()
         video_cfg = cfg["video"]
         self.model_name: str = video_cfg["model_name"]
@@ -34,49 +71,505 @@ class VideoDeepfakeDetector:
             cfg.get("device", "cuda") if torch.cuda.is_available() else "cpu"
         )
 
-        logger.info("Loading video model '%s' on %s", self.model_name, self.device)
+        self.precision: str = precision or video_cfg.get("precision", "fp32")
+        self.backend: str = backend or video_cfg.get("backend", "torch")
+
+        logger.info("Loading video model '%s' on %s (%s)", self.model_name, self.device, self.precision)
         self.extractor = AutoFeatureExtractor.from_pretrained(self.model_name)
-        self.model = AutoModelForImageClassification.from_pretrained(self.model_name)
-        self.model.to(self.device)
-        self.model.eval()
+        self.model: Any = None
+        if self.backend == "onnx":
+            width, height = self.input_size or (224, 224)
+            try:
+                self.model = load_onnx_model(
+                    AutoModelForImageClassification, self.model_name,
+                    {"pixel_values": torch.zeros(1, 3, height, width)}, cache_dir(cfg), cfg.get("onnx"),
+                )
+                if self.precision != "fp32":
+                    logger.warning("video.precision=%s is ignored by the ONNX backend", self.precision)
+                self.precision, self.device = "fp32", torch.device("cpu")
+            except Exception as exc:
+                logger.warning("ONNX backend unavailable for '%s', using torch: %s", self.model_name, exc)
+                self.backend = "torch"
+        if self.model is None:
+            self.model, self.precision = load_model(
+                AutoModelForImageClassification, self.model_name, self.precision, self.device, cache_dir(cfg),
+            )
+        self.dtype = torch.bfloat16 if self.precision == "bf16" else torch.float32
         logger.info("Video model loaded successfully")
+        # uint8 numpy frames skip the extractor and are preprocessed as one
+        # batched tensor op (None when the extractor can't be reproduced)
+        self.tensorizer = FrameTensorizer.from_extractor(self.extractor)
+
+        # Optional face cropping: only the largest face of each frame is
+        # scored, and frames without a face are skipped.
+        self.faces: Optional[FaceCropper] = None
+        if video_cfg.get("face_detection", False):
+            faces_cfg = video_cfg.get("faces", {})
+            try:
+                self.faces = FaceCropper(
+                    backend=faces_cfg.get("backend", "auto"),
+                    size=self.input_size,
+                    model=faces_cfg.get("model"),
+                    config=faces_cfg.get("config"),
+                    confidence=faces_cfg.get("confidence", 0.6),
+                    min_face_size=faces_cfg.get("min_face_size", 40),
+                    margin=faces_cfg.get("margin", 0.3),
+                    detect_width=faces_cfg.get("detect_width", 640),
+                    batch_size=faces_cfg.get("batch_size", 16),
+                )
+            except Exception as exc:
+                logger.warning("Face detection disabled: %s", exc)
+
+        # Optional cross-request batching: frames from concurrent requests
+        # share forward passes instead of each running its own small batches.
+        batching_cfg = video_cfg.get("batching", {})
+        self.batcher: MicroBatcher | None = None
+        if batching_cfg.get("enabled", False):
+            self.batcher = MicroBatcher(
+                "video",
+                self._predict_batch,
+                max_batch_size=batching_cfg.get("max_batch_size", 32),
+                max_wait_ms=batching_cfg.get("max_wait_ms", 10),
+            )
+
+        # Near-duplicate frames (static shots, slideshows) are scored once
+        # per group and the scores are copied to every member.
+        dedup_cfg = video_cfg.get("dedup", {})
+        self.dedup_enabled: bool = dedup_cfg.get("enabled", False)
+        self.dedup_distance: int = dedup_cfg.get("max_distance", 4)
+        # Sequential early exit (predict(..., early_exit=True))
+        early_cfg = video_cfg.get("early_exit", {})
+        self.early_exit_confidence: float = early_cfg.get("confidence", 0.99)
+        self.early_exit_min_frames: int = early_cfg.get("min_frames", 32)
+        self.early_exit_min_coverage: float = early_cfg.get("min_coverage", 0.05)
+        self._frames_seen = 0
+        self._frames_scored = 0
+        # Smoothed forward-pass cost, used to turn time budgets into frame budgets
+        self.seconds_per_frame: Optional[float] = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Deduplication and batch fill since startup."""
+        stats: Dict[str, Any] = {
+            "backend": self.backend,
+            "precision": self.precision,
+            "frames": self._frames_seen,
+            "frames_scored": self._frames_scored,
+            "deduplicated": self._frames_seen - self._frames_scored,
+            "seconds_per_frame": round(self.seconds_per_frame, 4) if self.seconds_per_frame else None,
+        }
+        if self.batcher is not None:
+            stats.update(self.batcher.stats())
+        return stats
+
+    @property
+    def labels(self) -> List[str]:
+        """Label names in the column order of per-frame score arrays."""
+        id2label = self.model.config.id2label
+        return [id2label[i] for i in range(len(id2label))]
+
+    @property
+    def input_size(self) -> Optional[Tuple[int, int]]:
+        """``(width, height)`` the feature extractor resizes frames to, or
+        None if it does not resize to a fixed size."""
+        if not getattr(self.extractor, "do_resize", True):
+            return None
+        size = getattr(self.extractor, "size", None)
+        if isinstance(size, int):
+            return size, size
+        if isinstance(size, dict) and "height" in size and "width" in size:
+            return int(size["width"]), int(size["height"])
+        return None
+
+    def _pixel_values(self, frames: Sequence[Frame]) -> Dict[str, torch.Tensor]:
+        if self.tensorizer is not None and (
+            isinstance(frames, np.ndarray) or all(isinstance(f, np.ndarray) for f in frames)
+        ):
+            return {"pixel_values": self.tensorizer(frames, self.device).to(self.dtype)}
+        inputs = self.extractor(images=list(frames), return_tensors="pt")
+        return {k: v.to(self.device, self.dtype) for k, v in inputs.items()}
+
+    def compile(self, mode: str) -> None:
+        """Swap the model for a ``torch_compile`` / ``torchscript`` version
+        (see models.compile.compile_model); no-op for ONNX models."""
+        width, height = self.input_size or (224, 224)
+        sample = {"pixel_values": torch.zeros(1, 3, height, width, dtype=self.dtype, device=self.device)}
+        self.model = compile_model(self.model, mode, sample)
+
+    def warmup(self, batch_sizes: Iterable[int]) -> None:
+        """Score synthetic frames at each batch size, through both the numpy
+        and the feature-extractor input paths, so kernel selection and
+        allocator growth happen before the first request.
+
+        ``seconds_per_frame`` is then re-measured on a warm pass, so frame
+        budgets aren't based on cold-start timings.
+        """
+        width, height = self.input_size or (224, 224)
+        rng = np.random.default_rng(0)
+        sizes = sorted({max(1, int(n)) for n in batch_sizes})
+        for n in sizes:
+            frames = rng.integers(0, 256, size=(n, height, width, 3), dtype=np.uint8)
+            self._predict_batch(frames)
+            self._predict_batch([Image.fromarray(f) for f in frames])
+        self.seconds_per_frame = None
+        self._predict_batch(rng.integers(0, 256, size=(sizes[-1], height, width, 3), dtype=np.uint8))
 
     @torch.no_grad()
-    def _predict_batch(self, frames: List[Image.Image]) -> List[Dict[str, float]]:
-        inputs = self.extractor(images=frames, return_tensors="pt")
-        inputs = {k: v.to(self.device) for k, v in inputs.items()}
+    def _predict_batch(self, frames: Sequence[Frame]) -> Scores:
+        t0 = time.perf_counter()
+        inputs = self._pixel_values(frames)
         logits = self.model(**inputs).logits
-        probs = torch.softmax(logits, dim=-1).cpu().tolist()
+        probs = torch.softmax(logits.float(), dim=-1).cpu().numpy()
 
-        id2label = self.model.config.id2label
-        results = []
-        for prob_row in probs:
-            results.append({id2label[i]: round(p, 4) for i, p in enumerate(prob_row)})
-        return results
+        per_frame = (time.perf_counter() - t0) / len(frames)
+        prev = self.seconds_per_frame
+        self.seconds_per_frame = per_frame if prev is None else 0.8 * prev + 0.2 * per_frame
+        return probs
+
+    @staticmethod
+    def _chunks(frames: Iterable[Frame], size: int) -> Iterator[Sequence[Frame]]:
+        if isinstance(frames, np.ndarray):
+            # Views into the caller's batch, no copies
+            for start in range(0, len(frames), size):
+                yield frames[start:start + size]
+            return
+        it = iter(frames)
+        while True:
+            chunk = list(itertools.islice(it, size))
+            if not chunk:
+                return
+            yield chunk
+
+    def _score_chunks(self, frames: Iterable[Frame]) -> Iterator[tuple]:
+        """Yield ``(start, scores)`` per batch while pulling frames lazily,
+        *scores* being a :data:`Scores` array.
+
+        With the micro-batcher, up to two batches are kept in flight so the
+        next chunk is collected from *frames* while the previous one runs.
+        """
+        if self.batcher is None:
+            start = 0
+            for chunk in self._chunks(frames, self.batch_size):
+                logger.debug("Processing frame batch %d–%d", start, start + len(chunk) - 1)
+                yield start, self._predict_batch(chunk)
+                start += len(chunk)
+            return
+
+        pending: deque = deque()
+        start = 0
+        for chunk in self._chunks(frames, self.batcher.max_batch_size):
+            pending.append((start, self.batcher.submit(chunk)))
+            start += len(chunk)
+            if len(pending) > 1:
+                first, futures = pending.popleft()
+                yield first, np.stack([fut.result() for fut in futures])
+        while pending:
+            first, futures = pending.popleft()
+            yield first, np.stack([fut.result() for fut in futures])
+
+    def _dedup(self, frames: Iterable[Frame], groups: List[int]) -> Iterator[Frame]:
+        """Yield only the frames that start a new near-duplicate group,
+        appending every frame's group index to *groups* as it is read."""
+        dedup = FrameDeduplicator(self.dedup_distance)
+        for chunk in self._chunks(frames, self.batch_size):
+            next_new = dedup.groups
+            for frame, group in zip(chunk, dedup.assign(chunk)):
+                groups.append(group)
+                if group == next_new:
+                    next_new += 1
+                    yield frame
+
+    def predict(
+        self,
+        frames: Iterable[Frame],
+        on_batch: Optional[BatchCallback] = None,
+        early_exit: bool = False,
+    ) -> Dict[str, Any]:
+        """Run inference on frames from a list or any iterable.
+
+        Frames are PIL Images or uint8 RGB ``(H, W, 3)`` arrays; an
+        ``(N, H, W, 3)`` array is scored in slices without copying. Batches
+        made only of arrays bypass the feature extractor (see
+        utils.frame_tensors.FrameTensorizer).
+
+        Frames are consumed lazily in batches, so a generator (or a
+        utils.preprocessing.FrameStream) is scored while it is still being
+        decoded and only a batch or two of images is alive at a time. If
+        given, *on_batch(start, scores, frame_indices)* is called as each
+        batch of per-frame scores becomes available, in frame order (in
+        spread order with *early_exit*, see :meth:`_predict_early_exit`).
+
+        With ``video.face_detection`` enabled, each frame is replaced by a
+        crop of its largest face and frames without one are skipped, so
+        ``per_frame`` only covers frames with faces; ``frame_indices`` then
+        says which input frame each row belongs to.
 
-    def predict(self, frames: List[Image.Image]) -> Dict[str, Any]:
-        """Run inference on a list of PIL Images.
+        With ``video.dedup`` enabled, frames within ``max_distance`` dHash
+        bits of an earlier frame are not scored again; they get a copy of
+        that frame's scores, so ``per_frame`` still has one entry per frame.
+
+        With *early_exit*, frames are scored in a temporally spread order
+        and scoring stops as soon as the verdict is settled; see
+        :meth:`_predict_early_exit`.
 
         Returns a dict with:
-            - per_frame : list of per-frame label probability dicts
+            - per_frame : float32 ``(frames, labels)`` array of probabilities
+            - labels    : label names of the ``per_frame`` columns
             - average   : averaged probabilities across all frames
             - label     : "fake" or "real" based on the dominant average class
             - confidence: the probability of the predicted label
+            - unique_frames: frames actually scored (only with dedup)
+            - faces     : ``{"frames", "with_faces"}`` counts (only with
+              face detection)
+            - early_exit: frames read and scored, and whether and why
+              scoring stopped early (only with *early_exit*)
+            - frame_indices, frames_sampled: position of each ``per_frame``
+              row among the input frames, and how many were read (only
+              when rows were skipped, i.e. with face detection or early exit)
         """
-        if not frames:
-            logger.warning("No frames provided for video prediction")
-            return {"per_frame": [], "average": {}, "label": "unknown", "confidence": 0.0}
+        if self.batcher is not None:
+            logger.info("Running video inference (shared batches of up to %d)", self.batcher.max_batch_size)
+        else:
+            logger.info("Running video inference (batch_size=%d)", self.batch_size)
+
+        face_stats: Optional[Dict[str, int]] = None
+        # Input position of every frame that reaches the model, if frames are dropped
+        source: Optional[List[int]] = None
+        if self.faces is not None:
+            face_stats, source = {}, []
+            frames = self.faces.crop(frames, face_stats, source)
+
+        if early_exit:
+            result = self._predict_early_exit(frames, on_batch, source, face_stats)
+            if face_stats is not None:
+                result["faces"] = face_stats
+            return result
+
+        batches: List[Scores] = []
+        done = 0
+        # groups[i] is the group of frame i; unique[g] the scores of group g
+        groups: List[int] = []
+        unique = np.empty((0, len(self.labels)), dtype=np.float32)
+
+        def _emit(scores: Scores) -> None:
+            nonlocal done
+            batches.append(scores)
+            if on_batch is not None and len(scores):
+                on_batch(done, scores, self._frame_indices(source, done, len(scores)))
+            done += len(scores)
+
+        def _fan_out() -> None:
+            # Copy scores to every pending frame whose group has been scored
+            pos = done
+            while pos < len(groups) and groups[pos] < len(unique):
+                pos += 1
+            _emit(unique[np.asarray(groups[done:pos], dtype=np.intp)])
+
+        if self.dedup_enabled:
+            for _, scores in self._score_chunks(self._dedup(frames, groups)):
+                unique = np.concatenate([unique, scores])
+                _fan_out()
+            # Duplicates read after the last scored batch
+            _fan_out()
+        else:
+            for _, scores in self._score_chunks(frames):
+                _emit(scores)
+        self._frames_seen += done
+        self._frames_scored += len(unique) if self.dedup_enabled else done
+        result = self._summarize(batches, len(unique) if self.dedup_enabled else None)
+        if source is not None:
+            result["frame_indices"] = np.asarray(source[:done], dtype=np.int64)
+            result["frames_sampled"] = face_stats["frames"]
+        if face_stats is not None:
+            if face_stats["frames"] and not face_stats["with_faces"]:
+                logger.warning("No faces found in %d frames", face_stats["frames"])
+            result["faces"] = face_stats
+        return result
+
+    @staticmethod
+    def _frame_indices(source: Optional[List[int]], start: int, count: int) -> np.ndarray:
+        """Input positions of scored rows ``[start, start + count)``."""
+        if source is None:
+            return np.arange(start, start + count, dtype=np.int64)
+        return np.asarray(source[start:start + count], dtype=np.int64)
+
+    def _buffer(self, frames: Iterable[Frame]) -> List[Frame]:
+        """Read all of *frames*, shrinking each to the model input size on
+        the way in (the resize scoring would do anyway), so a few thousand
+        buffered frames cost ~150 KB each rather than full size.
+
+        uint8 arrays go through the tensorizer; PIL images (and arrays when
+        there is no tensorizer) are resized with the feature extractor's
+        resampling filter, which leaves its own resize a no-op. Frames are
+        kept as-is only if the extractor has no fixed input size.
+        """
+        size = self.input_size
+        resample = getattr(self.extractor, "resample", Image.BILINEAR)
+        buffered: List[Frame] = []
+        for chunk in self._chunks(frames, self.batch_size):
+            if self.tensorizer is not None and (
+                isinstance(chunk, np.ndarray) or all(isinstance(f, np.ndarray) for f in chunk)
+            ):
+                buffered.extend(self.tensorizer.resize(chunk))
+            elif size is None:
+                buffered.extend(chunk)
+            else:
+                for frame in chunk:
+                    if isinstance(frame, np.ndarray):
+                        buffered.append(np.asarray(Image.fromarray(frame).resize(size, resample)))
+                    else:
+                        buffered.append(frame.resize(size, resample))
+        return buffered
+
+    def _settled(self, scores: Scores, total: int) -> Tuple[bool, float, float]:
+        """Whether the leading label of *scores* (a sample without
+        replacement of *total* frames) would still lead on all of them.
+
+        Tests the per-frame gap between the leading and runner-up label
+        probabilities: the verdict is settled when the mean gap minus its
+        ``early_exit_confidence`` two-sided normal bound (with finite
+        population correction) is above zero. Returns (settled, mean gap,
+        bound).
+        """
+        if scores.shape[1] < 2 or len(scores) < 2:
+            return False, 0.0, math.inf
+        probs = scores.astype(np.float64)
+        second, top = np.argsort(probs.mean(axis=0))[-2:]
+        gap = probs[:, top] - probs[:, second]
+        n = len(gap)
+        z = NormalDist().inv_cdf(0.5 + self.early_exit_confidence / 2)
+        fpc = math.sqrt((total - n) / (total - 1)) if total > 1 else 0.0
+        bound = z * float(gap.std(ddof=1)) / math.sqrt(n) * fpc
+        return float(gap.mean()) - bound > 0, float(gap.mean()), bound
 
-        logger.info("Running video inference on %d frames (batch_size=%d)", len(frames), self.batch_size)
+    def _predict_early_exit(
+        self,
+        frames: Iterable[Frame],
+        on_batch: Optional[BatchCallback] = None,
+        source: Optional[List[int]] = None,
+        face_stats: Optional[Dict[str, int]] = None,
+    ) -> Dict[str, Any]:
+        """Score frames in bit-reversed (temporally spread) order and stop
+        once the verdict is settled (see :meth:`_settled`), but not before
+        ``early_exit_min_frames`` frames and ``early_exit_min_coverage`` of
+        all frames have been scored.
 
-        per_frame: List[Dict[str, float]] = []
-        for start in range(0, len(frames), self.batch_size):
-            batch = frames[start : start + self.batch_size]
-            logger.debug("Processing frame batch %d–%d", start, start + len(batch) - 1)
-            per_frame.extend(self._predict_batch(batch))
+        The number of frames has to be known up front. A random-access
+        source (one with ``fetch`` and ``len``, e.g.
+        utils.preprocessing.SeekableFrames) is read lazily, a batch of
+        spread positions at a time, so frames after the stop are never
+        decoded. Any other iterable (including face crops) is read in full
+        first, which saves inference but not decoding. Dedup is not applied:
+        the spread order already skips most of a static shot. ``per_frame`` has only the scored frames, in temporal order.
+        *on_batch* is called after every scored batch, so its batches
+        arrive in spread order rather than temporal order: *start* counts
+        scored frames and ``frame_indices`` places each row in time.
+        """
+        fetch = getattr(frames, "fetch", None)
+        # Spread positions of the frames handed to the model, in scoring order
+        taken: List[int] = []
+        if fetch is not None:
+            total = len(frames)  # type: ignore[arg-type]
+            order = _spread_order(total)
+
+            def _fetched() -> Iterator[Frame]:
+                for start in range(0, total, self.batch_size):
+                    wanted = order[start:start + self.batch_size]
+                    # Samples past the end of an overestimated frame count come back as None
+                    for position, frame in zip(wanted, fetch(wanted)):
+                        if frame is not None:
+                            taken.append(position)
+                            yield frame
+
+            spread_frames: Iterable[Frame] = _fetched()
+        else:
+            buffered = self._buffer(frames)
+            total = len(buffered)
+            order = _spread_order(total)
+            taken = order
+            spread_frames = (buffered[i] for i in order)
+        min_frames = min(total, max(self.early_exit_min_frames, math.ceil(self.early_exit_min_coverage * total)))
+        logger.info("Running video inference with early exit over %d frames (at least %d)", total, min_frames)
+
+        def _placed(positions: Sequence[int]) -> np.ndarray:
+            placed = np.asarray(positions, dtype=np.int64)
+            return np.asarray(source, dtype=np.int64)[placed] if source is not None else placed
+
+        scores = np.empty((0, len(self.labels)), dtype=np.float32)
+        settled, gap, bound = False, 0.0, math.inf
+        for _, batch in self._score_chunks(spread_frames):
+            if on_batch is not None and len(batch):
+                on_batch(len(scores), batch, _placed(taken[len(scores):len(scores) + len(batch)]))
+            scores = np.concatenate([scores, batch])
+            if min_frames <= len(scores) < total:
+                settled, gap, bound = self._settled(scores, total)
+                if settled:
+                    break
+
+        # Back to temporal order
+        positions = np.asarray(taken[:len(scores)], dtype=np.int64)
+        per_frame = scores[np.argsort(positions, kind="stable")]
+        positions = _placed(np.sort(positions))
+        self._frames_seen += total
+        self._frames_scored += len(per_frame)
+
+        result = self._summarize([per_frame], None)
+        result["frame_indices"] = positions
+        result["frames_sampled"] = face_stats["frames"] if face_stats is not None else total
+        result["early_exit"] = {
+            "frames": total,
+            "frames_scored": len(per_frame),
+            "stopped_early": settled,
+            "margin": round(gap, 4),
+            "bound": round(bound, 4) if math.isfinite(bound) else None,
+        }
+        if settled:
+            logger.info("Early exit after %d of %d frames (margin %.4f ± %.4f)", len(per_frame), total, gap, bound)
+        return result
+
+    def merge_scores(
+        self,
+        segments: Iterable[Tuple[int, Scores, int, np.ndarray, int]],
+        on_batch: Optional[BatchCallback] = None,
+    ) -> Dict[str, Any]:
+        """Combine per-frame scores computed elsewhere (e.g. by
+        services.segments workers) into the same structure as :meth:`predict`.
+
+        *segments* yields ``(start, per_frame, scored, frame_indices,
+        sampled)`` in frame order, where *scored* is how many of the frames
+        actually went through the model, *frame_indices* the position of
+        each row among all sampled frames and *sampled* the number of
+        frames the segment read.
+        """
+        batches: List[Scores] = []
+        positions: List[np.ndarray] = []
+        scored = sampled = 0
+        for start, scores, n, indices, read in segments:
+            batches.append(scores)
+            positions.append(indices)
+            scored += n
+            sampled += read
+            if on_batch is not None and len(scores):
+                on_batch(start, scores, indices)
+        result = self._summarize(batches, scored if self.dedup_enabled else None)
+        indices = np.concatenate(positions) if positions else np.empty(0, dtype=np.int64)
+        if not np.array_equal(indices, np.arange(len(indices))):
+            # Segments dropped frames (face detection)
+            result["frame_indices"] = indices
+            result["frames_sampled"] = sampled
+        self._frames_seen += len(result["per_frame"])
+        self._frames_scored += scored
+        return result
+
+    def _summarize(self, batches: List[Scores], unique_frames: Optional[int]) -> Dict[str, Any]:
+        labels = self.labels
+        per_frame = np.concatenate(batches) if batches else np.empty((0, len(labels)), dtype=np.float32)
+        if not len(per_frame):
+            logger.warning("No frames provided for video prediction")
+            return {"per_frame": per_frame, "labels": labels, "average": {}, "label": "unknown", "confidence": 0.0}
 
-        label_keys = per_frame[0].keys()
-        average = {k: round(sum(f[k] for f in per_frame) / len(per_frame), 4) for k in label_keys}
+        # Accumulate in float64 so long videos don't lose precision
+        means = per_frame.mean(axis=0, dtype=np.float64)
+        average = {label: round(float(p), 4) for label, p in zip(labels, means)}
 
         predicted_label = max(average, key=average.get)  # type: ignore[arg-type]
         confidence = average[predicted_label]
@@ -86,11 +579,14 @@ class VideoDeepfakeDetector:
 
         result: Dict[str, Any] = {
             "per_frame": per_frame,
+            "labels": labels,
             "average": average,
             "label": canonical_label,
             "confidence": confidence,
         }
+        if unique_frames is not None:
+            result["unique_frames"] = unique_frames
 
-        logger.info("Video result: label=%s, confidence=%.4f", canonical_label, confidence)
+        logger.info("Video result: label=%s, confidence=%.4f over %d frames", canonical_label, confidence, len(per_frame))
         logger.debug("Per-frame scores: %s", per_frame)
         return result
@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+from typing import Dict, Iterable, Optional
+
+from utils.logger import logger
+
+# Defaults used when config.yaml has no ``admission`` section.
+DEFAULT_GATES: Dict[str, Dict[str, int]] = {
+    "video": {"concurrency": 2, "queue_depth": 4},
+    "text": {"concurrency": 8, "queue_depth": 32},
+    "search": {"concurrency": 8, "queue_depth": 32},
+}
+
+
+class Overloaded(Exception):
+    """Raised when a stage queue is full; ``retry_after`` is in seconds."""
+
+    def __init__(self, stage: str, retry_after: int) -> None:
+        super().__init__(f"The {stage} stage is at capacity, retry in {retry_after}s")
+        self.stage = stage
+        self.retry_after = retry_after
+
+
+class StageGate:
+    """Bounded concurrency plus a bounded wait queue for one pipeline stage.
+
+    ``reserved`` counts requests admitted but not yet running; admission is
+    refused once ``active + reserved`` would exceed ``concurrency +
+    queue_depth``. The hold time of finished slots feeds an EWMA that is
+    used to suggest a ``Retry-After`` value.
+    """
+
+    def __init__(self, name: str, concurrency: int, queue_depth: int) -> None:
+        self.name = name
+        self.concurrency = max(1, int(concurrency))
+        self.queue_depth = max(0, int(queue_depth))
+        self.active = 0
+        self.reserved = 0
+        self.rejected = 0
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._avg_hold = 1.0
+
+    def reserve(self, force: bool = False) -> None:
+        if not force and self.active + self.reserved >= self.concurrency + self.queue_depth:
+            self.rejected += 1
+            raise Overloaded(self.name, self.retry_after())
+        self.reserved += 1
+
+    def unreserve(self) -> None:
+        self.reserved -= 1
+
+    async def acquire(self) -> float:
+        await self._semaphore.acquire()
+        self.reserved -= 1
+        self.active += 1
+        return time.monotonic()
+
+    def release(self, started: float) -> None:
+        self.active -= 1
+        self._semaphore.release()
+        self._avg_hold = 0.8 * self._avg_hold + 0.2 * (time.monotonic() - started)
+
+    def retry_after(self) -> int:
+        waves = (self.reserved + 1) / self.concurrency
+        return max(1, math.ceil(self._avg_hold * waves))
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "active": self.active,
+            "queued": self.reserved,
+            "concurrency": self.concurrency,
+            "queue_depth": self.queue_depth,
+            "rejected": self.rejected,
+            "avg_hold_seconds": round(self._avg_hold, 2),
+        }
+
+
+class Ticket:
+    """One request's reservations across stage gates.
+
+    Obtained from :meth:`AdmissionController.admit`; pass it to
+    StageGraph.run as ``gates``. Always :meth:`close` it (it is also an async
+    context manager) so unused reservations and held slots are returned.
+    """
+
+    def __init__(self, gates: Dict[str, StageGate]) -> None:
+        self._gates = gates
+        self._reserved = set(gates)
+        self._held: Dict[str, float] = {}
+
+    async def acquire(self, name: str) -> None:
+        if name in self._held or name not in self._gates:
+            return
+        if name not in self._reserved:
+            self._gates[name].reserve(force=True)
+        self._reserved.discard(name)
+        try:
+            self._held[name] = await self._gates[name].acquire()
+        except BaseException:
+            self._gates[name].unreserve()
+            raise
+
+    def drop(self, name: str) -> None:
+        """Give back the reservation for a gate this request turned out not
+        to need; a held slot is left alone."""
+        if name in self._reserved:
+            self._reserved.discard(name)
+            self._gates.pop(name).unreserve()
+
+    def release(self, name: str) -> None:
+        started = self._held.pop(name, None)
+        if started is not None:
+            self._gates[name].release(started)
+
+    def close(self) -> None:
+        for name in list(self._held):
+            self.release(name)
+        for name in self._reserved:
+            self._gates[name].unreserve()
+        self._reserved.clear()
+
+    async def __aenter__(self) -> "Ticket":
+        return self
+
+    async def __aexit__(self, *exc: object) -> None:
+        self.close()
+
+
+class AdmissionController:
+    """Per-stage gates configured from the ``admission`` section of config.yaml::
+
+        admission:
+          video:  {concurrency: 2, queue_depth: 4}
+          text:   {concurrency: 8, queue_depth: 32}
+          search: {concurrency: 8, queue_depth: 32}
+    """
+
+    def __init__(self, cfg: Optional[dict] = None) -> None:
+        gate_cfg = (cfg or {}).get("admission") or {}
+        self.gates: Dict[str, StageGate] = {}
+        for name, defaults in DEFAULT_GATES.items():
+            opts = {**defaults, **(gate_cfg.get(name) or {})}
+            self.gates[name] = StageGate(name, opts["concurrency"], opts["queue_depth"])
+        logger.info(
+            "Admission gates: %s",
+            ", ".join(f"{n}={g.concurrency}+{g.queue_depth}q" for n, g in self.gates.items()),
+        )
+
+    def admit(self, stages: Iterable[str], force: bool = False, ticket: Optional[Ticket] = None) -> Ticket:
+        """Reserve a queue place in every gate of *stages* or raise Overloaded.
+
+        ``force`` skips the queue-depth check (used for work that was already
+        accepted, such as queued jobs). With *ticket*, gates it already holds
+        a place in are skipped and the new reservations are added to it.
+        """
+        held = ticket._gates if ticket is not None else {}
+        taken: Dict[str, StageGate] = {}
+        try:
+            for name in dict.fromkeys(stages):
+                if name in held:
+                    continue
+                gate = self.gates[name]
+                gate.reserve(force=force)
+                taken[name] = gate
+        except Overloaded:
+            for gate in taken.values():
+                gate.unreserve()
+            raise
+        if ticket is None:
+            return Ticket(taken)
+        ticket._gates.update(taken)
+        ticket._reserved.update(taken)
+        return ticket
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        return {name: gate.stats() for name, gate in self.gates.items()}
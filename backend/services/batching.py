@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+from utils.logger import logger
+
+_STOP = object()
+
+
+class MicroBatcher:
+    """Merges items submitted by concurrent requests into shared batches.
+
+    Callers on any thread hand over items with :meth:`run` (blocking) or
+    :meth:`submit` (returns one future per item). A single worker thread
+    collects queued items until ``max_batch_size`` is reached or
+    ``max_wait_ms`` has passed since the first item of the batch arrived,
+    calls ``batch_fn(items)`` once, and routes each output back to the future
+    of the item it belongs to. ``batch_fn`` must return one result per input,
+    in order.
+
+    The wait deadline bounds the latency a lone request pays for batching;
+    under concurrency, batches fill before the deadline and the model runs
+    fewer, fuller forward passes.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        batch_fn: Callable[[List[Any]], Sequence[Any]],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 10.0,
+    ) -> None:
+        self.name = name
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._batches = 0
+        self._items = 0
+        self._full_batches = 0
+        self._thread = threading.Thread(target=self._loop, name=f"batcher-{name}", daemon=True)
+        self._thread.start()
+        logger.info("MicroBatcher '%s' started (max_batch_size=%d, max_wait=%.1fms)",
+                    name, self.max_batch_size, self.max_wait * 1000)
+
+    def submit(self, items: Sequence[Any]) -> List[Future]:
+        futures: List[Future] = []
+        for item in items:
+            fut: Future = Future()
+            self._queue.put((item, fut))
+            futures.append(fut)
+        return futures
+
+    def run(self, items: Sequence[Any]) -> List[Any]:
+        """Submit *items* and block until all of their results are back."""
+        return [fut.result() for fut in self.submit(items)]
+
+    def stats(self) -> Dict[str, Any]:
+        batches = self._batches
+        return {
+            "batches": batches,
+            "items": self._items,
+            "queued": self._queue.qsize(),
+            "avg_batch_size": round(self._items / batches, 2) if batches else 0.0,
+            "avg_fill": round(self._items / (batches * self.max_batch_size), 3) if batches else 0.0,
+            "full_batches": self._full_batches,
+        }
+
+    def close(self) -> None:
+        self._queue.put(_STOP)
+        self._thread.join(timeout=5)
+
+    def _collect(self, first: Tuple[Any, Future]) -> Tuple[List[Tuple[Any, Future]], bool]:
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        stop = False
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                entry = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is _STOP:
+                stop = True
+                break
+            batch.append(entry)
+        return batch, stop
+
+    def _loop(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                break
+            batch, stop = self._collect(first)
+            self._dispatch(batch)
+            if stop:
+                break
+
+    def _dispatch(self, batch: List[Tuple[Any, Future]]) -> None:
+        live = [(item, fut) for item, fut in batch if fut.set_running_or_notify_cancel()]
+        if not live:
+            return
+        self._batches += 1
+        self._items += len(live)
+        if len(live) == self.max_batch_size:
+            self._full_batches += 1
+        try:
+            outputs = self.batch_fn([item for item, _ in live])
+            if len(outputs) != len(live):
+                raise RuntimeError(f"batch_fn returned {len(outputs)} results for {len(live)} items")
+        except Exception as exc:
+            logger.error("MicroBatcher '%s' batch of %d failed: %s", self.name, len(live), exc)
+            for _, fut in live:
+                fut.set_exception(exc)
+            return
+        for (_, fut), out in zip(live, outputs):
+            fut.set_result(out)
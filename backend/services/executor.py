@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from utils.logger import logger
+
+# Default sizes used when config.yaml has no ``execution`` section.
+DEFAULT_POOLS: Dict[str, Dict[str, int]] = {
+    "inference": {"workers": 2, "max_concurrency": 2},
+    "io": {"workers": 4, "max_concurrency": 8},
+    "decode": {"workers": 2, "max_concurrency": 2},
+    # Callers that only wait on a MicroBatcher; the batcher thread does the compute.
+    "batch": {"workers": 16, "max_concurrency": 16},
+}
+
+
+class ExecutorPool:
+    """A named thread pool with a cap on how many tasks may be in flight.
+
+    Tasks beyond ``max_concurrency`` wait on an asyncio semaphore instead of
+    piling up in the executor's unbounded work queue, so the event loop stays
+    free to serve other requests while they wait.
+    """
+
+    def __init__(self, name: str, workers: int, max_concurrency: Optional[int] = None) -> None:
+        self.name = name
+        self.workers = max(1, int(workers))
+        self.max_concurrency = max(1, int(max_concurrency or self.workers))
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f"truthx-{name}")
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._in_flight = 0
+        self._waiting = 0
+
+    async def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Run ``fn(*args, **kwargs)`` on this pool and await its result."""
+        self._waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._waiting -= 1
+        self._in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+        finally:
+            self._in_flight -= 1
+            self._semaphore.release()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "workers": self.workers,
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self._in_flight,
+            "waiting": self._waiting,
+        }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class ExecutionLayer:
+    """Dedicated pools for CPU inference, subprocess/IO work and decoding.
+
+    Pool sizes come from the ``execution.pools`` section of config.yaml::
+
+        execution:
+          pools:
+            inference: {workers: 2, max_concurrency: 2}
+            io:        {workers: 4, max_concurrency: 8}
+            decode:    {workers: 2, max_concurrency: 2}
+            batch:     {workers: 16, max_concurrency: 16}
+    """
+
+    def __init__(self, cfg: Optional[dict] = None) -> None:
+        pool_cfg = ((cfg or {}).get("execution") or {}).get("pools") or {}
+        self.pools: Dict[str, ExecutorPool] = {}
+        for name, defaults in DEFAULT_POOLS.items():
+            opts = {**defaults, **(pool_cfg.get(name) or {})}
+            self.pools[name] = ExecutorPool(name, opts["workers"], opts.get("max_concurrency"))
+        for name, opts in pool_cfg.items():
+            if name not in self.pools:
+                opts = opts or {}
+                self.pools[name] = ExecutorPool(name, opts.get("workers", 1), opts.get("max_concurrency"))
+
+        logger.info(
+            "Execution pools: %s",
+            ", ".join(f"{n}={p.workers}w/{p.max_concurrency}c" for n, p in self.pools.items()),
+        )
+
+    def pool(self, name: str) -> ExecutorPool:
+        try:
+            return self.pools[name]
+        except KeyError:
+            raise ValueError(f"Unknown executor pool: {name}") from None
+
+    async def run(self, pool_name: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        return await self.pool(pool_name).run(fn, *args, **kwargs)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {name: p.stats() for name, p in self.pools.items()}
+
+    def shutdown(self) -> None:
+        for p in self.pools.values():
+            p.shutdown()
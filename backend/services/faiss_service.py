@@ -136,7 +136,7 @@ class FAISSSearch:
 
             scores = (self.embeddings @ query_vec.T).squeeze()
 
-            k = min(k, len(self.articles))
+            k = max(1, min(k, len(self.articles)))
             top_indices = np.argsort(scores)[::-1][:k]
 
             results = []
@@ -153,3 +153,41 @@ class FAISSSearch:
             import traceback
             traceback.print_exc()
             return []
+
+    def search_batch(self, queries: List[str], k: int = 3) -> List[List[Dict[str, Any]]]:
+        """Return the k most similar articles for each query.
+
+        All queries are encoded in one call and scored against the article
+        embeddings with a single matrix multiply. Empty queries get [].
+        """
+        results: List[List[Dict[str, Any]]] = [[] for _ in queries]
+        if self.embeddings is None or len(self.articles) == 0:
+            logger.warning("No embeddings available; cannot search")
+            return results
+
+        live = [i for i, q in enumerate(queries) if q and q.strip()]
+        if not live:
+            return results
+
+        try:
+            query_vecs = self.model.encode([queries[i] for i in live])
+            query_vecs = np.array(query_vecs, dtype=np.float32, copy=True)
+            _normalize_l2(query_vecs)
+
+            scores = query_vecs @ self.embeddings.T  # (queries, articles)
+
+            k = max(1, min(k, len(self.articles)))
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            for row, qi in enumerate(live):
+                ranked = top[row][np.argsort(-scores[row, top[row]])]
+                for idx in ranked:
+                    article = self.articles[idx].copy()
+                    article['similarity_score'] = round(float(scores[row, idx]), 4)
+                    results[qi].append(article)
+
+            logger.info(f"Batch search scored {len(live)} queries against {len(self.articles)} articles")
+            return results
+
+        except Exception as e:
+            logger.error(f"Error during batch search: {e}")
+            return [[] for _ in queries]
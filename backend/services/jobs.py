@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import asyncio
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from utils.logger import logger
+
+
+class QueueFull(Exception):
+    """Raised by :meth:`JobQueue.submit` when the backlog limit is reached."""
+
+
+class Job:
+    """One queued analysis. ``payload`` is passed to the queue's runner as kwargs."""
+
+    def __init__(self, payload: Dict[str, Any], cleanup: Optional[Callable[[], None]] = None) -> None:
+        self.id = uuid.uuid4().hex
+        self.payload = payload
+        self.cleanup = cleanup
+        self.status = "queued"
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class JobQueue:
+    """In-process job queue drained by a fixed number of asyncio workers.
+
+    Finished jobs (``done`` or ``failed``) are kept for ``result_ttl`` seconds
+    and then forgotten.
+    """
+
+    def __init__(
+        self,
+        runner: Callable[..., Awaitable[Dict[str, Any]]],
+        workers: int = 2,
+        max_queued: int = 100,
+        result_ttl: float = 3600.0,
+    ) -> None:
+        self.runner = runner
+        self.workers = max(1, int(workers))
+        self.max_queued = max(1, int(max_queued))
+        self.result_ttl = float(result_ttl)
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._jobs: Dict[str, Job] = {}
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self) -> None:
+        for i in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._worker(), name=f"job-worker-{i}"))
+        logger.info("Job queue started (%d workers, max %d queued, ttl %.0fs)",
+                    self.workers, self.max_queued, self.result_ttl)
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+        for job in self._jobs.values():
+            if job.status == "queued":
+                self._cleanup(job)
+        self._jobs.clear()
+
+    def full(self) -> bool:
+        return self._queue.qsize() >= self.max_queued
+
+    def submit(self, payload: Dict[str, Any], cleanup: Optional[Callable[[], None]] = None) -> Job:
+        self._expire()
+        if self.full():
+            raise QueueFull(f"Job queue is full ({self.max_queued} waiting)")
+        job = Job(payload, cleanup)
+        self._jobs[job.id] = job
+        self._queue.put_nowait(job)
+        logger.info("Job %s queued (%d waiting)", job.id, self._queue.qsize())
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        self._expire()
+        return self._jobs.get(job_id)
+
+    def stats(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {"queued": 0, "running": 0, "done": 0, "failed": 0}
+        for job in self._jobs.values():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return counts
+
+    def _expire(self) -> None:
+        now = time.time()
+        expired = [
+            jid for jid, job in self._jobs.items()
+            if job.finished_at is not None and now - job.finished_at > self.result_ttl
+        ]
+        for jid in expired:
+            del self._jobs[jid]
+
+    @staticmethod
+    def _cleanup(job: Job) -> None:
+        if job.cleanup is None:
+            return
+        try:
+            job.cleanup()
+        except Exception as exc:
+            logger.warning("Cleanup for job %s failed: %s", job.id, exc)
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            job.status = "running"
+            job.started_at = time.time()
+            try:
+                job.result = await self.runner(**job.payload)
+                job.status = "done"
+            except asyncio.CancelledError:
+                job.status = "failed"
+                job.error = "Server shutting down"
+                raise
+            except Exception as exc:
+                logger.error("Job %s failed: %s", job.id, exc)
+                job.status = "failed"
+                job.error = str(getattr(exc, "detail", exc))
+            finally:
+                job.finished_at = time.time()
+                self._cleanup(job)
+                self._queue.task_done()
+            logger.info("Job %s %s in %.2fs", job.id, job.status, job.finished_at - job.started_at)
@@ -0,0 +1,262 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any, Callable, Dict, Iterable, Optional, Sequence
+
+from utils.logger import logger
+
+
+class Stage:
+    """One node of the analysis DAG.
+
+    ``fn`` is called with one keyword argument per name in ``inputs``; each
+    name refers either to an upstream stage or to a value in the run context.
+    ``pool`` names the executor pool the stage runs on (``None`` runs it
+    inline on the event loop, which is only appropriate for cheap work).
+    ``after`` lists stages that must finish first without passing their
+    result along. A ``transient`` result is dropped as soon as every dependent has picked
+    it up, so large intermediates such as decoded frames are not kept alive
+    until the whole pipeline finishes. If no dependent ever runs with it
+    (dependents skipped, run cancelled), its ``close()`` is called, if it
+    has one, when the run ends; a run that is cancelled while a dependent
+    is still working on it closes it right away, so that dependent's worker
+    thread stops early. ``gate`` names an admission gate
+    (services.admission) held while the stage runs; stages sharing a gate
+    hold a single slot from the first one's start until the last one ends.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        fn: Callable[..., Any],
+        inputs: Sequence[str] = (),
+        pool: Optional[str] = None,
+        transient: bool = False,
+        after: Sequence[str] = (),
+        gate: Optional[str] = None,
+    ) -> None:
+        self.name = name
+        self.fn = fn
+        self.inputs = tuple(inputs)
+        self.pool = pool
+        self.transient = transient
+        self.after = tuple(after)
+        self.gate = gate
+
+
+class SkippedStage(Exception):
+    """Recorded for a stage whose upstream dependency failed."""
+
+    def __init__(self, stage: str, cause: BaseException) -> None:
+        super().__init__(str(cause))
+        self.stage = stage
+        self.cause = cause
+
+
+class ShortCircuit(Exception):
+    """Raised by a stage that already has the final answer (e.g. a cache hit).
+
+    It is recorded like a failure, so dependent stages are skipped, but is
+    not logged as an error. The answer is available as ``value``.
+    """
+
+    def __init__(self, value: Any) -> None:
+        super().__init__("pipeline short-circuited")
+        self.value = value
+
+
+class PipelineResult:
+    def __init__(self) -> None:
+        self.results: Dict[str, Any] = {}
+        self.errors: Dict[str, BaseException] = {}
+        self.timings: Dict[str, float] = {}
+
+    def get(self, name: str, default: Any = None) -> Any:
+        return self.results.get(name, default)
+
+
+class StageGraph:
+    """Runs a set of stages concurrently, respecting their declared inputs.
+
+    Every stage starts as soon as all of its inputs are available, so the
+    end-to-end latency approaches the critical path rather than the sum of
+    all stages. A failing stage does not abort the run: its exception is
+    recorded in ``errors`` and its dependents are skipped with a
+    :class:`SkippedStage` carrying the original cause.
+    """
+
+    def __init__(self, stages: Iterable[Stage]) -> None:
+        self.stages: Dict[str, Stage] = {}
+        for stage in stages:
+            if stage.name in self.stages:
+                raise ValueError(f"Duplicate stage name: {stage.name}")
+            self.stages[stage.name] = stage
+
+    def _validate(self, context: Dict[str, Any]) -> None:
+        for stage in self.stages.values():
+            for dep in stage.inputs:
+                if dep not in self.stages and dep not in context:
+                    raise ValueError(f"Stage '{stage.name}' depends on unknown input '{dep}'")
+            for dep in stage.after:
+                if dep not in self.stages:
+                    raise ValueError(f"Stage '{stage.name}' runs after unknown stage '{dep}'")
+
+        # Kahn's algorithm — any leftover node sits on a cycle
+        deps = {n: {d for d in s.inputs + s.after if d in self.stages} for n, s in self.stages.items()}
+        indegree = {n: len(d) for n, d in deps.items()}
+        ready = [n for n, d in indegree.items() if d == 0]
+        seen = 0
+        while ready:
+            node = ready.pop()
+            seen += 1
+            for other, other_deps in deps.items():
+                if node in other_deps:
+                    indegree[other] -= 1
+                    if indegree[other] == 0:
+                        ready.append(other)
+        if seen != len(self.stages):
+            raise ValueError("Stage graph contains a cycle")
+
+    async def run(
+        self,
+        context: Dict[str, Any],
+        executor: Any = None,
+        on_complete: Optional[Callable[[str, Any], None]] = None,
+        gates: Any = None,
+    ) -> PipelineResult:
+        """Execute all stages; ``executor`` is a services.executor.ExecutionLayer.
+
+        ``on_complete(name, result)`` is called on the event loop as each
+        stage finishes successfully. ``gates`` is a services.admission.Ticket;
+        without one, stage gates are ignored.
+        """
+        self._validate(context)
+        out = PipelineResult()
+        consumers = {n: sum(n in s.inputs for s in self.stages.values()) for n in self.stages}
+        tasks: Dict[str, asyncio.Task] = {}
+        # Transient results no stage has been called with yet; closed at the end
+        unclaimed: Dict[str, Any] = {}
+        gate_users: Dict[str, int] = {}
+        for stage in self.stages.values():
+            if stage.gate is not None:
+                gate_users[stage.gate] = gate_users.get(stage.gate, 0) + 1
+
+        def _leave_gate(stage: Stage) -> None:
+            if stage.gate is None or gates is None:
+                return
+            gate_users[stage.gate] -= 1
+            if gate_users[stage.gate] == 0:
+                gates.release(stage.gate)
+
+        async def _run_on_pool(stage: Stage, kwargs: Dict[str, Any]) -> Any:
+            # Cancelling an await on a worker thread does not stop the thread.
+            # Close the transient inputs it is consuming so it returns early,
+            # and only give up the stage (and its gate slot) once it has.
+            work = asyncio.ensure_future(executor.run(stage.pool, stage.fn, **kwargs))
+            try:
+                return await asyncio.shield(work)
+            except asyncio.CancelledError:
+                for dep in stage.inputs:
+                    close = getattr(kwargs.get(dep), "close", None)
+                    if dep in self.stages and self.stages[dep].transient and close is not None:
+                        logger.debug("Run cancelled: closing input '%s' of stage '%s'", dep, stage.name)
+                        try:
+                            close()
+                        except Exception as exc:
+                            logger.warning("Closing result of stage '%s' failed: %s", dep, exc)
+                while not work.done():
+                    try:
+                        await asyncio.wait({work})
+                    except asyncio.CancelledError:
+                        continue
+                if not work.cancelled():
+                    work.exception()  # the run is cancelled; its outcome no longer matters
+                raise
+
+        async def _run_stage(stage: Stage) -> None:
+            kwargs: Dict[str, Any] = {}
+            failed: Optional[BaseException] = None
+            for dep in stage.after:
+                await tasks[dep]
+                if dep in out.errors:
+                    err = out.errors[dep]
+                    failed = failed or (err.cause if isinstance(err, SkippedStage) else err)
+            for dep in stage.inputs:
+                if dep not in self.stages:
+                    kwargs[dep] = context[dep]
+                    continue
+                await tasks[dep]
+                if dep in out.errors:
+                    err = out.errors[dep]
+                    failed = failed or (err.cause if isinstance(err, SkippedStage) else err)
+                else:
+                    kwargs[dep] = out.results[dep]
+                consumers[dep] -= 1
+                if consumers[dep] == 0 and self.stages[dep].transient:
+                    out.results.pop(dep, None)
+            if failed is not None:
+                out.errors[stage.name] = SkippedStage(stage.name, failed)
+                _leave_gate(stage)
+                return
+
+            if stage.gate is not None and gates is not None:
+                await gates.acquire(stage.gate)
+            for dep in stage.inputs:
+                # The stage owns (and must close) what it is called with
+                unclaimed.pop(dep, None)
+            t0 = time.perf_counter()
+            try:
+                if asyncio.iscoroutinefunction(stage.fn):
+                    result = await stage.fn(**kwargs)
+                elif stage.pool is not None and executor is not None:
+                    result = await _run_on_pool(stage, kwargs)
+                else:
+                    result = stage.fn(**kwargs)
+            except ShortCircuit as exc:
+                logger.info("Stage '%s' short-circuited the pipeline", stage.name)
+                out.errors[stage.name] = exc
+            except Exception as exc:
+                logger.error("Stage '%s' failed: %s", stage.name, exc)
+                out.errors[stage.name] = exc
+            else:
+                out.results[stage.name] = result
+                if stage.transient:
+                    unclaimed[stage.name] = result
+                out.timings[stage.name] = time.perf_counter() - t0
+                if on_complete is not None:
+                    try:
+                        on_complete(stage.name, result)
+                    except Exception as exc:
+                        logger.warning("on_complete hook for stage '%s' failed: %s", stage.name, exc)
+            finally:
+                out.timings.setdefault(stage.name, time.perf_counter() - t0)
+                _leave_gate(stage)
+
+        t_start = time.perf_counter()
+        for stage in self.stages.values():
+            tasks[stage.name] = asyncio.create_task(_run_stage(stage), name=f"stage:{stage.name}")
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            raise
+        finally:
+            for name, result in unclaimed.items():
+                close = getattr(result, "close", None)
+                if close is not None:
+                    logger.debug("Closing unused result of stage '%s'", name)
+                    try:
+                        close()
+                    except Exception as exc:
+                        logger.warning("Closing result of stage '%s' failed: %s", name, exc)
+
+        wall = time.perf_counter() - t_start
+        logger.info(
+            "Pipeline finished in %.2fs (sum of stages %.2fs): %s",
+            wall,
+            sum(out.timings.values()),
+            ", ".join(f"{n}={t:.2f}s" for n, t in out.timings.items()),
+        )
+        return out
@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from utils.logger import logger
+
+
+class ResultCache:
+    """Two-tier cache of analysis reports keyed by content hash.
+
+    The memory tier is an LRU of serialized reports bounded by
+    ``memory_max_mb`` (counted in the same UTF-8 JSON bytes the disk tier
+    writes); the disk tier stores one JSON file per key under
+    ``directory`` and evicts least-recently-used files (by mtime, which is
+    bumped on every hit) once the directory exceeds ``disk_max_mb``.
+    Reports are stored serialized so every hit hands out a fresh copy.
+    """
+
+    def __init__(self, directory: str, memory_max_mb: float = 64, disk_max_mb: float = 1024) -> None:
+        self.directory = directory
+        self.memory_max_bytes = int(memory_max_mb * 1024 * 1024)
+        self.disk_max_bytes = int(disk_max_mb * 1024 * 1024)
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._hits = {"memory": 0, "disk": 0}
+        self._misses = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._disk_bytes = sum(
+            os.path.getsize(os.path.join(directory, name))
+            for name in os.listdir(directory) if name.endswith(".json")
+        )
+        logger.info("Result cache at '%s' (%.1f MB on disk)", directory, self._disk_bytes / (1024 * 1024))
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            blob = self._memory.get(key)
+            if blob is not None:
+                self._memory.move_to_end(key)
+                self._hits["memory"] += 1
+                return json.loads(blob)
+
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                blob = f.read()
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self._misses += 1
+            return None
+
+        with self._lock:
+            self._hits["disk"] += 1
+            self._remember(key, blob)
+        return json.loads(blob)
+
+    def put(self, key: str, report: Dict[str, Any]) -> None:
+        blob = json.dumps(report).encode("utf-8")
+        path = self._path(key)
+        tmp_path = f"{path}.tmp"
+        try:
+            # Overwriting a key replaces its file, so only the difference counts
+            replaced = os.path.getsize(path) if os.path.exists(path) else 0
+            with open(tmp_path, "wb") as f:
+                f.write(blob)
+            os.replace(tmp_path, path)
+        except OSError as exc:
+            logger.warning("Could not write cache entry %s: %s", key, exc)
+            return
+
+        with self._lock:
+            self._remember(key, blob)
+            self._disk_bytes += len(blob) - replaced
+            if self._disk_bytes > self.disk_max_bytes:
+                self._evict_disk()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "memory_entries": len(self._memory),
+                "memory_mb": round(self._memory_bytes / (1024 * 1024), 2),
+                "disk_mb": round(self._disk_bytes / (1024 * 1024), 2),
+                "hits": dict(self._hits),
+                "misses": self._misses,
+            }
+
+    def _remember(self, key: str, blob: bytes) -> None:
+        if len(blob) > self.memory_max_bytes:
+            return
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_bytes -= len(old)
+        self._memory[key] = blob
+        self._memory_bytes += len(blob)
+        while self._memory_bytes > self.memory_max_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    def _evict_disk(self) -> None:
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        # Leave some headroom so we don't rescan the directory on every put
+        target = int(self.disk_max_bytes * 0.9)
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= target:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        self._disk_bytes = total
+        logger.info("Result cache evicted %d file(s); %.1f MB on disk", removed, total / (1024 * 1024))
@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import math
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+from utils.logger import logger
+
+# Detector loaded once per worker process when segments are scored in workers.
+_worker_detector: Any = None
+# Barrier shared by all workers of a pool; SegmentPool.start waits on it.
+_worker_ready: Any = None
+
+
+@dataclass(frozen=True)
+class Segment:
+    """One time range of a video, as native frame indices ``[start, stop)``.
+
+    ``stop`` is None for the last segment, which runs to the end of the file
+    since container frame counts are only estimates. ``first_sample`` is the
+    index of the segment's first sampled frame in the whole video.
+    """
+
+    index: int
+    start: int
+    stop: Optional[int]
+    interval: int
+    first_sample: int
+
+
+def _init_worker(score: bool, threads: int, ready: Any) -> None:
+    global _worker_detector, _worker_ready
+    _worker_ready = ready
+    import cv2
+    cv2.setNumThreads(threads)
+    if score:
+        import torch
+        torch.set_num_threads(threads)
+        from models.video.deepfake_detector import VideoDeepfakeDetector
+        _worker_detector = VideoDeepfakeDetector()
+
+
+def _await_workers(timeout: float) -> None:
+    # Only returns once every worker runs one of these, so each task of a
+    # batch of ``workers`` lands on its own, fully initialized, process
+    _worker_ready.wait(timeout)
+
+
+def _decode_segment(video_path: str, segment: Segment, size: Optional[Tuple[int, int]]) -> list:
+    from utils.preprocessing import iter_frame_range
+    return list(iter_frame_range(video_path, segment.start, segment.stop, segment.interval, size))
+
+
+def _score_segment(video_path: str, segment: Segment, size: Optional[Tuple[int, int]]) -> Dict[str, Any]:
+    import numpy as np
+    from utils.preprocessing import iter_frame_range
+    result = _worker_detector.predict(iter_frame_range(video_path, segment.start, segment.stop, segment.interval, size))
+    per_frame = result["per_frame"]
+    # Rows map to sampled frames of the whole video (faces may drop some)
+    local = result.get("frame_indices", np.arange(len(per_frame), dtype=np.int64))
+    return {
+        "per_frame": per_frame,
+        "scored": result.get("unique_frames", len(per_frame)),
+        "frame_indices": segment.first_sample + local,
+        "sampled": result.get("frames_sampled", len(per_frame)),
+    }
+
+
+class SegmentPool:
+    """Map-reduce frame sampling for long videos over a process pool.
+
+    The video is split by time into segments on the sampling grid that
+    iter_frames would use; each worker opens the file, seeks to its
+    segment's first frame and decodes only that range, so decoding scales
+    with cores instead of running on one. Results come back in segment
+    order, and at most ``2 * workers`` segments are in flight so memory
+    stays bounded. With ``score`` each worker also loads the video detector
+    and returns per-frame scores instead of frames; this is what keeps
+    full-resolution frames (needed for face cropping) inside the workers.
+
+    Configured from ``video.segments``::
+
+        segments:
+          enabled: false
+          workers: 0                # 0 = one per CPU
+          min_segment_seconds: 30
+          score_in_workers: false
+    """
+
+    def __init__(self, workers: int = 0, min_segment_seconds: float = 30, score: bool = False) -> None:
+        self.workers = max(1, int(workers or os.cpu_count() or 1))
+        self.min_segment_seconds = float(min_segment_seconds)
+        self.score = bool(score)
+        # Split the cores between workers so their decode/torch threads don't oversubscribe
+        threads = max(1, (os.cpu_count() or 1) // self.workers)
+        # spawn: forking a process that already runs threads (uvicorn, torch) is unsafe
+        context = multiprocessing.get_context("spawn")
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(self.score, threads, context.Barrier(self.workers)),
+        )
+        self._segments_done = 0
+        logger.info("Segment pool: %d worker process(es)%s", self.workers, ", scoring in workers" if score else "")
+
+    def start(self, timeout: float = 600) -> None:
+        """Spawn the worker processes (and load their models) now rather
+        than on the first segment. Returns once every worker is initialized;
+        raises threading.BrokenBarrierError if that takes over *timeout*
+        seconds."""
+        for future in [self._pool.submit(_await_workers, timeout) for _ in range(self.workers)]:
+            future.result()
+
+    def plan(self, video_path: str, target_fps: float, max_frames: Optional[int] = None) -> List[Segment]:
+        """Split a video into segments, or return ``[]`` when it is too short
+        (or its length unknown) for more than one segment to pay off. The
+        sampling grid honours *max_frames* as iter_frames does."""
+        from utils.preprocessing import sample_interval, video_info
+        native_fps, total_frames, _, _ = video_info(video_path)
+        if native_fps <= 0 or total_frames <= 0:
+            return []
+        duration = total_frames / native_fps
+        count = min(4 * self.workers, int(duration // self.min_segment_seconds))
+        if count < 2:
+            return []
+        interval = sample_interval(native_fps, target_fps, total_frames, max_frames)
+        samples = math.ceil(total_frames / interval)
+        count = min(count, samples)
+        bounds = [k * samples // count for k in range(count + 1)]
+        return [
+            Segment(k, bounds[k] * interval, bounds[k + 1] * interval if k + 1 < count else None,
+                    interval, bounds[k])
+            for k in range(count)
+        ]
+
+    def _ordered(self, fn: Callable[..., Any], video_path: str, segments: List[Segment],
+                 size: Optional[Tuple[int, int]]) -> Iterator[Any]:
+        pending: Deque[Future] = deque()
+        todo = iter(segments)
+        try:
+            for segment in todo:
+                pending.append(self._pool.submit(fn, video_path, segment, size))
+                if len(pending) >= 2 * self.workers:
+                    break
+            while pending:
+                result = pending.popleft().result()
+                for segment in todo:
+                    pending.append(self._pool.submit(fn, video_path, segment, size))
+                    break
+                self._segments_done += 1
+                yield result
+        finally:
+            for fut in pending:
+                fut.cancel()
+
+    def iter_frames(self, video_path: str, segments: List[Segment],
+                    size: Optional[Tuple[int, int]] = None) -> Iterator[Any]:
+        """Yield the sampled frames of every segment, in video order."""
+        for frames in self._ordered(_decode_segment, video_path, segments, size):
+            yield from frames
+
+    def iter_scores(self, video_path: str, segments: List[Segment], size: Optional[Tuple[int, int]] = None,
+                    limit: Optional[int] = None) -> Iterator[Tuple[int, Any, int, Any, int]]:
+        """Yield ``(start, per_frame, scored, frame_indices, sampled)`` per
+        segment, in video order, with segments decoded and scored in the
+        workers (needs ``score``); see VideoDeepfakeDetector.merge_scores.
+        At most *limit* frames are returned in total."""
+        if not self.score:
+            raise RuntimeError("SegmentPool was not started with score=True")
+        start = 0
+        for result in self._ordered(_score_segment, video_path, segments, size):
+            per_frame, indices = result["per_frame"], result["frame_indices"]
+            if limit is not None and start + len(per_frame) >= limit:
+                keep = limit - start
+                sampled = int(indices[keep - 1] - indices[0]) + 1 if keep > 0 else 0
+                yield start, per_frame[:keep], min(result["scored"], keep), indices[:keep], sampled
+                return
+            yield start, per_frame, result["scored"], indices, result["sampled"]
+            start += len(per_frame)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"workers": self.workers, "score_in_workers": self.score, "segments_done": self._segments_done}
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+
+from services.admission import AdmissionController, Overloaded
+
+
+def _controller(concurrency=1, queue_depth=1):
+    return AdmissionController({"admission": {"video": {"concurrency": concurrency, "queue_depth": queue_depth}}})
+
+
+def test_rejects_once_slots_and_queue_are_reserved():
+    admission = _controller(concurrency=1, queue_depth=1)
+    first = admission.admit(["video"])
+    second = admission.admit(["video"])
+    with pytest.raises(Overloaded) as exc:
+        admission.admit(["video"])
+    assert exc.value.stage == "video"
+    assert exc.value.retry_after >= 1
+    assert admission.stats()["video"]["rejected"] == 1
+
+    first.close()
+    admission.admit(["video"]).close()
+    second.close()
+    assert admission.stats()["video"]["queued"] == 0
+
+
+def test_failed_admission_returns_earlier_reservations():
+    admission = AdmissionController({"admission": {"text": {"concurrency": 1, "queue_depth": 0}}})
+    held = admission.admit(["text"])
+    with pytest.raises(Overloaded):
+        admission.admit(["video", "text"])
+    assert admission.stats()["video"]["queued"] == 0
+    held.close()
+
+
+def test_force_skips_the_queue_depth_check():
+    admission = _controller(concurrency=1, queue_depth=0)
+    held = admission.admit(["video"])
+    forced = admission.admit(["video"], force=True)
+    assert admission.stats()["video"]["queued"] == 2
+    forced.close()
+    held.close()
+
+
+def test_ticket_holds_a_slot_until_released():
+    async def run():
+        admission = _controller(concurrency=1, queue_depth=2)
+        first, second = admission.admit(["video"]), admission.admit(["video"])
+        await first.acquire("video")
+        waiter = asyncio.ensure_future(second.acquire("video"))
+        await asyncio.sleep(0.01)
+        assert not waiter.done()
+        assert admission.stats()["video"]["active"] == 1
+        first.release("video")
+        await asyncio.wait_for(waiter, 1)
+        second.close()
+        first.close()
+        return admission.stats()["video"]
+
+    stats = asyncio.run(run())
+    assert stats["active"] == 0 and stats["queued"] == 0
+
+
+def test_drop_and_extend_a_ticket():
+    admission = _controller(concurrency=1, queue_depth=0)
+    ticket = admission.admit(["video"])
+    ticket.drop("video")
+    assert admission.stats()["video"]["queued"] == 0
+
+    ticket = admission.admit(["video"])
+    admission.admit(["video", "text", "search"], force=True, ticket=ticket)
+    stats = admission.stats()
+    assert stats["video"]["queued"] == 1 and stats["text"]["queued"] == 1
+    ticket.close()
+    stats = admission.stats()
+    assert stats["video"]["queued"] == 0 and stats["text"]["queued"] == 0
@@ -0,0 +1,97 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import api
+from services.admission import AdmissionController
+
+
+@pytest.fixture
+def client(monkeypatch):
+    # No lifespan: models are not loaded, only the request-shaping code runs
+    monkeypatch.setitem(api._models, "config", {"text": {"bulk_max_items": 3, "bulk_max_mb": 1},
+                                                "upload": {"max_size_mb": 1}})
+    monkeypatch.setattr(api, "_admission", AdmissionController(
+        {"admission": {"video": {"concurrency": 1, "queue_depth": 0}}}))
+    return TestClient(api.app)
+
+
+def _upload():
+    # Over _MULTIPART_SLACK, so admitted as an upload, but within the body cap
+    return {"video": ("clip.mp4", b"\0" * (1536 * 1024))}
+
+
+def _chunked_form(file_bytes, fields=()):
+    """A multipart body with a ``video`` part, sent without Content-Length."""
+    boundary = "limits-boundary"
+
+    def body():
+        for name, value in fields:
+            yield f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+        yield (f'--{boundary}\r\nContent-Disposition: form-data; name="video"; filename="clip.mp4"\r\n'
+               f"Content-Type: video/mp4\r\n\r\n").encode()
+        for start in range(0, file_bytes, 256 * 1024):
+            yield b"\0" * min(256 * 1024, file_bytes - start)
+        yield f"\r\n--{boundary}--\r\n".encode()
+
+    return body(), {"content-type": f"multipart/form-data; boundary={boundary}"}
+
+
+def test_full_video_gate_refuses_upload_with_retry_after(client):
+    held = api._admission.admit(["video"])
+    try:
+        response = client.post("/analyze", files=_upload())
+    finally:
+        held.close()
+    assert response.status_code == 429
+    assert int(response.headers["retry-after"]) >= 1
+
+
+@pytest.mark.parametrize("path", ["/analyze", "/analyze/stream", "/jobs"])
+@pytest.mark.parametrize("size_kb", [1536, 3072])  # over the file cap / over the body cap too
+def test_chunked_oversized_upload_is_refused(client, tmp_path, path, size_kb):
+    api._models["config"]["temp_dir"] = str(tmp_path)
+    body, headers = _chunked_form(size_kb * 1024)
+    response = client.post(path, content=body, headers=headers)
+    assert response.status_code == 413
+    assert api._admission.stats()["video"]["queued"] == 0
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_malformed_form_is_refused(client):
+    response = client.post("/analyze", content=b"--x\r\nnot a part",
+                           headers={"content-type": "multipart/form-data; boundary=x"})
+    assert response.status_code == 400
+
+
+def test_bad_form_field_is_refused_before_the_upload_is_read(client):
+    body, headers = _chunked_form(1536 * 1024, fields=[("max_frames", "many")])
+    response = client.post("/analyze", content=body, headers=headers)
+    assert response.status_code == 400
+
+
+def test_upload_reservation_is_returned_when_the_handler_rejects(client):
+    response = client.post("/analyze", files=_upload(), data={"sampling": "bogus"})
+    assert response.status_code == 400
+    assert api._admission.stats()["video"]["queued"] == 0
+
+
+def test_bulk_text_entry_limit(client):
+    assert client.post("/analyze/text/batch", json=["a"] * 4).status_code == 413
+
+    def lines():
+        for _ in range(4):
+            yield b'"text"\n'
+
+    response = client.post("/analyze/text/batch", content=lines(),
+                           headers={"content-type": "application/x-ndjson"})
+    assert response.status_code == 413
+
+
+def test_chunked_bulk_body_byte_limit(client):
+    def big():
+        for _ in range(3):
+            yield b'"' + b"x" * 600000 + b'"\n'
+
+    response = client.post("/analyze/text/batch", content=big(), headers={"content-type": "application/x-ndjson"})
+    assert response.status_code == 413
+    assert api._admission.stats()["text"]["queued"] == 0
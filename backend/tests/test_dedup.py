@@ -0,0 +1,27 @@
+import numpy as np
+
+from utils.dedup import FrameDeduplicator
+
+
+def _frame(seed, brightness=0):
+    rng = np.random.default_rng(seed)
+    return np.clip(rng.integers(0, 256, (72, 96, 3)) + brightness, 0, 255).astype(np.uint8)
+
+
+def test_near_duplicates_join_the_first_group():
+    a, b = _frame(1), _frame(2)
+    dedup = FrameDeduplicator(max_distance=4)
+    assert dedup.assign([a, a.copy(), b]) == [0, 0, 1]
+    # Representatives persist across batches
+    assert dedup.assign([b, a]) == [1, 0]
+    assert dedup.groups == 2
+
+
+def test_flat_frames_of_different_brightness_stay_apart():
+    dark = np.full((72, 96, 3), 10, dtype=np.uint8)
+    light = np.full((72, 96, 3), 200, dtype=np.uint8)
+    assert FrameDeduplicator().assign([dark, light, dark]) == [0, 1, 0]
+
+
+def test_empty_batch():
+    assert FrameDeduplicator().assign([]) == []
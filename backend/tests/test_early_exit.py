@@ -0,0 +1,123 @@
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+import pytest
+
+from models.video.deepfake_detector import VideoDeepfakeDetector, _spread_order
+from utils import preprocessing
+
+
+class _Detector(VideoDeepfakeDetector):
+    """Scores a frame (an int) with a fixed function instead of a model."""
+
+    def __init__(self, score, min_frames=16):
+        self.score = score
+        self.batch_size = 8
+        self.batcher = None
+        self.faces = None
+        self.tensorizer = None
+        self.dedup_enabled = False
+        self.early_exit_confidence = 0.99
+        self.early_exit_min_frames = min_frames
+        self.early_exit_min_coverage = 0.0
+        self._frames_seen = self._frames_scored = 0
+        self.extractor = SimpleNamespace(do_resize=False)
+        self.model = SimpleNamespace(config=SimpleNamespace(id2label={0: "Fake", 1: "Real"}))
+
+    def _predict_batch(self, frames):
+        return np.array([self.score(f) for f in frames], dtype=np.float32)
+
+
+class _Seekable:
+    def __init__(self, n):
+        self.n = n
+        self.fetched = []
+
+    def __len__(self):
+        return self.n
+
+    def fetch(self, samples):
+        self.fetched.extend(samples)
+        return list(samples)
+
+
+def _clear_real(frame):
+    return [0.1, 0.9] if frame % 3 else [0.2, 0.8]
+
+
+def test_spread_order_is_a_permutation_with_spread_prefixes():
+    order = _spread_order(1000)
+    assert sorted(order) == list(range(1000))
+    assert order[:4] == [0, 512, 256, 768]
+
+
+def test_consistent_video_stops_after_min_frames():
+    result = _Detector(_clear_real).predict(list(range(1000)), early_exit=True)
+    info = result["early_exit"]
+    assert info["stopped_early"] and info["frames_scored"] == 16 and info["frames"] == 1000
+    assert result["label"] == "real"
+    # Rows come back in temporal order with their positions
+    assert list(result["frame_indices"]) == sorted(result["frame_indices"])
+    assert len(result["per_frame"]) == len(result["frame_indices"]) == 16
+
+
+def test_split_video_is_scored_in_full():
+    # First half fake, second half real: no verdict until every frame is in
+    result = _Detector(lambda f: [0.9, 0.1] if f < 100 else [0.1, 0.9]).predict(list(range(200)), early_exit=True)
+    assert not result["early_exit"]["stopped_early"]
+    assert result["early_exit"]["frames_scored"] == 200
+
+
+def test_seekable_source_is_only_fetched_up_to_the_stop():
+    source = _Seekable(1000)
+    batches = []
+    result = _Detector(_clear_real).predict(source, early_exit=True,
+                                            on_batch=lambda start, scores, idx: batches.append(idx))
+    assert result["early_exit"]["stopped_early"]
+    assert len(source.fetched) == 16
+    assert np.concatenate(batches).tolist() == _spread_order(1000)[:16]
+
+
+def test_seekable_source_skips_undecodable_samples():
+    class _Short(_Seekable):
+        def fetch(self, samples):
+            return [None if s >= 900 else s for s in super().fetch(samples)]
+
+    result = _Detector(_clear_real, min_frames=64).predict(_Short(1000), early_exit=True)
+    assert all(i < 900 for i in result["frame_indices"])
+    assert len(result["per_frame"]) == len(result["frame_indices"])
+
+
+def _write_video(path, frames=60, fps=10):
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), fps, (64, 48))
+    for i in range(frames):
+        writer.write(np.full((48, 64, 3), i * 4, dtype=np.uint8))
+    writer.release()
+    return str(path)
+
+
+def test_seekable_frames_refuses_containers_without_accurate_seeks(tmp_path, monkeypatch):
+    video = _write_video(tmp_path / "clip.avi")
+    monkeypatch.setattr(preprocessing, "_seek_to", lambda cap, target: False)
+    with pytest.raises(RuntimeError):
+        preprocessing.SeekableFrames(video, target_fps=5.0)
+
+
+def test_seekable_frames_stops_seeking_after_a_failed_seek(tmp_path, monkeypatch):
+    video = _write_video(tmp_path / "clip.avi")
+    frames = preprocessing.SeekableFrames(video, target_fps=0.5)  # every 20th frame
+    seeks = []
+
+    def failing_seek(cap, target):
+        seeks.append(target)
+        return False
+
+    monkeypatch.setattr(preprocessing, "_seek_to", failing_seek)
+    try:
+        images = frames.fetch([2, 0, 1]) + frames.fetch([1])
+    finally:
+        frames.close()
+    assert len(seeks) == 1
+    # Decoded by grabbing forward: the gray level encodes the frame index
+    assert [round(np.asarray(image)[0, 0, 0] / 4) for image in images] == [40, 0, 20, 20]
@@ -0,0 +1,87 @@
+import numpy as np
+from PIL import Image
+
+from utils.faces import FaceCropper
+
+
+class _Net:
+    """Stands in for cv2.dnn's SSD net, returning fixed relative boxes."""
+
+    def __init__(self, detections):
+        self.detections = np.array(detections, dtype=np.float32).reshape(1, 1, -1, 7)
+
+    def setInput(self, blob):
+        pass
+
+    def forward(self):
+        return self.detections
+
+
+def _dnn_cropper(detections, **kwargs):
+    cropper = object.__new__(FaceCropper)
+    opts = dict(backend="dnn", size=(32, 32), confidence=0.5, min_face_size=10, margin=0.0, batch_size=4)
+    opts.update(kwargs)
+    cropper.__dict__.update(opts)
+    cropper._net = _Net(detections)
+    return cropper
+
+
+def test_dnn_boxes_past_the_frame_edge_are_clipped():
+    image = np.zeros((100, 200, 3), dtype=np.uint8)
+    cropper = _dnn_cropper([
+        [0, 1, 0.9, 0.8, -0.2, 1.4, 0.5],  # spills over the top-right corner
+        [0, 1, 0.9, 1.2, 0.2, 1.5, 0.6],   # entirely right of the frame
+    ])
+    assert [box[:4] for box in cropper.detect([image])[0]] == [(160, 0, 200, 50)]
+
+    crops = list(cropper.crop([image]))
+    assert len(crops) == 1 and crops[0].shape == (32, 32, 3)
+
+
+def test_box_outside_the_frame_yields_no_crop():
+    image = np.zeros((100, 200, 3), dtype=np.uint8)
+    cropper = _dnn_cropper([[0, 1, 0.9, 1.2, 0.2, 1.5, 0.6]], min_face_size=0)
+    stats = {}
+    assert list(cropper.crop([image], stats)) == []
+    assert stats == {"frames": 1, "with_faces": 0}
+
+
+class _Cropper(FaceCropper):
+    """Reports a fixed box for frames whose top-left pixel is nonzero."""
+
+    def __init__(self, box, **kwargs):
+        # Skip FaceCropper.__init__: no detector backend has to be available
+        opts = dict(backend="stub", size=None, min_face_size=40, margin=0.3, batch_size=16)
+        opts.update(kwargs)
+        self.__dict__.update(opts)
+        self.box = box
+        self.batches = []
+
+    def detect(self, images):
+        self.batches.append(len(images))
+        return [[self.box] if image[0, 0, 0] else [] for image in images]
+
+
+def test_crop_skips_faceless_frames_and_records_indices():
+    frames = [np.full((120, 160, 3), v, dtype=np.uint8) for v in (0, 50, 0, 0, 90, 120)]
+    cropper = _Cropper((40, 30, 100, 90, 1.0), size=(48, 48), margin=0.25, batch_size=4)
+    stats, indices = {}, []
+    crops = list(cropper.crop(frames, stats, indices))
+    assert indices == [1, 4, 5]
+    assert stats == {"frames": 6, "with_faces": 3}
+    assert cropper.batches == [4, 2]
+    assert all(c.shape == (48, 48, 3) for c in crops)
+    assert [c[0, 0, 0] for c in crops] == [50, 90, 120]
+
+    # PIL frames in, PIL crops out; without size the crop is the squared,
+    # margin-expanded box: side 60 * 1.5 = 90 around the box centre
+    images = list(_Cropper((40, 30, 100, 90, 1.0), margin=0.25).crop([Image.fromarray(f) for f in frames[:2]]))
+    assert len(images) == 1 and images[0].size == (90, 90)
+
+
+def test_small_faces_are_dropped():
+    frames = [np.full((120, 160, 3), 50, dtype=np.uint8)]
+    cropper = _Cropper((10, 10, 30, 30, 1.0), min_face_size=40)
+    stats = {}
+    assert list(cropper.crop(frames, stats)) == []
+    assert stats == {"frames": 1, "with_faces": 0}
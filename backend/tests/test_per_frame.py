@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+
+from utils.postprocessing import decode_per_frame, encode_per_frame
+
+
+def _scores(n=50):
+    rng = np.random.default_rng(0)
+    fake = rng.random(n).astype(np.float32)
+    return np.stack([fake, 1 - fake], axis=1)
+
+
+@pytest.mark.parametrize("fmt", ["verbose", "compact"])
+def test_round_trip_within_four_decimals(fmt):
+    scores = _scores()
+    decoded = decode_per_frame(encode_per_frame(scores, ["Fake", "Real"], fmt))
+    assert decoded.shape == scores.shape and decoded.dtype == np.float32
+    assert np.abs(decoded - scores).max() <= 0.5e-4 + 1e-6
+
+
+def test_compact_carries_labels_and_scale():
+    encoded = encode_per_frame(_scores(3), ["Fake", "Real"], "compact")
+    assert encoded["labels"] == ["Fake", "Real"] and encoded["scale"] == 10000
+
+
+def test_empty_and_unknown_format():
+    assert decode_per_frame(encode_per_frame(np.empty((0, 2)), ["Fake", "Real"], "compact")).shape == (0, 2)
+    with pytest.raises(ValueError):
+        encode_per_frame(_scores(1), ["Fake", "Real"], "xml")
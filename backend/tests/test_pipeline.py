@@ -0,0 +1,117 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from services.admission import AdmissionController
+from services.executor import ExecutionLayer
+from services.pipeline import ShortCircuit, SkippedStage, Stage, StageGraph
+
+
+class _Source:
+    """Stands in for a FrameStream: consumers stop once it is closed."""
+
+    def __init__(self):
+        self.closed = threading.Event()
+        self.consumed = 0
+
+    def close(self):
+        self.closed.set()
+
+
+def _consume(frames):
+    for _ in range(500):
+        if frames.closed.is_set():
+            raise RuntimeError("closed")
+        frames.consumed += 1
+        time.sleep(0.005)
+    return frames.consumed
+
+
+def test_stages_get_upstream_results_and_context():
+    graph = StageGraph([
+        Stage("a", lambda x: x + 1, ("x",)),
+        Stage("b", lambda a: a * 2, ("a",)),
+        Stage("c", lambda a, b: a + b, ("a", "b")),
+    ])
+    run = asyncio.run(graph.run({"x": 1}))
+    assert run.results == {"a": 2, "b": 4, "c": 6}
+
+
+def test_failure_skips_dependents_only():
+    def boom():
+        raise ValueError("bad input")
+
+    graph = StageGraph([
+        Stage("a", boom),
+        Stage("b", lambda a: a, ("a",)),
+        Stage("c", lambda: "ok"),
+    ])
+    run = asyncio.run(graph.run({}))
+    assert isinstance(run.errors["a"], ValueError)
+    assert isinstance(run.errors["b"], SkippedStage) and run.errors["b"].cause is run.errors["a"]
+    assert run.results["c"] == "ok"
+
+
+def test_short_circuit_is_recorded_with_its_value():
+    def hit():
+        raise ShortCircuit({"cached": True})
+
+    run = asyncio.run(StageGraph([Stage("upload", hit), Stage("b", lambda: 1, after=("upload",))]).run({}))
+    assert run.errors["upload"].value == {"cached": True}
+    assert isinstance(run.errors["b"], SkippedStage)
+
+
+def test_unclaimed_transient_result_is_closed():
+    source = _Source()
+
+    def boom():
+        raise RuntimeError("no")
+
+    graph = StageGraph([
+        Stage("frames", lambda: source, transient=True),
+        Stage("gate", boom),
+        Stage("video", lambda frames: frames, ("frames",), after=("gate",)),
+    ])
+    asyncio.run(graph.run({}))
+    assert source.closed.is_set()
+
+
+def test_rejects_cycles_and_unknown_inputs():
+    with pytest.raises(ValueError):
+        asyncio.run(StageGraph([Stage("a", lambda b: b, ("b",)), Stage("b", lambda a: a, ("a",))]).run({}))
+    with pytest.raises(ValueError):
+        asyncio.run(StageGraph([Stage("a", lambda missing: missing, ("missing",))]).run({}))
+
+
+def test_cancel_stops_a_running_pool_stage_before_releasing_its_gate():
+    async def run():
+        executor = ExecutionLayer()
+        admission = AdmissionController()
+        ticket = admission.admit(["video"])
+        source = _Source()
+        graph = StageGraph([
+            Stage("frames", lambda: source, transient=True, gate="video"),
+            Stage("video", _consume, ("frames",), pool="inference", gate="video"),
+        ])
+        task = asyncio.ensure_future(graph.run({}, executor, gates=ticket))
+        await asyncio.sleep(0.1)
+        assert admission.stats()["video"]["active"] == 1
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        # The worker has returned by now: nothing is consumed afterwards and
+        # the slot was held until then
+        stopped_at = source.consumed
+        in_flight = executor.stats()["inference"]["in_flight"]
+        active = admission.stats()["video"]["active"]
+        await asyncio.sleep(0.1)
+        ticket.close()
+        executor.shutdown()
+        return source, stopped_at, in_flight, active
+
+    source, stopped_at, in_flight, active = asyncio.run(run())
+    assert source.closed.is_set()
+    assert source.consumed == stopped_at < 500
+    assert in_flight == 0 and active == 0
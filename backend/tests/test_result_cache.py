@@ -0,0 +1,12 @@
+import os
+
+from services.result_cache import ResultCache
+
+
+def test_memory_tier_is_sized_by_the_bytes_written_to_disk(tmp_path):
+    cache = ResultCache(str(tmp_path), memory_max_mb=1, disk_max_mb=1)
+    report = {"label": "real", "summary": "Überprüft ✓", "scores": [0.25] * 100}
+    cache.put("k", report)
+    on_disk = os.path.getsize(tmp_path / "k.json")
+    assert cache._memory_bytes == on_disk == cache._disk_bytes
+    assert cache.get("k") == report
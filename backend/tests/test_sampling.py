@@ -0,0 +1,62 @@
+import math
+
+import cv2
+import numpy as np
+import pytest
+
+from utils.preprocessing import iter_adaptive_frames, plan_sampling, sample_interval
+
+
+def test_plan_stays_uniform_within_budget():
+    plan = plan_sampling(60.0, 1.0, max_frames=100)
+    assert plan["strategy"] == "uniform"
+    assert plan["fps"] == 1.0 and plan["planned_frames"] == 60
+
+
+def test_plan_switches_to_strata_over_budget():
+    plan = plan_sampling(3600.0, 1.0, max_frames=1800)
+    assert plan["strategy"] == "stratified"
+    assert plan["planned_frames"] == 1800
+    assert plan["fps"] == pytest.approx(0.5)
+    assert plan["stratum_seconds"] == pytest.approx(2.0)
+
+
+def test_plan_without_duration_has_no_frame_estimate():
+    plan = plan_sampling(0.0, 1.0, max_frames=10)
+    assert plan["strategy"] == "uniform" and plan["planned_frames"] is None
+
+
+@pytest.mark.parametrize("total, native_fps, max_frames", [
+    (1000, 30.0, 9),       # the rate alone gives a gap of 111.1, rounded down to 111: 10 samples
+    (150, 30.0, 4),
+    (107892, 29.97, 1800),
+    (90, 30.0, 89),
+])
+def test_budgeted_interval_never_overshoots_and_reaches_the_end(total, native_fps, max_frames):
+    fps = plan_sampling(total / native_fps, 1.0, max_frames)["fps"]
+    interval = sample_interval(native_fps, fps, total, max_frames)
+    samples = math.ceil(total / interval)
+    assert samples <= max_frames
+    assert (samples - 1) * interval >= total - interval
+
+
+def test_interval_without_budget_follows_the_rate():
+    assert sample_interval(30.0, 1.0) == 30
+    assert sample_interval(30.0, 1.0, 300, max_frames=None) == 30
+    assert sample_interval(30.0, 100.0) == 1
+
+
+def test_adaptive_native_frames_are_decoded_again_after_the_scan(tmp_path):
+    # Three flat scenes; the gray level encodes the frame index
+    path = str(tmp_path / "scenes.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 10, (64, 48))
+    for i in range(90):
+        writer.write(np.full((48, 64, 3), (i // 30) * 100 + i % 30, dtype=np.uint8))
+    writer.release()
+
+    native = list(iter_adaptive_frames(path, budget=8, analysis_fps=5.0))
+    small = list(iter_adaptive_frames(path, budget=8, analysis_fps=5.0, size=(32, 24)))
+    assert {image.size for image in native} == {(64, 48)}
+    assert len(native) == len(small) > 3
+    for a, b in zip(native, small):
+        assert abs(int(np.asarray(a)[0, 0, 0]) - int(np.asarray(b)[0, 0, 0])) <= 2
@@ -0,0 +1,11 @@
+from services.segments import SegmentPool
+
+
+def test_start_returns_with_every_worker_running():
+    pool = SegmentPool(workers=3)
+    try:
+        pool.start(timeout=60)
+        processes = pool._pool._processes
+        assert len(processes) == 3 and all(p.is_alive() for p in processes.values())
+    finally:
+        pool.shutdown()
@@ -0,0 +1,35 @@
+from types import SimpleNamespace
+
+import torch
+
+from models.text.ai_text_detector import TextAIDetector
+
+
+class _Tokenizer:
+    def __call__(self, texts, truncation=True, max_length=512):
+        return {"input_ids": [[1] * len(t.split()) for t in texts]}
+
+    def pad(self, features, padding=True, return_tensors="pt"):
+        width = max(len(f["input_ids"]) for f in features)
+        return {"input_ids": torch.tensor([f["input_ids"] + [0] * (width - len(f["input_ids"])) for f in features])}
+
+
+def _detector():
+    detector = object.__new__(TextAIDetector)
+    detector.tokenizer = _Tokenizer()
+    detector.model = lambda input_ids: SimpleNamespace(logits=torch.zeros(len(input_ids), 2))
+    detector.device = torch.device("cpu")
+    detector.max_length, detector.fake_idx, detector.real_idx = 512, 0, 1
+    detector.bucket_ratio, detector.bucket_max_size = 1.5, 32
+    detector.backend, detector.precision, detector.batcher = "torch", "fp32", None
+    detector._real_tokens = detector._padded_tokens = detector._forward_passes = 0
+    return detector
+
+
+def test_warmup_passes_are_not_counted_but_requests_are():
+    detector = _detector()
+    detector.predict_batch(["a live request"])
+    detector.warmup([8, 64], batch_size=4)
+    detector.predict_batch(["another one", "and a third one here"])
+    assert detector.stats()["forward_passes"] == 3  # the last two texts land in separate buckets
+    assert detector._real_tokens == 3 + 2 + 5
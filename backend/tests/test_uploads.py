@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+
+from utils.uploads import MalformedForm, StreamingForm, UploadTooLarge
+
+_CONTENT_TYPE = "multipart/form-data; boundary=b"
+
+
+def _body(*parts):
+    out = b""
+    for headers, value in parts:
+        out += b"--b\r\n" + headers + b"\r\n\r\n" + value + b"\r\n"
+    return out + b"--b--\r\n"
+
+
+async def _stream(data, size=7):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+def test_fields_around_the_file():
+    body = _body(
+        (b'Content-Disposition: form-data; name="query"', b"a claim"),
+        (b'Content-Disposition: form-data; name="video"; filename="clip.mp4"', b"0123456789" * 10),
+        (b'Content-Disposition: form-data; name="sampling"', b"keyframes"),
+    )
+
+    async def run():
+        form = StreamingForm(_stream(body), _CONTENT_TYPE, max_bytes=4096)
+        assert await form.next_file() == "video"
+        assert form.filename == "clip.mp4"
+        assert form.fields == {"query": "a claim"}
+        data = b"".join([chunk async for chunk in form.file_chunks(32)])
+        return form, data
+
+    form, data = asyncio.run(run())
+    assert data == b"0123456789" * 10
+    assert form.fields == {"query": "a claim", "sampling": "keyframes"}
+
+
+def test_receive_cap_and_second_file():
+    two_files = _body(
+        (b'Content-Disposition: form-data; name="video"; filename="a.mp4"', b"a"),
+        (b'Content-Disposition: form-data; name="other"; filename="b.mp4"', b"b"),
+    )
+
+    async def drain(body, max_bytes):
+        form = StreamingForm(_stream(body), _CONTENT_TYPE, max_bytes=max_bytes)
+        await form.next_file()
+        async for _ in form.file_chunks():
+            pass
+
+    with pytest.raises(MalformedForm):
+        asyncio.run(drain(two_files, 4096))
+    with pytest.raises(UploadTooLarge):
+        asyncio.run(drain(two_files, 64))
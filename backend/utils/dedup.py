@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+from typing import List, Sequence, Union
+
+import numpy as np
+from PIL import Image
+
+
+def _thumbnails(images: Sequence[Union[Image.Image, np.ndarray]]) -> np.ndarray:
+    # uint8 RGB arrays are wrapped as images too; only the 9x8 result is new
+    return np.stack([
+        np.asarray(_as_image(img).convert("L").resize((9, 8), Image.BILINEAR), dtype=np.int16)
+        for img in images
+    ])
+
+
+def _as_image(img: Union[Image.Image, np.ndarray]) -> Image.Image:
+    return Image.fromarray(img) if isinstance(img, np.ndarray) else img
+
+
+def _dhash(small: np.ndarray) -> np.ndarray:
+    bits = small[:, :, 1:] > small[:, :, :-1]
+    packed = np.packbits(bits.reshape(len(small), -1), axis=1)
+    return packed.view(">u8").astype(np.uint64).ravel()
+
+
+def dhash(images: Sequence[Image.Image]) -> np.ndarray:
+    """64-bit difference hashes for a batch of images, as a uint64 array.
+
+    Each image is shrunk to 9x8 grayscale; bit *i* says whether a pixel is
+    brighter than its right-hand neighbour. The comparison and bit packing
+    run over the whole stacked batch at once.
+    """
+    if len(images) == 0:
+        return np.zeros(0, dtype=np.uint64)
+    return _dhash(_thumbnails(images))
+
+
+# Set bits in each byte value
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def hamming(hashes: np.ndarray, reference: np.ndarray) -> np.ndarray:
+    """Pairwise Hamming distances, shape ``(len(hashes), len(reference))``."""
+    xor = np.bitwise_xor(hashes[:, None], reference[None, :])
+    return _POPCOUNT[xor.view(np.uint8).reshape(*xor.shape, 8)].sum(axis=-1, dtype=np.int64)
+
+
+class FrameDeduplicator:
+    """Groups near-identical frames of one video by dHash distance.
+
+    Every frame whose hash lies within ``max_distance`` bits of an earlier
+    group representative, and whose mean brightness is within
+    ``max_brightness_delta`` of it, joins that group; otherwise it starts a
+    new group and becomes its representative. The brightness check keeps
+    flat frames of different colours (which all hash to zero) apart.
+    Representatives are kept for the whole video, so a slide that reappears
+    later is still recognised.
+    """
+
+    def __init__(self, max_distance: int = 4, max_brightness_delta: float = 12.0) -> None:
+        self.max_distance = int(max_distance)
+        self.max_brightness_delta = float(max_brightness_delta)
+        self._reps = np.zeros(0, dtype=np.uint64)
+        self._rep_means = np.zeros(0, dtype=np.float32)
+
+    @property
+    def groups(self) -> int:
+        return len(self._reps)
+
+    def assign(self, images: Sequence[Image.Image]) -> List[int]:
+        """Return the group index of each image, creating groups as needed.
+
+        New group indices are handed out in order, so a frame that starts a
+        group always gets ``groups - 1`` at the time it is seen.
+        """
+        if len(images) == 0:
+            return []
+        small = _thumbnails(images)
+        hashes = _dhash(small)
+        means = small.reshape(len(small), -1).mean(axis=1).astype(np.float32)
+        # Distances of the batch to the existing representatives and to
+        # itself, each computed as one matrix; frames that start a group in
+        # this batch are the only new representatives
+        to_reps = self._distances(hashes, means, self._reps, self._rep_means)
+        to_batch = self._distances(hashes, means, hashes, means)
+        first = len(self._reps)
+        new: List[int] = []
+        out: List[int] = []
+        for i in range(len(hashes)):
+            best, best_dist = -1, self.max_distance + 1
+            if first:
+                best = int(to_reps[i].argmin())
+                best_dist = int(to_reps[i, best])
+            if new:
+                dist = to_batch[i, new]
+                j = int(dist.argmin())
+                # Ties go to the older group, as with a single argmin over all reps
+                if dist[j] < best_dist:
+                    best, best_dist = first + j, int(dist[j])
+            if best_dist <= self.max_distance:
+                out.append(best)
+            else:
+                new.append(i)
+                out.append(first + len(new) - 1)
+        if new:
+            self._reps = np.concatenate([self._reps, hashes[new]])
+            self._rep_means = np.concatenate([self._rep_means, means[new]])
+        return out
+
+    def _distances(self, hashes: np.ndarray, means: np.ndarray, reps: np.ndarray,
+                   rep_means: np.ndarray) -> np.ndarray:
+        # Pairs too far apart in brightness never match
+        dist = hamming(hashes, reps)
+        dist[np.abs(means[:, None] - rep_means[None, :]) > self.max_brightness_delta] = 65
+        return dist
@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import os
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from utils.logger import logger
+
+# A face box in source-frame pixels: (x1, y1, x2, y2, confidence)
+Box = Tuple[int, int, int, int, float]
+
+# Input size and BGR mean of OpenCV's res10 SSD face detector
+_DNN_SIZE = (300, 300)
+_DNN_MEAN = (104.0, 177.0, 123.0)
+
+
+class FaceCropper:
+    """Finds the largest face in each frame and yields a square crop of it.
+
+    Two CPU backends:
+
+    - ``dnn``: an SSD face detector loaded with ``cv2.dnn`` (e.g. OpenCV's
+      ``res10_300x300_ssd`` Caffe model, *model* + *config* files). Frames
+      are collected into batches and run through the net in one forward
+      pass with ``blobFromImages``.
+    - ``haar``: OpenCV's bundled frontal-face cascade, run per frame on a
+      grayscale copy downscaled to *detect_width*. No model files needed.
+
+    ``auto`` picks ``dnn`` when model files are configured and ``haar``
+    otherwise. Crops are expanded by *margin* on each side, squared,
+    clipped to the frame and resized to *size* = ``(width, height)``, so a
+    batch of crops stacks without further resizing. Frames without a face
+    of at least *min_face_size* pixels are dropped. Crops come out as the
+    same type the frames went in as (PIL Image or uint8 RGB array).
+    """
+
+    def __init__(
+        self,
+        backend: str = "auto",
+        size: Optional[Tuple[int, int]] = None,
+        model: Optional[str] = None,
+        config: Optional[str] = None,
+        confidence: float = 0.6,
+        min_face_size: int = 40,
+        margin: float = 0.3,
+        detect_width: int = 640,
+        batch_size: int = 16,
+    ) -> None:
+        if backend == "auto":
+            backend = "dnn" if model else "haar"
+        self.backend = backend
+        self.size = size
+        self.confidence = float(confidence)
+        self.min_face_size = int(min_face_size)
+        self.margin = float(margin)
+        self.detect_width = int(detect_width)
+        self.batch_size = max(1, int(batch_size))
+
+        if backend == "dnn":
+            if not model or not os.path.isfile(model):
+                raise FileNotFoundError(f"Face detector model not found: {model}")
+            self._net = cv2.dnn.readNet(model, config or "")
+        elif backend == "haar":
+            cascade_dir = getattr(getattr(cv2, "data", None), "haarcascades", "")
+            path = os.path.join(cascade_dir, "haarcascade_frontalface_default.xml")
+            if not hasattr(cv2, "CascadeClassifier") or not os.path.isfile(path):
+                raise RuntimeError("This OpenCV build has no Haar face cascade; configure a dnn model instead")
+            self._cascade = cv2.CascadeClassifier(path)
+        else:
+            raise ValueError(f"Unknown face detection backend '{backend}', expected auto, dnn or haar")
+        logger.info("Face detection: %s backend", backend)
+
+    def _detect_dnn(self, images: List[np.ndarray]) -> List[List[Box]]:
+        # The net wants BGR minus a BGR mean. Convert explicitly (after the
+        # resize blobFromImages would do) rather than leave the pairing of
+        # swapRB and the mean's channel order to OpenCV's conventions.
+        bgr = [cv2.cvtColor(cv2.resize(image, _DNN_SIZE), cv2.COLOR_RGB2BGR) for image in images]
+        blob = cv2.dnn.blobFromImages(bgr, 1.0, _DNN_SIZE, _DNN_MEAN, swapRB=False, crop=False)
+        self._net.setInput(blob)
+        # (1, 1, detections, 7): image id, class, confidence, x1, y1, x2, y2 (relative)
+        detections = self._net.forward().reshape(-1, 7)
+        boxes: List[List[Box]] = [[] for _ in images]
+        for image_id, _, conf, x1, y1, x2, y2 in detections[detections[:, 2] >= self.confidence]:
+            h, w = images[int(image_id)].shape[:2]
+            # SSD boxes can reach past the frame edge (coordinates outside [0, 1]);
+            # clip them so the size filter sees the part that is in frame
+            x1, x2 = (int(v) for v in np.clip([x1 * w, x2 * w], 0, w))
+            y1, y2 = (int(v) for v in np.clip([y1 * h, y2 * h], 0, h))
+            if x2 > x1 and y2 > y1:
+                boxes[int(image_id)].append((x1, y1, x2, y2, float(conf)))
+        return boxes
+
+    def _detect_haar(self, images: List[np.ndarray]) -> List[List[Box]]:
+        boxes: List[List[Box]] = []
+        for image in images:
+            h, w = image.shape[:2]
+            # Fast path: search a small grayscale copy and scale boxes back up
+            scale = min(1.0, self.detect_width / w)
+            gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+            if scale < 1.0:
+                gray = cv2.resize(gray, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+            min_side = max(1, int(self.min_face_size * scale))
+            found = self._cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5, minSize=(min_side, min_side))
+            boxes.append([
+                (int(x / scale), int(y / scale), int((x + fw) / scale), int((y + fh) / scale), 1.0)
+                for x, y, fw, fh in found
+            ])
+        return boxes
+
+    def detect(self, images: List[np.ndarray]) -> List[List[Box]]:
+        """Face boxes for each of a batch of uint8 RGB arrays."""
+        if not images:
+            return []
+        if self.backend == "dnn":
+            return self._detect_dnn(images)
+        return self._detect_haar(images)
+
+    def _crop(self, image: np.ndarray, box: Box) -> np.ndarray:
+        h, w = image.shape[:2]
+        x1, y1, x2, y2, _ = box
+        side = max(x2 - x1, y2 - y1) * (1 + 2 * self.margin)
+        cx, cy = (x1 + x2) / 2, (y1 + y2) / 2
+        left, top = max(0, int(cx - side / 2)), max(0, int(cy - side / 2))
+        right, bottom = min(w, int(cx + side / 2)), min(h, int(cy + side / 2))
+        crop = image[top:bottom, left:right]
+        if self.size is not None:
+            crop = cv2.resize(crop, self.size, interpolation=cv2.INTER_AREA)
+        return np.ascontiguousarray(crop)
+
+    def crop(self, frames: Iterable[Any], stats: Optional[Dict[str, int]] = None,
+             indices: Optional[List[int]] = None) -> Iterator[Any]:
+        """Yield a face crop for every frame of *frames* that has a face.
+
+        Frames are read lazily in batches of ``batch_size``. If given,
+        *stats* is updated with ``frames`` (read) and ``with_faces`` counts,
+        and the position in *frames* of each yielded crop is appended to
+        *indices* before the crop is yielded.
+        """
+        stats = stats if stats is not None else {}
+        stats.setdefault("frames", 0)
+        stats.setdefault("with_faces", 0)
+        it = iter(frames)
+        while True:
+            batch = []
+            for frame in it:
+                batch.append(frame)
+                if len(batch) == self.batch_size:
+                    break
+            if not batch:
+                return
+            arrays = [f if isinstance(f, np.ndarray) else np.asarray(f.convert("RGB")) for f in batch]
+            for frame, image, boxes in zip(batch, arrays, self.detect(arrays)):
+                stats["frames"] += 1
+                boxes = [b for b in boxes if min(b[2] - b[0], b[3] - b[1]) >= self.min_face_size]
+                if not boxes:
+                    continue
+                stats["with_faces"] += 1
+                if indices is not None:
+                    indices.append(stats["frames"] - 1)
+                largest = max(boxes, key=lambda b: (b[2] - b[0]) * (b[3] - b[1]))
+                crop = self._crop(image, largest)
+                yield crop if isinstance(frame, np.ndarray) else Image.fromarray(crop)
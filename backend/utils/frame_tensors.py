@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+from typing import Any, Optional, Sequence, Union
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+
+# PIL resample codes used by HF image processors → torch interpolate modes
+_RESAMPLE_MODES = {2: "bilinear", 3: "bicubic"}
+
+
+class FrameTensorizer:
+    """Vectorized stand-in for a HF image processor on uint8 RGB frames.
+
+    Takes an ``(N, H, W, 3)`` uint8 array (or a list of ``(H, W, 3)``
+    arrays), wraps it as a tensor without copying, and does the layout
+    change, resize, rescale and normalize as batched torch ops instead of
+    per-image PIL round trips. Frames are resized while still uint8 with
+    antialiased interpolation, which tracks PIL's filters to within one
+    intensity level, and only the model-sized result is converted to float.
+
+    Build it with :meth:`from_extractor`, which returns None for processors
+    it cannot reproduce (center crops, shortest-edge sizing, other filters).
+    """
+
+    def __init__(self, size: tuple, mode: str, scale: Optional[float],
+                 mean: Optional[Sequence[float]], std: Optional[Sequence[float]]) -> None:
+        self.size = size  # (height, width)
+        self.mode = mode
+        self.scale = scale
+        self.mean = torch.tensor(mean, dtype=torch.float32).view(1, 3, 1, 1) if mean is not None else None
+        self.std = torch.tensor(std, dtype=torch.float32).view(1, 3, 1, 1) if std is not None else None
+
+    @classmethod
+    def from_extractor(cls, extractor: Any) -> Optional["FrameTensorizer"]:
+        size = getattr(extractor, "size", None)
+        if not getattr(extractor, "do_resize", False) or getattr(extractor, "do_center_crop", False):
+            return None
+        if isinstance(size, int):
+            size = {"height": size, "width": size}
+        if not isinstance(size, dict) or "height" not in size or "width" not in size:
+            return None
+        mode = _RESAMPLE_MODES.get(int(getattr(extractor, "resample", 2)))
+        if mode is None:
+            return None
+        scale = extractor.rescale_factor if getattr(extractor, "do_rescale", False) else None
+        normalize = getattr(extractor, "do_normalize", False)
+        return cls(
+            (int(size["height"]), int(size["width"])),
+            mode,
+            scale,
+            extractor.image_mean if normalize else None,
+            extractor.image_std if normalize else None,
+        )
+
+    def __call__(self, frames: Union[np.ndarray, Sequence[np.ndarray]],
+                 device: Optional[torch.device] = None) -> torch.Tensor:
+        """Return ``pixel_values`` of shape ``(N, 3, height, width)``.
+
+        Frames in a list may differ in size; each size group is resized as
+        one batch.
+        """
+        if isinstance(frames, np.ndarray):
+            return self._batch(frames, device)
+        shapes = {f.shape for f in frames}
+        if len(shapes) == 1:
+            return self._batch(np.stack(frames), device)
+        out = torch.empty((len(frames), 3, *self.size), dtype=torch.float32, device=device)
+        for shape in shapes:
+            idx = [i for i, f in enumerate(frames) if f.shape == shape]
+            out[idx] = self._batch(np.stack([frames[i] for i in idx]), device)
+        return out
+
+    def resize(self, frames: Union[np.ndarray, Sequence[np.ndarray]]) -> np.ndarray:
+        """Resize frames to the model input size ahead of time, as uint8
+        ``(N, height, width, 3)``. These are the pixels :meth:`__call__`
+        would compute, so calling it on the result gives identical
+        ``pixel_values`` without resizing again."""
+        if not isinstance(frames, np.ndarray):
+            if len({f.shape for f in frames}) > 1:
+                return np.concatenate([self.resize(f[None]) for f in frames])
+            frames = np.stack(frames)
+        x = torch.from_numpy(np.ascontiguousarray(frames)).permute(0, 3, 1, 2)
+        if tuple(x.shape[-2:]) != self.size:
+            x = self._resize(x)
+        return x.to(torch.uint8).permute(0, 2, 3, 1).contiguous().numpy()
+
+    def _batch(self, batch: np.ndarray, device: Optional[torch.device]) -> torch.Tensor:
+        # NHWC → NCHW is a stride change only: the tensor stays channels-last
+        x = torch.from_numpy(np.ascontiguousarray(batch)).permute(0, 3, 1, 2)
+        if tuple(x.shape[-2:]) != self.size:
+            x = self._resize(x)
+        if device is not None:
+            x = x.to(device, non_blocking=True)
+        x = x.float()
+        if self.scale is not None:
+            x = x * self.scale
+        if self.mean is not None:
+            x = (x - self.mean.to(x.device)) / self.std.to(x.device)
+        return x.contiguous()
+
+    def _resize(self, x: torch.Tensor) -> torch.Tensor:
+        try:
+            # Resizing uint8 channels-last is many times faster than float on
+            # CPU and rounds like PIL does
+            return F.interpolate(x, size=self.size, mode=self.mode, align_corners=False, antialias=True)
+        except RuntimeError:
+            # Older torch builds lack the uint8 kernels
+            x = F.interpolate(x.float(), size=self.size, mode=self.mode, align_corners=False, antialias=True)
+            return x.round_().clamp_(0, 255)
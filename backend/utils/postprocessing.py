@@ -1,7 +1,51 @@
-from typing import Any, Dict, List, Optional
+import base64
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
 
 from utils.logger import logger
 
+PER_FRAME_FORMATS = ("verbose", "compact")
+
+# Compact rows hold probabilities as uint16 ten-thousandths (4 decimals,
+# the precision of the verbose form)
+_COMPACT_SCALE = 10000
+
+
+def encode_per_frame(scores: np.ndarray, labels: Sequence[str], fmt: str = "verbose") -> Any:
+    """JSON-ready form of a ``(frames, labels)`` score array.
+
+    - ``verbose``: one ``{label: probability}`` dict per frame.
+    - ``compact``: ``{"labels", "scale", "rows"}``, where *rows* is the
+      base64 of the row-major little-endian uint16 array
+      ``round(scores * scale)``; see :func:`decode_per_frame`. About a
+      fifth of the verbose size for two labels.
+    """
+    if fmt not in PER_FRAME_FORMATS:
+        raise ValueError(f"Unknown per-frame format '{fmt}', expected one of {PER_FRAME_FORMATS}")
+    scores = np.asarray(scores, dtype=np.float32).reshape(-1, len(labels))
+    if fmt == "verbose":
+        rounded = np.round(scores.astype(np.float64), 4).tolist()
+        return [dict(zip(labels, row)) for row in rounded]
+    packed = np.round(scores * _COMPACT_SCALE).clip(0, np.iinfo(np.uint16).max).astype("<u2")
+    return {
+        "labels": list(labels),
+        "scale": _COMPACT_SCALE,
+        "rows": base64.b64encode(packed.tobytes()).decode("ascii"),
+    }
+
+
+def decode_per_frame(encoded: Any) -> np.ndarray:
+    """Inverse of :func:`encode_per_frame` (either format), as float32
+    ``(frames, labels)``; verbose columns follow the first frame's keys."""
+    if isinstance(encoded, dict):
+        packed = np.frombuffer(base64.b64decode(encoded["rows"]), dtype="<u2")
+        return (packed.reshape(-1, len(encoded["labels"])) / encoded["scale"]).astype(np.float32)
+    if not encoded:
+        return np.empty((0, 0), dtype=np.float32)
+    labels = list(encoded[0])
+    return np.array([[frame[k] for k in labels] for frame in encoded], dtype=np.float32)
+
 
 def aggregate_results(
     video_result: Optional[Dict[str, Any]] = None,
@@ -1,20 +1,194 @@
+import math
 import os
+import queue
 import subprocess
-from typing import List
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
 import cv2
+import numpy as np
 from PIL import Image
 
 from utils.logger import logger
 
 
-def extract_frames(video_path: str, target_fps: float = 1.0) -> List[Image.Image]:
+SAMPLING_MODES = ("auto", "seek", "grab", "read", "keyframes", "adaptive")
+
+# Gaps shorter than this are always crossed with grab(); a seek lands on the
+# previous keyframe and decodes forward, so it cannot win on tiny gaps.
+_MIN_SEEK_GAP = 8
+# Number of samples used by "auto" to time seek() against grab().
+_PROBE_SAMPLES = 3
+# "auto" decisions by stream shape (see _seek_key), so files from the same
+# encoder settings don't each pay for a probe. Oldest entries drop first.
+_SEEK_DECISIONS: "OrderedDict[tuple, bool]" = OrderedDict()
+_SEEK_DECISIONS_MAX = 256
+_seek_decisions_lock = threading.Lock()
+# Grayscale thumbnail size used for scene-change signals in "adaptive" mode.
+_THUMB_SIZE = (64, 36)
+_HIST_BINS = 16
+
+
+def _to_image(frame) -> Image.Image:
+    return Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+
+
+def _grab_to(cap: cv2.VideoCapture, pos: int, target: int) -> bool:
+    """Advance from frame *pos* to *target* with grab(), which demuxes and
+    decodes but skips the BGR conversion and copy that read() does."""
+    while pos < target:
+        if not cap.grab():
+            return False
+        pos += 1
+    return True
+
+
+def _seek_to(cap: cv2.VideoCapture, target: int) -> bool:
+    """Seek so that the next grab() returns frame *target*.
+
+    Returns False when the container does not honour frame-accurate seeks
+    (the reported position after seeking is not the one asked for).
+    """
+    if not cap.set(cv2.CAP_PROP_POS_FRAMES, target):
+        return False
+    return int(round(cap.get(cv2.CAP_PROP_POS_FRAMES))) == target
+
+
+def extract_frames(video_path: str, target_fps: float = 1.0, mode: str = "auto",
+                   max_keyframes: int = 64, budget: int = 64, ffmpeg: str = "ffmpeg") -> List[Image.Image]:
     """Sample frames from a video at *target_fps* frames per second.
 
-    Returns a list of PIL RGB Images.
+    Returns a list of PIL RGB Images; see :func:`iter_frames` for *mode*.
     """
+    return list(iter_frames(video_path, target_fps, mode, max_keyframes=max_keyframes, budget=budget,
+                            ffmpeg=ffmpeg))
+
+
+def sample_count(video_path: str, target_fps: float = 1.0) -> int:
+    """Number of frames :func:`iter_frames` is expected to yield, from the
+    container header (0 when the frame count is unknown)."""
+    cap = cv2.VideoCapture(video_path)
+    try:
+        native_fps = cap.get(cv2.CAP_PROP_FPS)
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    finally:
+        cap.release()
+    if native_fps <= 0 or total_frames <= 0:
+        return 0
+    frame_interval = sample_interval(native_fps, target_fps)
+    return (total_frames + frame_interval - 1) // frame_interval
+
+
+def sample_interval(native_fps: float, target_fps: float, total_frames: int = 0,
+                    max_frames: Optional[int] = None) -> int:
+    """Native frames between samples at *target_fps*.
+
+    With *max_frames* and a known *total_frames* the gap is widened to at
+    least ``ceil(total_frames / max_frames)``, so no more than *max_frames*
+    samples are taken and they still reach the end of the file.
+    """
+    interval = max(1, int(round(native_fps / target_fps)))
+    if max_frames and total_frames > 0:
+        interval = max(interval, math.ceil(total_frames / max_frames))
+    return interval
+
+
+def plan_sampling(duration_seconds: float, target_fps: float, max_frames: Optional[int] = None) -> Dict[str, Any]:
+    """Decide how to sample a video of known duration within *max_frames*.
+
+    When sampling at *target_fps* would exceed the budget, the duration is
+    split into *max_frames* equal strata and one frame is taken per stratum:
+    a uniform stride at the reduced rate returned as ``fps``. Decoders turn
+    it into a gap of whole native frames rounded up (see
+    :func:`sample_interval`), so the budget is never exceeded and the last
+    sample falls in the last stratum rather than the video being cut short.
+    """
+    nominal = int(math.ceil(duration_seconds * target_fps)) if duration_seconds > 0 else None
+    plan: Dict[str, Any] = {
+        "strategy": "uniform",
+        "duration_seconds": round(duration_seconds, 2),
+        "requested_fps": target_fps,
+        "fps": target_fps,
+        "nominal_frames": nominal,
+        "max_frames": max_frames,
+        "planned_frames": nominal if not max_frames or nominal is None else min(nominal, max_frames),
+    }
+    if max_frames and nominal and nominal > max_frames:
+        plan.update(
+            strategy="stratified",
+            fps=max_frames / duration_seconds,
+            stratum_seconds=round(duration_seconds / max_frames, 3),
+        )
+    return plan
+
+
+def _seek_key(cap: cv2.VideoCapture, frame_interval: int) -> tuple:
+    """Codec, resolution, frame rate and sampling gap: what decides whether
+    seeking beats grab() (OpenCV does not expose the GOP length itself)."""
+    return (
+        int(cap.get(cv2.CAP_PROP_FOURCC)),
+        int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        round(cap.get(cv2.CAP_PROP_FPS), 2),
+        frame_interval,
+    )
+
+
+def _remember_seek_decision(key: tuple, use_seek: bool) -> None:
+    with _seek_decisions_lock:
+        _SEEK_DECISIONS[key] = use_seek
+        _SEEK_DECISIONS.move_to_end(key)
+        while len(_SEEK_DECISIONS) > _SEEK_DECISIONS_MAX:
+            _SEEK_DECISIONS.popitem(last=False)
+
+
+def iter_frames(video_path: str, target_fps: float = 1.0, mode: str = "auto",
+                max_keyframes: int = 64, budget: int = 64, ffmpeg: str = "ffmpeg",
+                size: Optional[Tuple[int, int]] = None,
+                max_frames: Optional[int] = None) -> Iterator[Image.Image]:
+    """Yield frames sampled at *target_fps* frames per second, one at a time,
+    so callers never have to hold the whole video in memory.
+
+    *mode* selects how frames between samples are skipped:
+
+    - ``read``: decode and convert every frame (the original behaviour).
+    - ``grab``: decode every frame but only convert the sampled ones.
+    - ``seek``: jump to each sampled frame; only the frames between the
+      preceding keyframe and the target are decoded.
+    - ``auto``: time a few seeks against grab() and keep the cheaper one,
+      since seeking loses on long GOPs. The choice is remembered per codec,
+      resolution, frame rate and sampling gap, so later files of the same
+      shape skip the probe.
+
+    ``seek`` and ``auto`` fall back to ``grab`` when the container cannot
+    seek accurately or the frame count is unknown. All of these yield the
+    same frames, as PIL RGB Images.
+
+    ``keyframes`` ignores *target_fps* and yields at most *max_keyframes*
+    I-frames instead (see :func:`iter_keyframes`; needs *ffmpeg*).
+    ``adaptive`` ignores *target_fps* and spends at most *budget* frames,
+    concentrated around scene changes (see :func:`iter_adaptive_frames`).
+
+    *size* = ``(width, height)`` downscales every yielded frame, as in
+    :func:`iter_frame_range`, so buffered frames stay small.
+
+    *max_frames* widens the sampling gap so that at most that many frames,
+    spread over the whole file, are yielded (see :func:`sample_interval`).
+    Only when the frame count is unknown or too low does sampling stop at
+    the budget before the end, with a warning.
+    """
+    if mode not in SAMPLING_MODES:
+        raise ValueError(f"Unknown sampling mode '{mode}', expected one of {SAMPLING_MODES}")
     if not os.path.isfile(video_path):
         raise FileNotFoundError(f"Video not found: {video_path}")
+    if mode == "keyframes":
+        yield from iter_keyframes(video_path, max_keyframes, size, ffmpeg=ffmpeg)
+        return
+    if mode == "adaptive":
+        yield from iter_adaptive_frames(video_path, budget, size=size)
+        return
 
     cap = cv2.VideoCapture(video_path)
     if not cap.isOpened():
@@ -26,27 +200,663 @@ def extract_frames(video_path: str, target_fps: float = 1.0) -> List[Image.Image
         cap.release()
         raise RuntimeError(f"Could not determine FPS for: {video_path}")
 
-    frame_interval = max(1, int(round(native_fps / target_fps)))
+    frame_interval = sample_interval(native_fps, target_fps, total_frames, max_frames)
+    if mode in ("seek", "auto") and (total_frames <= 0 or frame_interval < _MIN_SEEK_GAP):
+        mode = "grab"
+    seek_key = None
+    if mode == "auto":
+        seek_key = _seek_key(cap, frame_interval)
+        with _seek_decisions_lock:
+            cached = _SEEK_DECISIONS.get(seek_key)
+        if cached is not None:
+            mode = "seek" if cached else "grab"
     logger.info(
-        "Extracting frames from %s (fps=%.2f, total=%d, interval=%d)",
-        video_path, native_fps, total_frames, frame_interval,
+        "Extracting frames from %s (fps=%.2f, total=%d, interval=%d, mode=%s)",
+        video_path, native_fps, total_frames, frame_interval, mode,
     )
 
-    frames: List[Image.Image] = []
-    frame_idx = 0
+    t0 = time.perf_counter()
+    count = 0
+    try:
+        if mode == "read":
+            frames = _sample_read(cap, frame_interval)
+        elif mode == "grab":
+            frames = _sample_grab(cap, frame_interval)
+        else:
+            frames = _sample_seek(cap, video_path, frame_interval, total_frames,
+                                  probe_key=seek_key if mode == "auto" else None)
+        for frame in frames:
+            if max_frames and count >= max_frames:
+                logger.warning("Frame count of %s was underestimated; stopping at the %d-frame budget",
+                               video_path, max_frames)
+                break
+            count += 1
+            yield frame.resize(size, Image.BILINEAR) if size else frame
+    finally:
+        cap.release()
+
+    logger.info("Extracted %d frames from %s in %.2fs", count, video_path, time.perf_counter() - t0)
+
 
+def _sample_read(cap: cv2.VideoCapture, frame_interval: int) -> Iterator[Image.Image]:
+    frame_idx = 0
     while True:
         ret, frame = cap.read()
         if not ret:
             break
         if frame_idx % frame_interval == 0:
-            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            frames.append(Image.fromarray(rgb))
+            yield _to_image(frame)
+        frame_idx += 1
+
+
+def _sample_grab(cap: cv2.VideoCapture, frame_interval: int, start: int = 0) -> Iterator[Image.Image]:
+    frame_idx = start
+    while cap.grab():
+        if frame_idx % frame_interval == 0:
+            ret, frame = cap.retrieve()
+            if ret:
+                yield _to_image(frame)
         frame_idx += 1
 
-    cap.release()
-    logger.info("Extracted %d frames from %s", len(frames), video_path)
-    return frames
+
+def _sample_seek(cap: cv2.VideoCapture, video_path: str, frame_interval: int,
+                 total_frames: int, probe_key: Optional[tuple] = None) -> Iterator[Image.Image]:
+    """Seek to each sample. With *probe_key*, the first samples time seek()
+    against grab() and the winner is used (and remembered under the key)
+    for the rest of the file."""
+    probe = probe_key is not None
+    use_seek = True
+    seek_times: List[float] = []
+    grab_time = 0.0
+    pos = 0  # index of the frame the next grab() returns
+
+    for sample, target in enumerate(range(0, total_frames, frame_interval)):
+        t0 = time.perf_counter()
+        # While probing, the first gap is crossed with grab() to time it
+        seeking = use_seek and target > pos and not (probe and sample == 1)
+        if seeking and not _seek_to(cap, target):
+            logger.warning("Inaccurate seeking in %s, falling back to grab()", video_path)
+            cap.release()
+            cap.open(video_path)
+            pos, use_seek, probe, seeking = 0, False, False, False
+        if not seeking and not _grab_to(cap, pos, target):
+            break
+        pos = target
+        if not cap.grab():
+            break
+        pos += 1
+        ret, frame = cap.retrieve()
+        image = _to_image(frame) if ret else None
+
+        if probe and sample >= 1:
+            elapsed = time.perf_counter() - t0
+            if sample == 1:
+                grab_time = elapsed
+            else:
+                seek_times.append(elapsed)
+            if len(seek_times) == _PROBE_SAMPLES:
+                probe = False
+                use_seek = sum(seek_times) / len(seek_times) < grab_time
+                _remember_seek_decision(probe_key, use_seek)
+                logger.info("Frame sampling: seek %.1fms vs grab %.1fms per sample → %s",
+                            1000 * sum(seek_times) / len(seek_times), 1000 * grab_time,
+                            "seek" if use_seek else "grab")
+        if image is not None:
+            yield image
+    else:
+        # CAP_PROP_FRAME_COUNT is an estimate for some containers; pick up
+        # any samples past it the same way grab mode would.
+        yield from _sample_grab(cap, frame_interval, start=pos)
+
+
+def iter_frame_range(video_path: str, start: int, stop: Optional[int], interval: int,
+                     size: Optional[Tuple[int, int]] = None) -> Iterator[Image.Image]:
+    """Yield every *interval*-th frame of native frames ``[start, stop)``
+    (to the end of the file when *stop* is None).
+
+    *start* must be a multiple of *interval*, so consecutive ranges yield
+    exactly the frames ``iter_frames`` would in ``grab`` mode. The capture
+    seeks to *start* and falls back to grabbing from the beginning when the
+    container cannot seek accurately. *size* = ``(width, height)``
+    downscales with PIL bilinear, the resize the feature extractor applies.
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise RuntimeError(f"Failed to open video: {video_path}")
+    try:
+        if start and not _seek_to(cap, start):
+            logger.warning("Inaccurate seeking in %s, grabbing to frame %d", video_path, start)
+            cap.release()
+            cap.open(video_path)
+            if not _grab_to(cap, 0, start):
+                return
+        frame_idx = start
+        while (stop is None or frame_idx < stop) and cap.grab():
+            if (frame_idx - start) % interval == 0:
+                ret, frame = cap.retrieve()
+                if ret:
+                    image = _to_image(frame)
+                    yield image.resize(size, Image.BILINEAR) if size else image
+            frame_idx += 1
+    finally:
+        cap.release()
+
+
+def change_scores(thumbs: np.ndarray) -> np.ndarray:
+    """Scene-change signal between consecutive grayscale thumbnails.
+
+    *thumbs* is ``(N, H, W)`` uint8; returns ``N - 1`` scores in [0, 1],
+    the mean of the normalized sum of absolute differences (catches motion
+    and cuts) and the L1 distance between intensity histograms (robust to
+    small motion, catches lighting and content changes). Fully vectorized
+    over the whole stack.
+    """
+    n = thumbs.shape[0]
+    if n < 2:
+        return np.zeros(0, dtype=np.float32)
+    pixels = thumbs.reshape(n, -1)
+    sad = np.abs(np.diff(pixels.astype(np.int16), axis=0)).mean(axis=1) / 255.0
+
+    bins = (pixels // (256 // _HIST_BINS)).astype(np.int64)
+    bins += np.arange(n, dtype=np.int64)[:, None] * _HIST_BINS
+    hist = np.bincount(bins.ravel(), minlength=n * _HIST_BINS).reshape(n, _HIST_BINS)
+    hist = hist / pixels.shape[1]
+    hist_dist = np.abs(np.diff(hist, axis=0)).sum(axis=1) / 2.0
+
+    return ((sad + hist_dist) / 2.0).astype(np.float32)
+
+
+def iter_adaptive_frames(
+    video_path: str,
+    budget: int = 64,
+    analysis_fps: float = 4.0,
+    base_fraction: float = 0.25,
+    min_change: float = 0.08,
+    size: Optional[Tuple[int, int]] = None,
+) -> Iterator[Image.Image]:
+    """Yield at most *budget* frames, concentrated around scene changes.
+
+    Frames are inspected at *analysis_fps* on small grayscale thumbnails
+    and scored with :func:`change_scores`. A *base_fraction* of the budget
+    is spread evenly over the video so static stretches still get sparse
+    coverage; the rest goes to the frames on either side of the strongest
+    changes (at least *min_change*), keeping picks at least one analysis
+    step apart. A mostly static video therefore uses far less than the
+    budget. Frames are yielded in time order once the whole video has been
+    scanned; only candidates are retained, so memory is bounded by the
+    budget rather than the video length. Pass *size* (the model input
+    size) to retain them downscaled. Without *size* candidates are kept as
+    frame indices only and the picked frames are decoded again at native
+    resolution in a second pass (see :func:`_decode_at`), so a 4K video
+    never holds more than one native frame at a time.
+    """
+    native_fps, total_frames, _, _ = video_info(video_path)
+    if native_fps <= 0 or total_frames <= 0:
+        logger.warning("Frame count unknown for %s, adaptive sampling falls back to grab", video_path)
+        count = 0
+        for frame in iter_frames(video_path, 1.0, "grab", size=size):
+            yield frame
+            count += 1
+            if count >= budget:
+                return
+        return
+
+    budget = max(1, int(budget))
+    base_slots = max(1, int(round(budget * base_fraction)))
+    change_slots = budget - base_slots
+    step = max(1, int(round(native_fps / analysis_fps)))
+    logger.info(
+        "Adaptive sampling of %s (fps=%.2f, total=%d, step=%d, budget=%d: %d even + %d on changes)",
+        video_path, native_fps, total_frames, step, budget, base_slots, change_slots,
+    )
+
+    t0 = time.perf_counter()
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise RuntimeError(f"Failed to open video: {video_path}")
+
+    def _keep(frame: np.ndarray) -> Optional[np.ndarray]:
+        return cv2.resize(frame, size, interpolation=cv2.INTER_AREA) if size is not None else None
+
+    # Frames are kept at *size*, or as None (decoded again later) without it
+    baseline: dict = {}                  # bin -> (frame_idx, bgr)
+    candidates: List[tuple] = []         # (score, frame_idx, bgr), best 2 * change_slots kept
+    chunk: List[tuple] = []              # (frame_idx, thumb, kept bgr) awaiting scores
+    prev: Optional[tuple] = None         # last analysed frame of the previous chunk
+    prev_score = 0.0                     # score of the change into *prev*
+
+    def _flush(final: bool) -> None:
+        nonlocal prev, prev_score
+        entries = ([prev] if prev is not None else []) + chunk
+        if not entries:
+            return
+        scores = change_scores(np.stack([thumb for _, thumb, _ in entries]))
+        into = np.concatenate(([prev_score if prev is not None else 0.0], scores))
+        out_of = np.concatenate((scores, [0.0]))
+        # The last entry is only final at end of video; otherwise its
+        # outgoing change is unknown and it is carried into the next chunk.
+        last = len(entries) if final else len(entries) - 1
+        for i in range(last):
+            frame_idx, _, frame = entries[i]
+            score = float(max(into[i], out_of[i]))
+            if change_slots and score >= min_change:
+                if len(candidates) < 2 * change_slots:
+                    candidates.append((score, frame_idx, frame))
+                else:
+                    worst = min(range(len(candidates)), key=lambda k: candidates[k][0])
+                    if score > candidates[worst][0]:
+                        candidates[worst] = (score, frame_idx, frame)
+        if not final:
+            prev, prev_score = entries[-1], float(into[-1])
+        chunk.clear()
+
+    frame_idx = 0
+    try:
+        while cap.grab():
+            # The header frame count can be low; frames past it share the last bin
+            bin_idx = min(frame_idx * base_slots // total_frames, base_slots - 1)
+            analyse = frame_idx % step == 0
+            if not analyse and size is None and bin_idx not in baseline:
+                baseline[bin_idx] = (frame_idx, None)
+            elif analyse or bin_idx not in baseline:
+                ret, frame = cap.retrieve()
+                if ret:
+                    kept = _keep(frame)
+                    if bin_idx not in baseline:
+                        baseline[bin_idx] = (frame_idx, kept)
+                    if analyse:
+                        thumb = cv2.cvtColor(cv2.resize(frame, _THUMB_SIZE, interpolation=cv2.INTER_AREA),
+                                             cv2.COLOR_BGR2GRAY)
+                        chunk.append((frame_idx, thumb, kept))
+                        if len(chunk) >= 16:
+                            _flush(final=False)
+            frame_idx += 1
+        _flush(final=True)
+    finally:
+        cap.release()
+
+    picked = {idx: frame for idx, frame in baseline.values()}
+    min_gap = step
+    for score, idx, frame in sorted(candidates, key=lambda c: -c[0]):
+        if len(picked) >= budget:
+            break
+        if all(abs(idx - other) >= min_gap for other in picked):
+            picked[idx] = frame
+
+    logger.info(
+        "Adaptive sampling picked %d frames (%d even, %d on changes) from %s in %.2fs",
+        len(picked), len(baseline), len(picked) - len(baseline), video_path, time.perf_counter() - t0,
+    )
+    if size is None:
+        for frame in _decode_at(video_path, sorted(picked)):
+            yield _to_image(frame)
+        return
+    for idx in sorted(picked):
+        yield _to_image(picked[idx])
+
+
+def _decode_at(video_path: str, indices: List[int]) -> Iterator[np.ndarray]:
+    """Yield the BGR frames at ascending native *indices*, seeking across
+    long gaps while the container honours accurate seeks and grabbing
+    forward otherwise. Indices past the end of the video are skipped."""
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise RuntimeError(f"Failed to open video: {video_path}")
+    pos, seekable = 0, True
+    try:
+        for idx in indices:
+            if seekable and idx - pos >= _MIN_SEEK_GAP:
+                if _seek_to(cap, idx):
+                    pos = idx
+                else:
+                    # Position unknown after a failed seek: restart, grab from here on
+                    seekable = False
+                    cap.release()
+                    cap.open(video_path)
+                    pos = 0
+            if not _grab_to(cap, pos, idx) or not cap.grab():
+                return
+            pos = idx + 1
+            ret, frame = cap.retrieve()
+            if ret:
+                yield frame
+    finally:
+        cap.release()
+
+
+def video_info(video_path: str) -> Tuple[float, int, int, int]:
+    """``(fps, frame_count, width, height)`` from the container header."""
+    cap = cv2.VideoCapture(video_path)
+    try:
+        if not cap.isOpened():
+            raise RuntimeError(f"Failed to open video: {video_path}")
+        return (
+            cap.get(cv2.CAP_PROP_FPS),
+            int(cap.get(cv2.CAP_PROP_FRAME_COUNT)),
+            int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        )
+    finally:
+        cap.release()
+
+
+def _read_rawvideo(cmd: List[str], width: int, height: int, video_path: str,
+                   as_array: bool = False) -> Iterator[Any]:
+    """Run an ffmpeg command writing ``rgb24`` rawvideo to stdout and yield
+    its frames, each read into a preallocated buffer, as PIL Images or (with
+    *as_array*) uint8 ``(height, width, 3)`` arrays."""
+    try:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    except FileNotFoundError:
+        raise RuntimeError("ffmpeg not found. Install ffmpeg and ensure it is on your PATH.")
+
+    t0 = time.perf_counter()
+    buffer = np.empty((height, width, 3), dtype=np.uint8)
+    view = memoryview(buffer).cast("B")
+    count = 0
+    try:
+        while True:
+            filled = 0
+            while filled < len(view):
+                n = proc.stdout.readinto(view[filled:])
+                if not n:
+                    break
+                filled += n
+            if filled < len(view):
+                break
+            count += 1
+            # Copy out of the shared buffer; at model resolution this is cheap
+            yield buffer.copy() if as_array else Image.fromarray(buffer.copy())
+        proc.wait()
+        if proc.returncode != 0:
+            stderr = proc.stderr.read().decode("utf-8", errors="replace").strip()
+            raise RuntimeError(f"ffmpeg frame decode failed: {stderr}")
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+        proc.stdout.close()
+        proc.stderr.close()
+
+    logger.info("Extracted %d frames from %s in %.2fs", count, video_path, time.perf_counter() - t0)
+
+
+def iter_frames_ffmpeg(
+    video_path: str,
+    target_fps: float = 1.0,
+    size: Optional[Tuple[int, int]] = None,
+    ffmpeg: str = "ffmpeg",
+    as_array: bool = False,
+    max_frames: Optional[int] = None,
+) -> Iterator[Any]:
+    """Yield frames decoded by an ffmpeg subprocess instead of OpenCV.
+
+    Sampling (``fps`` filter) and downscaling to *size* = ``(width, height)``
+    (``scale`` filter, bilinear like the HF image processors) happen inside
+    ffmpeg, which writes fixed-size ``rgb24`` frames to a pipe; each one is
+    read into a preallocated buffer. Full-resolution pixels never reach
+    Python, so per-frame cost no longer scales with the source resolution.
+    Without *size* frames keep their native resolution. With *as_array*
+    frames are yielded as uint8 RGB arrays, never wrapped in PIL.
+
+    The ``fps`` filter emits ``round(duration * target_fps)`` frames spread
+    over the whole video; *max_frames* (``-frames:v``) only guards against
+    that rounding adding one past a budget.
+    """
+    if not os.path.isfile(video_path):
+        raise FileNotFoundError(f"Video not found: {video_path}")
+    if size is None:
+        _, _, width, height = video_info(video_path)
+    else:
+        width, height = size
+
+    cmd = [
+        ffmpeg, "-nostdin", "-hide_banner", "-loglevel", "error",
+        "-i", video_path,
+        "-an", "-sn",
+        "-vf", f"fps={target_fps},scale={width}:{height}:flags=bilinear",
+        *(["-frames:v", str(int(max_frames))] if max_frames else []),
+        "-f", "rawvideo", "-pix_fmt", "rgb24",
+        "pipe:1",
+    ]
+    logger.info("Extracting frames from %s with ffmpeg (fps=%s, size=%dx%d)", video_path, target_fps, width, height)
+    yield from _read_rawvideo(cmd, width, height, video_path, as_array)
+
+
+def iter_keyframes(
+    video_path: str,
+    max_frames: int = 64,
+    size: Optional[Tuple[int, int]] = None,
+    ffmpeg: str = "ffmpeg",
+    as_array: bool = False,
+) -> Iterator[Any]:
+    """Yield only the video's keyframes (I-frames), at most *max_frames*.
+
+    ffmpeg is run with ``-skip_frame nokey`` so the decoder drops every
+    non-key packet before decoding it, which makes this much cheaper than
+    time-based sampling for a first-pass verdict on long uploads. When the
+    video may hold more keyframes than *max_frames*, a ``select`` filter
+    keeps them at least duration / *max_frames* seconds apart so the picks
+    still cover the whole video. *size* and *as_array* work as in
+    :func:`iter_frames_ffmpeg`.
+    """
+    if not os.path.isfile(video_path):
+        raise FileNotFoundError(f"Video not found: {video_path}")
+    native_fps, total_frames, width, height = video_info(video_path)
+    if size is not None:
+        width, height = size
+    max_frames = max(1, int(max_frames))
+
+    filters = []
+    if native_fps > 0 and total_frames > 0:
+        min_gap = total_frames / native_fps / max_frames
+        filters.append(f"select=isnan(prev_selected_t)+gte(t-prev_selected_t\\,{min_gap:.3f})")
+    filters.append(f"scale={width}:{height}:flags=bilinear")
+
+    cmd = [
+        ffmpeg, "-nostdin", "-hide_banner", "-loglevel", "error",
+        "-skip_frame", "nokey",
+        "-i", video_path,
+        "-an", "-sn",
+        "-vf", ",".join(filters),
+        "-vsync", "vfr",
+        "-frames:v", str(max_frames),
+        "-f", "rawvideo", "-pix_fmt", "rgb24",
+        "pipe:1",
+    ]
+    logger.info("Extracting up to %d keyframes from %s with ffmpeg (size=%dx%d)",
+                max_frames, video_path, width, height)
+    yield from _read_rawvideo(cmd, width, height, video_path, as_array)
+
+
+_END = object()
+
+
+class _DecodeError:
+    def __init__(self, exc: BaseException) -> None:
+        self.exc = exc
+
+
+class FrameStream:
+    """Bounded hand-off of decoded frames from a decode thread to a consumer.
+
+    The producer calls :meth:`feed` (blocking, typically on the decode pool)
+    while the consumer iterates the stream on another thread. At most
+    ``maxsize`` frames are buffered, so memory does not grow with video
+    length and inference overlaps with decoding. A decode error is re-raised
+    in the consumer. The consumer must :meth:`close` the stream if it stops
+    early so the producer can exit. As a backstop, the producer also gives
+    up (and closes the stream) once the consumer has not taken a frame for
+    *stall_timeout* seconds.
+    """
+
+    def __init__(self, maxsize: int = 64, expected: int = 0, stall_timeout: float = 300.0) -> None:
+        self.expected = expected
+        self.stall_timeout = float(stall_timeout)
+        self.produced = 0
+        self.plan: Dict[str, Any] = {}
+        self._queue: "queue.Queue[object]" = queue.Queue(maxsize=max(1, int(maxsize)))
+        self._closed = threading.Event()
+
+    def feed(self, frames: Iterable[Image.Image]) -> int:
+        """Push every frame of *frames* into the stream; returns the count."""
+        try:
+            for frame in frames:
+                if not self._put(frame):
+                    break
+                self.produced += 1
+        except Exception as exc:
+            self._put(_DecodeError(exc))
+            raise
+        finally:
+            close = getattr(frames, "close", None)
+            if close is not None:
+                close()
+        self._put(_END)
+        return self.produced
+
+    def _put(self, item: object) -> bool:
+        deadline = time.monotonic() + self.stall_timeout
+        while not self._closed.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                if time.monotonic() > deadline:
+                    logger.warning("Frame consumer stalled for %.0fs; stopping decode", self.stall_timeout)
+                    self.close()
+                    return False
+        return False
+
+    def __iter__(self) -> Iterator[Image.Image]:
+        while True:
+            try:
+                item = self._queue.get(timeout=0.1)
+            except queue.Empty:
+                if self._closed.is_set():
+                    raise RuntimeError("Frame stream was closed before decoding finished")
+                continue
+            if item is _END:
+                return
+            if isinstance(item, _DecodeError):
+                raise item.exc
+            yield item  # type: ignore[misc]
+
+    def close(self) -> None:
+        self._closed.set()
+        # Drop buffered frames and unblock a producer stuck on a full queue
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+
+
+class SeekableFrames:
+    """Random access to the frames :func:`iter_frames` would sample, decoded
+    only when asked for.
+
+    Built for early exit (VideoDeepfakeDetector.predict with
+    ``early_exit=True``), which scores frames in a spread order and usually
+    stops after a fraction of them: :meth:`fetch` seeks to each requested
+    sample, so frames that are never scored are never decoded. Sample
+    positions come from the container frame count; samples past an
+    underestimated count are not reachable. Frames are downscaled to *size*
+    like iter_frames does. Once :meth:`close` has been called, fetching
+    raises, which stops a consumer that is still running.
+
+    A container that does not honour frame-accurate seeks is refused with
+    RuntimeError when constructed, so callers can decode sequentially
+    instead. Should a seek still fail later, reading goes forward-only by
+    grabbing, rewinding to the first frame at most once per :meth:`fetch`.
+    """
+
+    def __init__(self, video_path: str, target_fps: float = 1.0, size: Optional[Tuple[int, int]] = None,
+                 max_frames: Optional[int] = None) -> None:
+        if not os.path.isfile(video_path):
+            raise FileNotFoundError(f"Video not found: {video_path}")
+        native_fps, total_frames, _, _ = video_info(video_path)
+        if native_fps <= 0 or total_frames <= 0:
+            raise RuntimeError(f"Frame count unknown for: {video_path}")
+        self.video_path = video_path
+        self.size = size
+        self.interval = sample_interval(native_fps, target_fps, total_frames, max_frames)
+        self.expected = math.ceil(total_frames / self.interval)
+        self.plan: Dict[str, Any] = {}
+        self._cap: Optional[cv2.VideoCapture] = None
+        self._pos = 0  # native index of the frame the next grab() returns
+        self._seekable = True
+        self._closed = threading.Event()
+        self._lock = threading.Lock()
+
+        probe = (self.expected // 2) * self.interval
+        if probe and not _seek_to(self._open(), probe):
+            self.close()
+            raise RuntimeError(f"Frame-accurate seeking not supported for: {video_path}")
+        self._pos = probe
+
+    def __len__(self) -> int:
+        return self.expected
+
+    def __iter__(self) -> Iterator[Image.Image]:
+        for start in range(0, self.expected, 16):
+            for image in self.fetch(range(start, min(start + 16, self.expected))):
+                if image is not None:
+                    yield image
+
+    def _open(self) -> cv2.VideoCapture:
+        if self._cap is None:
+            self._cap = cv2.VideoCapture(self.video_path)
+            if not self._cap.isOpened():
+                raise RuntimeError(f"Failed to open video: {self.video_path}")
+            self._pos = 0
+        return self._cap
+
+    def _read(self, target: int) -> Optional[Image.Image]:
+        cap = self._open()
+        if not 0 <= self._pos <= target < self._pos + _MIN_SEEK_GAP:
+            if self._seekable and _seek_to(cap, target):
+                self._pos = target
+            elif self._seekable or not 0 <= self._pos <= target:
+                # A failed seek leaves the position unknown and, once seeks are
+                # off, going back means starting over: restart and grab forward.
+                # fetch() reads in file order, so this is at most once per call.
+                if self._seekable:
+                    logger.warning("Inaccurate seek in %s, decoding forward only", self.video_path)
+                self._seekable = False
+                cap.release()
+                cap.open(self.video_path)
+                self._pos = 0
+        if not _grab_to(cap, self._pos, target) or not cap.grab():
+            self._pos = -1  # unknown; the next read seeks
+            return None
+        self._pos = target + 1
+        ret, frame = cap.retrieve()
+        if not ret:
+            return None
+        image = _to_image(frame)
+        return image.resize(self.size, Image.BILINEAR) if self.size else image
+
+    def fetch(self, samples: Iterable[int]) -> List[Optional[Image.Image]]:
+        """Decode the given sample positions (``0 .. len - 1``), returned in
+        the order asked for; None for samples that cannot be decoded (past
+        the end when the frame count was overestimated)."""
+        samples = list(samples)
+        decoded: Dict[int, Optional[Image.Image]] = {}
+        with self._lock:
+            # Visit in file order so nearby samples are reached with grab()
+            for sample in sorted(set(samples)):
+                if self._closed.is_set():
+                    raise RuntimeError("Frame source was closed")
+                decoded[sample] = self._read(sample * self.interval)
+        return [decoded[sample] for sample in samples]
+
+    def close(self) -> None:
+        self._closed.set()
+        with self._lock:
+            if self._cap is not None:
+                self._cap.release()
+                self._cap = None
 
 
 def extract_audio(video_path: str, output_dir: str) -> str:
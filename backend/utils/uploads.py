@@ -0,0 +1,259 @@
+"""Stream uploaded media to disk in bounded chunks."""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, Optional, Tuple
+
+from utils.logger import logger
+
+# Matroska / WebM files start with an EBML header and carry their track and
+# timing info up front; this much of the file is enough for ffprobe.
+_EBML_MAGIC = b"\x1a\x45\xdf\xa3"
+_EBML_HEAD_BYTES = 1024 * 1024
+
+
+class UploadTooLarge(Exception):
+    def __init__(self, limit_bytes: int) -> None:
+        super().__init__(f"Upload exceeds the {limit_bytes // (1024 * 1024)} MB limit")
+        self.limit_bytes = limit_bytes
+
+
+class MalformedForm(ValueError):
+    """The request body is not a well-formed multipart/form-data form."""
+
+
+class StreamingForm:
+    """A multipart/form-data body parsed straight off the request stream.
+
+    Text fields are collected into ``fields`` (at most *max_fields*, each up
+    to *max_field_bytes*). A file part is never buffered: :meth:`next_file`
+    parses up to the start of one and :meth:`file_chunks` yields its bytes
+    as they arrive, so they can go directly into an :class:`UploadSink`.
+    :meth:`finish` parses the rest of the body; fields sent after the file
+    only show up in ``fields`` then. A form may carry one file. More than
+    *max_bytes* of body raises :class:`UploadTooLarge` while receiving.
+    """
+
+    def __init__(self, stream: AsyncIterator[bytes], content_type: str, max_bytes: int,
+                 max_field_bytes: int = 64 * 1024, max_fields: int = 32) -> None:
+        from python_multipart.multipart import MultipartParser, parse_options_header
+
+        kind, params = parse_options_header(content_type)
+        if kind != b"multipart/form-data" or not params.get(b"boundary"):
+            raise MalformedForm("Expected a multipart/form-data body")
+        self.fields: Dict[str, str] = {}
+        self.file_field: Optional[str] = None
+        self.filename: Optional[str] = None
+        self.max_bytes = max_bytes
+        self.max_field_bytes = max_field_bytes
+        self.max_fields = max_fields
+        self.received = 0
+        self._stream = stream.__aiter__()
+        self._events: Deque[Tuple[str, Any]] = deque()
+        self._ended = False
+        self._files = 0
+        self._header = [b"", b""]
+        self._headers: Dict[bytes, bytes] = {}
+        self._parse_options = parse_options_header
+
+        # Header names and values may arrive split across several callbacks
+        def _header_field(data: bytes, start: int, end: int) -> None:
+            self._header[0] += data[start:end]
+
+        def _header_value(data: bytes, start: int, end: int) -> None:
+            self._header[1] += data[start:end]
+
+        def _header_end() -> None:
+            self._headers[self._header[0].lower()] = self._header[1]
+            self._header = [b"", b""]
+
+        def _headers_finished() -> None:
+            self._events.append(("part", self._headers))
+            self._headers = {}
+
+        def _data(data: bytes, start: int, end: int) -> None:
+            self._events.append(("data", data[start:end]))
+
+        self._parser = MultipartParser(params[b"boundary"], callbacks={
+            "on_header_field": _header_field,
+            "on_header_value": _header_value,
+            "on_header_end": _header_end,
+            "on_headers_finished": _headers_finished,
+            "on_part_data": _data,
+            "on_part_end": lambda: self._events.append(("end", None)),
+            "on_end": lambda: self._events.append(("eof", None)),
+        })
+
+    async def _next(self) -> Tuple[str, Any]:
+        from python_multipart.exceptions import MultipartParseError
+
+        while not self._events:
+            if self._ended:
+                raise MalformedForm("Multipart body ended before its closing boundary")
+            try:
+                chunk = await self._stream.__anext__()
+            except StopAsyncIteration:
+                self._ended = True
+                continue
+            self.received += len(chunk)
+            if self.received > self.max_bytes:
+                raise UploadTooLarge(self.max_bytes)
+            try:
+                self._parser.write(chunk)
+            except MultipartParseError as exc:
+                raise MalformedForm(f"Malformed multipart body: {exc}") from None
+        return self._events.popleft()
+
+    async def _read_field(self, name: str) -> None:
+        if len(self.fields) >= self.max_fields:
+            raise MalformedForm(f"Too many form fields (limit {self.max_fields})")
+        value = b""
+        async for data in self._part_data():
+            value += data
+            if len(value) > self.max_field_bytes:
+                raise MalformedForm(f"Form field '{name}' exceeds {self.max_field_bytes // 1024} KB")
+        self.fields[name] = value.decode("utf-8", errors="replace")
+
+    async def next_file(self) -> Optional[str]:
+        """Parse text fields up to the next file part and return that part's
+        field name, or None when the body ended without one. An empty file
+        input (no filename) counts as absent."""
+        while True:
+            kind, headers = await self._next()
+            if kind == "eof":
+                return None
+            if kind != "part":
+                raise MalformedForm("Unexpected data between form parts")
+            _, options = self._parse_options(headers.get(b"content-disposition"))
+            name = options.get(b"name", b"").decode("utf-8", errors="replace")
+            if b"filename" not in options:
+                await self._read_field(name)
+                continue
+            filename = options[b"filename"].decode("utf-8", errors="replace")
+            if not filename:
+                async for _ in self._part_data():
+                    pass
+                continue
+            self._files += 1
+            if self._files > 1:
+                raise MalformedForm("Only one file can be uploaded per request")
+            self.file_field, self.filename = name, filename
+            return name
+
+    async def _part_data(self) -> AsyncIterator[bytes]:
+        while True:
+            kind, data = await self._next()
+            if kind == "end":
+                return
+            if kind != "data":
+                raise MalformedForm("Truncated form part")
+            yield data
+
+    async def file_chunks(self, chunk_size: int = 0) -> AsyncIterator[bytes]:
+        """The current file part's bytes in chunks of at least *chunk_size*
+        (bar the last), followed by parsing the rest of the form (see
+        :meth:`finish`), so draining it reads the whole body."""
+        pending = bytearray()
+        async for data in self._part_data():
+            pending += data
+            if len(pending) >= chunk_size:
+                yield bytes(pending)
+                pending.clear()
+        if pending:
+            yield bytes(pending)
+        await self.finish()
+
+    async def finish(self) -> None:
+        """Parse the remainder of the body; a further file part is an error."""
+        if await self.next_file() is not None:
+            raise MalformedForm("Only one file can be uploaded per request")
+
+
+class UploadSink:
+    """Writes an async stream of byte chunks to *path*.
+
+    Only one chunk is held in memory at a time, and the stream is aborted with
+    :class:`UploadTooLarge` as soon as more than *max_bytes* have arrived.
+
+    ``head_ready`` is set once the container index is on disk — early for MP4/
+    MOV files whose ``moov`` box precedes ``mdat`` (fast-start) and for
+    Matroska/WebM, otherwise only when the upload has finished — so stages that
+    only need the header (ffprobe) can start while the body is still arriving.
+    ``done`` is set when the stream ends, successfully or not. The SHA-256 of
+    the bytes is computed on the fly and available as ``sha256`` afterwards.
+    """
+
+    def __init__(self, path: str, max_bytes: int, executor: Any = None) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.executor = executor
+        self.written = 0
+        self.head_ready = asyncio.Event()
+        self.done = asyncio.Event()
+        self._head_at: Optional[int] = None
+        self._box_pos = 0
+        self._scan = True
+        self._hash = hashlib.sha256()
+
+    async def _call(self, fn: Any, *args: Any) -> Any:
+        if self.executor is not None:
+            return await self.executor.run("io", fn, *args)
+        return fn(*args)
+
+    async def consume(self, chunks: AsyncIterator[bytes]) -> int:
+        """Drain *chunks* into the file and return the number of bytes written."""
+        f = open(self.path, "w+b")
+        try:
+            async for chunk in chunks:
+                if self.written + len(chunk) > self.max_bytes:
+                    raise UploadTooLarge(self.max_bytes)
+                await self._call(self._write, f, chunk)
+                self.written += len(chunk)
+                if not self.head_ready.is_set():
+                    self._check_head(f)
+        finally:
+            f.close()
+            self.head_ready.set()
+            self.done.set()
+        logger.info("Upload streamed to %s (%.1f MB)", self.path, self.written / (1024 * 1024))
+        return self.written
+
+    @property
+    def sha256(self) -> str:
+        return self._hash.hexdigest()
+
+    def _write(self, f: Any, chunk: bytes) -> None:
+        f.write(chunk)
+        f.flush()
+        self._hash.update(chunk)
+
+    def _check_head(self, f: Any) -> None:
+        end = f.tell()
+        while self._scan and self._head_at is None and self.written >= self._box_pos + 16:
+            f.seek(self._box_pos)
+            header = f.read(16)
+            if self._box_pos == 0 and header.startswith(_EBML_MAGIC):
+                self._head_at = _EBML_HEAD_BYTES
+                break
+
+            # ISO-BMFF top-level box: 32-bit size, 4-char type, optional 64-bit size
+            size = int.from_bytes(header[:4], "big")
+            kind = header[4:8]
+            if size == 1:
+                size = int.from_bytes(header[8:16], "big")
+            if size < 8 or not kind.isalnum():
+                self._scan = False  # not a box structure we understand
+            elif kind == b"moov":
+                self._head_at = self._box_pos + size
+            elif kind == b"mdat":
+                self._scan = False  # index lives at the end of the file
+            else:
+                self._box_pos += size
+        f.seek(end)
+
+        if self._head_at is not None and self.written >= self._head_at:
+            logger.info("Container index available after %d bytes — starting header stages", self.written)
+            self.head_ready.set()
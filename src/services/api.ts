@@ -12,14 +12,16 @@ export async function checkBackendHealth(): Promise<boolean> {
 export async function analyzeContent(file: File | null, text: string | null) {
     const formData = new FormData();
 
-    if (file) {
-        formData.append("video", file);
-    }
-
+    // Fields go before the video: the server starts analyzing while the
+    // upload is still arriving, using whatever fields it has seen by then.
     if (text) {
         formData.append("query", text);
     }
 
+    if (file) {
+        formData.append("video", file);
+    }
+
     // Debug log
     console.log("Analyzing content:", { file: file?.name, text });
 
@@ -40,3 +42,68 @@ export async function analyzeContent(file: File | null, text: string | null) {
         throw error;
     }
 }
+
+export type AnalysisJobStatus = "queued" | "running" | "done" | "failed";
+
+export interface AnalysisJob {
+    job_id: string;
+    status: AnalysisJobStatus;
+    created_at: number;
+    started_at: number | null;
+    finished_at: number | null;
+    result: any | null;
+    error: string | null;
+}
+
+export async function submitAnalysisJob(file: File | null, text: string | null): Promise<AnalysisJob> {
+    const formData = new FormData();
+
+    // Fields go before the video: the server starts analyzing while the
+    // upload is still arriving, using whatever fields it has seen by then.
+    if (text) {
+        formData.append("query", text);
+    }
+
+    if (file) {
+        formData.append("video", file);
+    }
+
+    const response = await fetch(`${API_URL}/jobs`, {
+        method: "POST",
+        body: formData,
+    });
+
+    if (!response.ok) {
+        const errorText = await response.text();
+        throw new Error(`API Error: ${response.status} ${response.statusText} - ${errorText}`);
+    }
+
+    return await response.json();
+}
+
+export async function getAnalysisJob(jobId: string): Promise<AnalysisJob> {
+    const response = await fetch(`${API_URL}/jobs/${jobId}`);
+
+    if (!response.ok) {
+        const errorText = await response.text();
+        throw new Error(`API Error: ${response.status} ${response.statusText} - ${errorText}`);
+    }
+
+    return await response.json();
+}
+
+// Same result as analyzeContent, but without holding one HTTP request open for the whole run.
+export async function analyzeContentAsJob(file: File | null, text: string | null, pollMs = 1500) {
+    const job = await submitAnalysisJob(file, text);
+
+    while (true) {
+        await new Promise((resolve) => setTimeout(resolve, pollMs));
+        const current = await getAnalysisJob(job.job_id);
+        if (current.status === "done") {
+            return current.result;
+        }
+        if (current.status === "failed") {
+            throw new Error(`Analysis job failed: ${current.error}`);
+        }
+    }
+}